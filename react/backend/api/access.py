@@ -0,0 +1,110 @@
+"""
+Visibilidad de tableros para estudiantes.
+
+Un estudiante ve un tablero si es miembro o si tiene alguna tarea asignada en él.
+En lugar de resolverlo en cada petición con un join tablero -> listas -> tarjetas
+y un ``DISTINCT``, la tabla ``BoardAccess`` guarda una fila por usuario, tablero y
+motivo, y la visibilidad es una búsqueda por índice.
+
+Las señales (``api.signals``) mantienen la tabla al día con los cambios de
+miembros y de asignaciones hechos a través del ORM. Las escrituras que no emiten
+señales (``QuerySet.update``, ``bulk_create``) deben llamar a
+``sync_assignment_access`` con los pares afectados. ``check_board_access`` detecta
+desvíos y ``backfill_board_access`` reconstruye la tabla desde cero.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Board, Card, BoardAccess
+
+MEMBER = 'member'
+ASSIGNED = 'assigned'
+
+
+def visible_board_ids(user):
+    """Subconsulta con los ids de los tableros visibles para un estudiante"""
+    return BoardAccess.objects.filter(user=user).values('board_id')
+
+
+def grant_access(entries):
+    """Crea las filas ``(user_id, board_id, reason)`` que aún no existan"""
+    BoardAccess.objects.bulk_create(
+        [BoardAccess(user_id=user_id, board_id=board_id, reason=reason) for user_id, board_id, reason in entries],
+        ignore_conflicts=True,
+    )
+
+
+def revoke_access(reason, user_ids=None, board_ids=None):
+    queryset = BoardAccess.objects.filter(reason=reason)
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    if board_ids is not None:
+        queryset = queryset.filter(board_id__in=board_ids)
+    queryset.delete()
+
+
+def sync_assignment_access(pairs):
+    """
+    Recalcula el acceso por asignación de cada par ``(user_id, board_id)``: la fila
+    existe si y solo si el usuario tiene al menos una tarjeta en ese tablero. Una
+    consulta para todos los pares, más un INSERT y un DELETE si hacen falta.
+    """
+    pairs = {(user_id, board_id) for user_id, board_id in pairs if user_id and board_id}
+    if not pairs:
+        return
+    assigned = set(
+        Card.objects.filter(
+            assigned_to_id__in={user_id for user_id, _ in pairs},
+            list__board_id__in={board_id for _, board_id in pairs},
+        )
+        .order_by()
+        .values_list('assigned_to_id', 'list__board_id')
+        .distinct()
+    ) & pairs
+    with transaction.atomic(savepoint=False):
+        if assigned:
+            grant_access((user_id, board_id, ASSIGNED) for user_id, board_id in assigned)
+        revoked = pairs - assigned
+        if revoked:
+            BoardAccess.objects.filter(
+                reduce(or_, (Q(user_id=user_id, board_id=board_id) for user_id, board_id in revoked)),
+                reason=ASSIGNED,
+            ).delete()
+
+
+def expected_access():
+    """Conjunto de filas ``(user_id, board_id, reason)`` calculado desde las tablas de origen"""
+    expected = {
+        (user_id, board_id, MEMBER)
+        for board_id, user_id in Board.students.through.objects.values_list('board_id', 'user_id').iterator()
+    }
+    expected.update(
+        (user_id, board_id, ASSIGNED)
+        for user_id, board_id in Card.objects.filter(assigned_to__isnull=False)
+        .order_by()
+        .values_list('assigned_to_id', 'list__board_id')
+        .distinct()
+        .iterator()
+    )
+    return expected
+
+
+def current_access():
+    return set(BoardAccess.objects.values_list('user_id', 'board_id', 'reason').iterator())
+
+
+def access_differences():
+    """Devuelve ``(faltantes, sobrantes)`` de la tabla respecto de las tablas de origen"""
+    expected = expected_access()
+    current = current_access()
+    return expected - current, current - expected
+
+
+def repair_access(missing, extra):
+    with transaction.atomic():
+        grant_access(missing)
+        for user_id, board_id, reason in extra:
+            revoke_access(reason, user_ids=[user_id], board_ids=[board_id])
@@ -0,0 +1,194 @@
+"""
+Escritura diferida y en lote del historial de actividad.
+
+``log_activity`` no inserta nada durante la petición: arma el ``ActivityLog`` y lo
+entrega al escritor cuando se confirma la transacción. El escritor lo guarda
+según ``settings.ACTIVITY_LOG_WRITER['MODE']``:
+
+- ``'background'``: un hilo trabajador acumula entradas en una cola acotada y las
+  inserta con ``bulk_create`` al llegar a ``BATCH_SIZE`` o tras ``FLUSH_INTERVAL``
+  segundos. Si la cola está llena la entrada se descarta con un aviso en el log:
+  la respuesta de la API nunca espera al historial.
+- ``'inline'``: inserta en el mismo hilo al confirmar la transacción (útil en
+  desarrollo y pruebas).
+
+Tras guardar un lote, el escritor reparte sus entradas en los buzones de
+notificaciones (``api.notifications.fan_out``).
+
+En ambos modos un error al escribir se registra y se descarta; nunca llega a la
+respuesta.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+
+from .models import ActivityLog
+from .notifications import fan_out
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MODE': 'background',
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_QUEUE_SIZE': 10000,
+}
+
+_STOP = object()
+
+
+class ActivityLogWriter:
+    def __init__(self, mode='background', batch_size=100, flush_interval=1.0, max_queue_size=10000):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # Se descartan entradas desde los hilos de las peticiones y desde el trabajador
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, entry):
+        if self.mode == 'inline':
+            self.write([entry])
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._drop(1)
+            logger.warning("Cola de actividad llena: se descarta '%s' del tablero %s",
+                           entry.activity_type, entry.board_id)
+
+    def write(self, entries):
+        """Inserta un lote de entradas; los errores se registran y no se propagan"""
+        if not entries:
+            return
+        try:
+            ActivityLog.objects.bulk_create(entries, batch_size=self.batch_size)
+        except Exception:
+            self._drop(len(entries))
+            logger.exception("Error al guardar %s entradas de actividad", len(entries))
+            return
+        try:
+            fan_out(entries)
+        except Exception:
+            logger.exception("Error al notificar %s entradas de actividad", len(entries))
+
+    def _drop(self, count):
+        with self._dropped_lock:
+            self.dropped += count
+
+    def flush(self, timeout=5.0):
+        """Espera a que el hilo trabajador guarde todo lo pendiente"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event) or item is _STOP:
+                self._write_from_worker(batch)
+                batch = []
+                if item is _STOP:
+                    return
+                item.set()
+                continue
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write_from_worker(batch)
+                batch = []
+
+    def _write_from_worker(self, batch):
+        if not batch:
+            return
+        # El hilo tiene su propia conexión: respetar CONN_MAX_AGE y descartar conexiones rotas
+        close_old_connections()
+        self.write(batch)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_activity_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                options = {**DEFAULTS, **getattr(settings, 'ACTIVITY_LOG_WRITER', {})}
+                _writer = ActivityLogWriter(
+                    mode=options['MODE'],
+                    batch_size=options['BATCH_SIZE'],
+                    flush_interval=options['FLUSH_INTERVAL'],
+                    max_queue_size=options['MAX_QUEUE_SIZE'],
+                )
+    return _writer
+
+
+@receiver(setting_changed)
+def reset_activity_writer(setting, **kwargs):
+    global _writer
+    if setting == 'ACTIVITY_LOG_WRITER' and _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+@atexit.register
+def _flush_on_exit():
+    if _writer is not None:
+        _writer.stop()
+
+
+def log_activity(board_id, user, activity_type, description, metadata=None):
+    """Registra una entrada de actividad cuando se confirme la transacción en curso"""
+    entry = ActivityLog(
+        board_id=board_id,
+        user_id=user.pk,
+        activity_type=activity_type,
+        description=description,
+        metadata=metadata or {},
+    )
+    transaction.on_commit(lambda: get_activity_writer().submit(entry))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog
+from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog, BoardChange, BoardAccess
 
 
 @admin.register(Profile)
@@ -16,7 +16,7 @@ class BoardAdmin(admin.ModelAdmin):
 
 @admin.register(List)
 class ListAdmin(admin.ModelAdmin):
-    list_display = ['title', 'board', 'position']
+    list_display = ['title', 'board', 'rank']
     list_filter = ['board']
 
 
@@ -49,7 +49,13 @@ class ActivityLogAdmin(admin.ModelAdmin):
     list_filter = ['activity_type', 'created_at']
 
 
+@admin.register(BoardChange)
+class BoardChangeAdmin(admin.ModelAdmin):
+    list_display = ['board', 'revision', 'entity', 'entity_id', 'action', 'created_at']
+    list_filter = ['entity', 'action']
 
 
-
-
+@admin.register(BoardAccess)
+class BoardAccessAdmin(admin.ModelAdmin):
+    list_display = ['user', 'board', 'reason', 'created_at']
+    list_filter = ['reason']
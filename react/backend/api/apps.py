@@ -5,6 +5,11 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import schema  # noqa: F401
+        from . import metrics  # noqa: F401
+
 
 
 
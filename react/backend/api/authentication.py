@@ -0,0 +1,203 @@
+"""
+Autenticación JWT con caché de usuarios en el proceso.
+
+Los tokens llevan, además de ``user_id``, el rol del usuario (``role``) y la
+versión de sus credenciales (``ver``, copia de ``Profile.token_version``).
+``CachedJWTAuthentication`` no consulta la base de datos en cada petición: toma
+el usuario (con su perfil) de una caché LRU con TTL y solo lo carga, en una única
+consulta, cuando no está en caché, expiró o el token trae una versión distinta.
+Cada petición recibe una copia del usuario y del perfil, con el rol del claim.
+
+Incrementar la versión (``bump_token_version``) invalida todos los tokens del
+usuario. Ocurre al cambiar la contraseña (incluido ``reset_password.py``), al
+desactivar la cuenta o al cambiar de rol. En el proceso que hace el cambio la
+entrada de la caché se descarta al momento; los demás procesos pueden aceptar
+tokens antiguos hasta que expire su entrada (``JWT_USER_CACHE['TTL']``).
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Profile
+
+ROLE_CLAIM = 'role'
+VERSION_CLAIM = 'ver'
+
+DEFAULTS = {
+    'MAX_SIZE': 1024,
+    'TTL': 60,
+}
+
+
+class UserCache:
+    """
+    LRU con TTL de usuarios (con su perfil precargado) indexada por id. Las claves
+    se guardan como texto porque así viaja ``user_id`` en los claims.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return detached_copy(user)
+
+    def set(self, user):
+        key = str(user.pk)
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def detached_copy(user):
+    """
+    Copia del usuario con su propio estado y su propia copia del perfil: lo que
+    haga una vista con ``request.user`` o ``request.user.profile`` no toca la caché.
+    """
+    clone = copy.copy(user)
+    clone._state = copy.copy(user._state)
+    clone._state.fields_cache = {}
+    if User.profile.is_cached(user):
+        profile = User.profile.related.get_cached_value(user)
+        if profile is not None:
+            profile = copy.copy(profile)
+            profile._state = copy.copy(profile._state)
+            profile._state.fields_cache = {}
+            Profile.user.field.set_cached_value(profile, clone)
+        User.profile.related.set_cached_value(clone, profile)
+    return clone
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                options = {**DEFAULTS, **getattr(settings, 'JWT_USER_CACHE', {})}
+                _user_cache = UserCache(max_size=options['MAX_SIZE'], ttl=options['TTL'])
+    return _user_cache
+
+
+@receiver(setting_changed)
+def reset_user_cache(setting, **kwargs):
+    global _user_cache
+    if setting == 'JWT_USER_CACHE':
+        _user_cache = None
+
+
+def token_version(user):
+    """Versión de credenciales del usuario (0 si no tiene perfil)"""
+    try:
+        return user.profile.token_version
+    except Profile.DoesNotExist:
+        return 0
+
+
+def invalidate_cached_user(user_id):
+    get_user_cache().invalidate(user_id)
+    # Una lectura concurrente pudo volver a cachear la versión anterior antes del commit
+    transaction.on_commit(lambda: get_user_cache().invalidate(user_id))
+
+
+def bump_token_version(user):
+    """Invalida todos los tokens emitidos para el usuario"""
+    Profile.objects.filter(user_id=user.pk).update(token_version=F('token_version') + 1)
+    profile = getattr(user, 'profile', None) if User.profile.is_cached(user) else None
+    if profile is not None:
+        # Mantiene al día el perfil en memoria para que un save() posterior no revierta la versión
+        profile.token_version += 1
+    invalidate_cached_user(user.pk)
+
+
+class KanbanTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        profile = getattr(user, 'profile', None)
+        token[ROLE_CLAIM] = profile.role if profile else None
+        token[VERSION_CLAIM] = token_version(user)
+        return token
+
+
+class KanbanTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # El access token nuevo copia los claims del refresh: se rechaza si la versión ya no es válida
+        refresh = RefreshToken(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        current = Profile.objects.filter(user_id=user_id).values_list('token_version', flat=True).first() or 0
+        if refresh.payload.get(VERSION_CLAIM, 0) != current:
+            raise InvalidToken(_('Token is invalid'))
+        return super().validate(attrs)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` que obtiene el usuario de ``UserCache``"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+        version = validated_token.get(VERSION_CLAIM, 0)
+
+        cache = get_user_cache()
+        user = cache.get(user_id)
+        if user is None or token_version(user) < version:
+            # Sin caché o con una versión anterior a la del token: usuario y perfil en una sola consulta
+            user = User.objects.select_related('profile').filter(pk=user_id).first()
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cache.set(user)
+            user = detached_copy(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if token_version(user) != version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        # Cambiar de rol sube la versión: con la versión vigente el claim es el rol actual
+        role = validated_token.get(ROLE_CLAIM)
+        profile = User.profile.related.get_cached_value(user, default=None)
+        if role and profile is not None:
+            profile.role = role
+        return user
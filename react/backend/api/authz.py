@@ -0,0 +1,104 @@
+"""
+Contexto de autorización por petición.
+
+Los permisos y los ``get_queryset`` de las vistas consultan el rol del usuario y
+los tableros a los que tiene acceso varias veces en una misma petición.
+``get_authz(request)`` los resuelve una sola vez y los guarda en la petición; las
+comprobaciones de propiedad se hacen con los ids que ya traen los objetos
+(``list.board_id``, ``card.list.board_id``) en lugar de cargar las relaciones.
+"""
+from functools import cached_property
+
+from .models import Board, Profile, BoardAccess
+from .revisions import board_id_for
+
+
+class AuthzContext:
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def role(self):
+        if not getattr(self.user, 'is_authenticated', False):
+            return None
+        try:
+            return self.user.profile.role
+        except Profile.DoesNotExist:
+            return None
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+    @cached_property
+    def owned_board_ids(self):
+        """Tableros de los que el usuario es docente"""
+        if not self.is_teacher:
+            return frozenset()
+        return frozenset(Board.objects.filter(teacher_id=self.user.pk).values_list('id', flat=True))
+
+    @cached_property
+    def visible_board_ids(self):
+        """Tableros visibles según el rol; ``None`` si no hay restricción"""
+        if self.is_teacher:
+            return self.owned_board_ids
+        if self.is_student:
+            return frozenset(BoardAccess.objects.filter(user_id=self.user.pk).values_list('board_id', flat=True))
+        return None
+
+    def visible_board_filter(self):
+        """
+        Valores para ``board_id__in``: los ids ya cargados en esta petición o, si aún
+        no se cargaron, una subconsulta que evita una ida extra a la base de datos.
+        ``None`` si no hay restricción.
+        """
+        if 'visible_board_ids' in self.__dict__ or self.role not in ('teacher', 'student'):
+            return self.visible_board_ids
+        if self.is_teacher:
+            return Board.objects.filter(teacher_id=self.user.pk).values('id')
+        return BoardAccess.objects.filter(user_id=self.user.pk).values('board_id')
+
+    def boards(self):
+        queryset = Board.objects.all()
+        if self.is_teacher:
+            return queryset.filter(teacher_id=self.user.pk)
+        board_ids = self.visible_board_filter()
+        if board_ids is None:
+            return queryset
+        return queryset.filter(pk__in=board_ids)
+
+    def owns(self, obj):
+        """Indica si el usuario es el docente del tablero al que pertenece ``obj``"""
+        board = cached_board(obj)
+        if board is not None:
+            return board.teacher_id == self.user.pk
+        return board_id_for(obj) in self.owned_board_ids
+
+    def can_view_board(self, board_id):
+        return self.visible_board_ids is None or board_id in self.visible_board_ids
+
+
+def cached_board(obj):
+    """Tablero de ``obj`` si ya está en memoria (p. ej. por ``select_related``), o ``None``"""
+    for name in ('card', 'list', 'board'):
+        descriptor = getattr(type(obj), name, None)
+        if hasattr(descriptor, 'is_cached'):
+            if not descriptor.is_cached(obj):
+                return None
+            obj = getattr(obj, name)
+    return obj if isinstance(obj, Board) else None
+
+
+def get_authz(request):
+    """Contexto de autorización de la petición, creado en el primer uso"""
+    # Se guarda en la HttpRequest subyacente para compartirlo entre la Request de DRF y la vista
+    http_request = getattr(request, '_request', request)
+    authz = getattr(http_request, '_authz', None)
+    if authz is None or authz.user is not request.user:
+        authz = AuthzContext(request.user)
+        http_request._authz = authz
+    return authz
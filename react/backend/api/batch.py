@@ -0,0 +1,207 @@
+"""
+Cambios en lote sobre tarjetas (``POST /api/cards/batch/``).
+
+Reordenar una columna cambia la posición de varias tarjetas a la vez. Con un PATCH
+por tarjeta cada una se valida, se guarda, se recarga y registra su propia
+actividad. ``apply_card_batch`` carga las tarjetas, listas, usuarios y etiquetas
+implicados con una consulta por tipo, comprueba los permisos en memoria y guarda
+todo con ``bulk_update`` en una sola transacción. Por cada tablero registra las
+revisiones con un solo UPDATE y publica un evento y una entrada de actividad.
+
+``position`` es el índice de destino dentro de la lista. Las claves de orden
+(``api.ranking``) se calculan en memoria a partir de las claves de las listas de
+destino, leídas con una sola consulta: cada tarjeta movida cambia solo su propia
+fila, sin renumerar a sus hermanas.
+
+Si mover muchas tarjetas al mismo hueco fuese a alargar una clave más allá de
+``RANK_MAX_LENGTH`` se reespacia en memoria la lista de destino completa y se
+guardan también las hermanas que cambian de clave.
+
+``bulk_update`` no emite señales: aquí se sincroniza el acceso por asignación, se
+ajustan los contadores de ``BoardSummary`` con las tarjetas movidas y se invalida
+el snapshot de los tableros afectados.
+"""
+from bisect import insort
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from .access import sync_assignment_access
+from .activity import log_activity
+from .models import List, Card, Label
+from .ranking import RANK_MAX_LENGTH, rank_between_ranks, respread_ranks, schedule_rebalance
+from .realtime import publish_board_event
+from .revisions import record_changes
+from .snapshots import invalidate_board_snapshot
+from .summaries import count_card_moves
+
+# Un estudiante solo puede mover y reordenar sus propias tarjetas
+STUDENT_FIELDS = {'id', 'list', 'position'}
+
+
+def can_change(authz, card, operation):
+    if authz.is_teacher:
+        return authz.owns(card)
+    if authz.is_student:
+        return card.assigned_to_id == authz.user.pk and set(operation) <= STUDENT_FIELDS
+    return False
+
+
+def check_references(operations, cards):
+    """Errores por índice de operación para listas, usuarios y etiquetas que no corresponden"""
+    list_ids = {operation['list'] for operation in operations if 'list' in operation}
+    user_ids = {operation['assigned_to_id'] for operation in operations if operation.get('assigned_to_id')}
+    label_ids = {label_id for operation in operations for label_id in operation.get('label_ids', ())}
+    list_boards = dict(List.objects.filter(pk__in=list_ids).values_list('id', 'board_id')) if list_ids else {}
+    users = set(User.objects.filter(pk__in=user_ids).values_list('id', flat=True)) if user_ids else set()
+    label_boards = dict(Label.objects.filter(pk__in=label_ids).values_list('id', 'board_id')) if label_ids else {}
+
+    errors = {}
+    for index, operation in enumerate(operations):
+        board_id = cards[operation['id']].list.board_id
+        if 'list' in operation and list_boards.get(operation['list']) != board_id:
+            errors[index] = 'La lista no existe o no pertenece al tablero de la tarjeta.'
+        elif operation.get('assigned_to_id') and operation['assigned_to_id'] not in users:
+            errors[index] = 'El usuario asignado no existe.'
+        elif any(label_boards.get(label_id) != board_id for label_id in operation.get('label_ids', ())):
+            errors[index] = 'Las etiquetas deben pertenecer al tablero de la tarjeta.'
+    return errors
+
+
+def place_cards(operations, cards):
+    """
+    Asigna ``rank`` a las tarjetas que cambian de posición o de lista, aplicando
+    las operaciones en orden. Devuelve ``({list_id: (board_id, clave más larga)},
+    [(board_id, card_id, clave)])``: las listas de destino y las tarjetas fuera del
+    lote que cambiaron de clave al reespaciar una lista.
+    """
+    placed = [
+        operation for operation in operations
+        if 'position' in operation or operation.get('list', cards[operation['id']].list_id) != cards[operation['id']].list_id
+    ]
+    if not placed:
+        return {}, []
+    siblings = defaultdict(list)
+    destinations = {operation.get('list', cards[operation['id']].list_id) for operation in placed}
+    for list_id, card_id, rank in (
+        Card.objects.filter(list_id__in=destinations).order_by('rank', 'id').values_list('list_id', 'id', 'rank')
+    ):
+        siblings[list_id].append((rank, card_id))
+
+    boards = {}
+    shifted = {}
+    for operation in placed:
+        card = cards[operation['id']]
+        if card.list_id in siblings:
+            siblings[card.list_id].remove((card.rank, card.pk))
+        list_id = operation.get('list', card.list_id)
+        boards[list_id] = card.list.board_id
+        entries = siblings[list_id]
+        ranks = [rank for rank, _ in entries]
+        position = operation.get('position', len(entries))
+        card.rank = rank_between_ranks(ranks, position)
+        if len(card.rank) > RANK_MAX_LENGTH:
+            card.rank, ranks = respread_ranks(ranks, position)
+            entries[:] = [(rank, card_id) for rank, (_, card_id) in zip(ranks, entries)]
+            for rank, card_id in entries:
+                if card_id in cards:
+                    cards[card_id].rank = rank
+                else:
+                    shifted[card_id] = (boards[list_id], card_id, rank)
+        insort(entries, (card.rank, card.pk))
+
+    long_ranks = {
+        list_id: (board_id, max((rank for rank, _ in siblings[list_id]), key=len))
+        for list_id, board_id in boards.items()
+    }
+    return long_ranks, list(shifted.values())
+
+
+def apply_card_batch(authz, operations):
+    """
+    Aplica ``operations`` (validadas con ``CardBatchSerializer``) en nombre de
+    ``authz.user``. Devuelve ``(ids, {board_id: revisión})``. Lanza
+    ``ValidationError`` o ``PermissionDenied`` sin haber escrito nada.
+    """
+    with transaction.atomic():
+        cards = {
+            card.pk: card
+            for card in Card.objects.select_related('list').select_for_update(of=('self',))
+            .filter(pk__in=[operation['id'] for operation in operations])
+        }
+        missing = {
+            index: 'Tarjeta no encontrada.'
+            for index, operation in enumerate(operations)
+            if operation['id'] not in cards or not authz.can_view_board(cards[operation['id']].list.board_id)
+        }
+        if missing:
+            raise ValidationError({'operations': missing})
+        forbidden = [operation['id'] for operation in operations if not can_change(authz, cards[operation['id']], operation)]
+        if forbidden:
+            raise PermissionDenied(f'No tienes permiso para modificar las tarjetas {forbidden}.')
+        errors = check_references(operations, cards)
+        if errors:
+            raise ValidationError({'operations': errors})
+
+        long_ranks, shifted = place_cards(operations, cards)
+        now = timezone.now()
+        fields = {'updated_at', 'rank'} if long_ranks else {'updated_at'}
+        by_board = defaultdict(list)
+        moves = []
+        assignment_pairs = set()
+        new_labels = {}
+        for operation in operations:
+            card = cards[operation['id']]
+            board_id = card.list.board_id
+            by_board[board_id].append(card.pk)
+            if 'list' in operation and operation['list'] != card.list_id:
+                moves.append({'card_id': card.pk, 'old_list_id': card.list_id, 'new_list_id': operation['list']})
+                card.list_id = operation['list']
+                fields.add('list')
+            if 'assigned_to_id' in operation and operation['assigned_to_id'] != card.assigned_to_id:
+                assignment_pairs.update({(card.assigned_to_id, board_id), (operation['assigned_to_id'], board_id)})
+                card.assigned_to_id = operation['assigned_to_id']
+                fields.add('assigned_to')
+            if 'label_ids' in operation:
+                new_labels[card.pk] = operation['label_ids']
+            card.updated_at = now
+
+        Card.objects.bulk_update(cards.values(), sorted(fields), batch_size=500)
+        if shifted:
+            Card.objects.bulk_update(
+                [Card(pk=card_id, rank=rank) for _, card_id, rank in shifted], ['rank'], batch_size=500
+            )
+        if new_labels:
+            CardLabel = Card.labels.through
+            CardLabel.objects.filter(card_id__in=new_labels).delete()
+            CardLabel.objects.bulk_create([
+                CardLabel(card_id=card_id, label_id=label_id)
+                for card_id, label_ids in new_labels.items()
+                for label_id in dict.fromkeys(label_ids)
+            ])
+        sync_assignment_access(assignment_pairs)
+        count_card_moves((move['old_list_id'], move['new_list_id']) for move in moves)
+        for list_id, (board_id, rank) in long_ranks.items():
+            schedule_rebalance(rank, Card.objects.filter(list_id=list_id), board_id, 'card')
+
+        # Si solo cambió la ubicación de las tarjetas la actividad se registra como movimiento
+        only_moves = bool(moves) and fields <= {'updated_at', 'list', 'rank'} and not new_labels
+        revisions = {}
+        for board_id, card_ids in by_board.items():
+            changed = card_ids + [card_id for shifted_board, card_id, _ in shifted if shifted_board == board_id]
+            revision = record_changes(board_id, [('card', card_id, 'updated') for card_id in changed])
+            revisions[board_id] = revision
+            invalidate_board_snapshot(board_id)
+            board_moves = [move for move in moves if move['card_id'] in card_ids]
+            publish_board_event(board_id, 'card.batch_updated', {'ids': card_ids, 'revision': revision})
+            log_activity(
+                board_id=board_id,
+                user=authz.user,
+                activity_type='card_moved' if only_moves else 'card_updated',
+                description=f"{len(card_ids)} tarjetas actualizadas en lote",
+                metadata={'card_ids': card_ids, 'moves': board_moves},
+            )
+    return list(cards), revisions
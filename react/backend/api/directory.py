@@ -0,0 +1,77 @@
+"""
+Autocompletado del directorio de usuarios.
+
+``UserSearchKey`` guarda una fila por palabra normalizada (minúsculas y sin tildes,
+como en ``api.search``) del nombre de usuario, el nombre, los apellidos y la parte
+local del correo de cada usuario. Buscar un prefijo es un rango sobre el índice
+``(key, user)``: ``key >= 'mar' AND key < 'mas'``. A diferencia de ``icontains`` o
+``LIKE`` no depende de la intercalación del motor, y como las filas salen del
+índice ya ordenadas la consulta se detiene al llegar al límite, sin importar
+cuántos usuarios coincidan.
+
+Con varias palabras, la más larga recorre el índice y las demás filtran por los
+usuarios de su propio rango, una subconsulta no correlacionada que el motor
+resuelve una sola vez: 'jose nu' encuentra a 'José Núñez'.
+
+Las señales (``api.signals``) regeneran las claves al crear un usuario o cambiar
+alguno de esos campos. Las escrituras que no emiten señales (``bulk_create``)
+deben llamar a ``index_users``.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import UserSearchKey
+from .search import TERM, fold
+
+# Campos de User que forman las claves
+KEY_FIELDS = ('username', 'email', 'first_name', 'last_name')
+KEY_LENGTH = UserSearchKey._meta.get_field('key').max_length
+MAX_TERMS = 4
+
+
+def user_keys(username='', email='', first_name='', last_name=''):
+    """Palabras normalizadas de un usuario; del correo solo cuenta la parte local"""
+    text = ' '.join([username, email.partition('@')[0], first_name, last_name])
+    return {term[:KEY_LENGTH] for term in TERM.findall(fold(text))}
+
+
+def index_users(users):
+    """Reescribe las claves de ``users`` (objetos ``User`` con los campos de ``KEY_FIELDS``)"""
+    users = list(users)
+    if not users:
+        return
+    with transaction.atomic():
+        UserSearchKey.objects.filter(user_id__in=[user.pk for user in users]).delete()
+        UserSearchKey.objects.bulk_create(
+            [
+                UserSearchKey(user_id=user.pk, key=key)
+                for user in users
+                for key in sorted(user_keys(*(getattr(user, field) for field in KEY_FIELDS)))
+            ],
+            batch_size=1000,
+        )
+
+
+def prefix_range(prefix):
+    """Lookups del rango de claves que empiezan por ``prefix``"""
+    return {'key__gte': prefix, 'key__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+
+def autocomplete_users(query, role=None, limit=10):
+    """
+    Hasta ``limit`` usuarios cuyas palabras empiezan por cada palabra de ``query``,
+    en orden alfabético de la clave que coincidió. Con ``role`` solo los de ese rol.
+    Dos consultas: las claves y los usuarios.
+    """
+    terms = sorted(dict.fromkeys(TERM.findall(fold(query))), key=len, reverse=True)[:MAX_TERMS]
+    if not terms:
+        return []
+    keys = UserSearchKey.objects.filter(**prefix_range(terms[0]))
+    for term in terms[1:]:
+        keys = keys.filter(user_id__in=UserSearchKey.objects.filter(**prefix_range(term)).values('user_id'))
+    if role:
+        keys = keys.filter(user__profile__role=role)
+    # Un usuario puede coincidir con varias claves: se piden filas de más y se descartan repetidos
+    user_ids = list(dict.fromkeys(keys.order_by('key', 'user_id').values_list('user_id', flat=True)[:limit * 4]))
+    users = User.objects.in_bulk(user_ids[:limit])
+    return [users[user_id] for user_id in user_ids[:limit] if user_id in users]
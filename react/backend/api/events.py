@@ -0,0 +1,71 @@
+"""
+Stream Server-Sent Events con los cambios en vivo de un tablero.
+
+La vista es asíncrona: bajo ASGI cada pestaña abierta es una conexión en reposo
+que no ocupa un worker mientras espera eventos. ``EventSource`` no permite
+cabeceras propias, así que el token JWT se acepta también como ``?token=``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication
+from .permissions import visible_boards
+from .middleware import compression_exempt
+from .realtime import get_broker, board_channel, format_sse
+
+KEEPALIVE_SECONDS = getattr(settings, 'SSE_KEEPALIVE_SECONDS', 15)
+
+
+def authenticate_stream_request(request):
+    """Autentica con la cabecera Authorization o, en su defecto, con ``?token=``"""
+    authentication = CachedJWTAuthentication()
+    raw_token = request.GET.get('token')
+    if raw_token:
+        validated_token = authentication.get_validated_token(raw_token.encode())
+        return authentication.get_user(validated_token)
+    result = authentication.authenticate(request)
+    return result[0] if result else None
+
+
+def get_stream_board(request, pk):
+    user = authenticate_stream_request(request)
+    if user is None:
+        return None, None
+    board = visible_boards(user).filter(pk=pk).values('id', 'revision').first()
+    return user, board
+
+
+@compression_exempt
+async def board_events(request, pk):
+    try:
+        user, board = await sync_to_async(get_stream_board)(request, pk)
+    except AuthenticationFailed as exc:
+        detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        return JsonResponse(detail, status=401)
+    if user is None:
+        return JsonResponse({'detail': 'Las credenciales de autenticación no se proveyeron.'}, status=401)
+    if board is None:
+        return JsonResponse({'detail': 'No encontrado.'}, status=404)
+
+    async def stream():
+        async with get_broker().subscribe(board_channel(board['id'])) as queue:
+            # Revisión actual: el cliente la compara con la suya y, si va atrasado,
+            # se pone al día con /changes/?since=
+            yield format_sse({'type': 'ready', 'board': board['id'], 'revision': board['revision']})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que nginx u otros proxies acumulen el stream en buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,105 @@
+"""
+Exportación de un tablero en CSV o NDJSON.
+
+Los generadores recorren la base de datos con ``QuerySet.iterator(chunk_size=...)``
+y entregan la salida por bloques, así que la memoria usada no depende del tamaño
+del tablero. ``streaming_response`` envía cada bloque a medida que se genera,
+también bajo ASGI.
+
+CSV tiene una sola tabla por archivo (tarjetas o actividad); NDJSON puede llevar
+ambas en el mismo stream, distinguidas por el campo ``type`` de cada línea.
+"""
+import csv
+import io
+from itertools import islice
+
+from .renderers import json_dumps
+
+EXPORT_CHUNK_SIZE = 1000
+
+CARD_COLUMNS = [
+    'id', 'list', 'rank', 'title', 'description', 'assigned_to', 'due_date', 'labels',
+    'checklist_completed', 'checklist_total', 'comment_count', 'created_at', 'updated_at',
+]
+ACTIVITY_COLUMNS = ['id', 'created_at', 'user', 'activity_type', 'description', 'metadata']
+
+# Prefijos que las hojas de cálculo interpretan como fórmula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def card_record(card):
+    """Fila de exportación de una tarjeta anotada como en ``card_summary_queryset``"""
+    return {
+        'id': card.id,
+        'list': card.list.title,
+        'rank': card.rank,
+        'title': card.title,
+        'description': card.description,
+        'assigned_to': card.assigned_to.username if card.assigned_to else None,
+        'due_date': card.due_date,
+        'labels': [label.name for label in card.labels.all()],
+        'checklist_completed': card.checklist_completed,
+        'checklist_total': card.checklist_total,
+        'comment_count': card.comment_count,
+        'created_at': card.created_at,
+        'updated_at': card.updated_at,
+    }
+
+
+def activity_record(log):
+    return {
+        'id': log.id,
+        'created_at': log.created_at,
+        'user': log.user.username,
+        'activity_type': log.activity_type,
+        'description': log.description,
+        'metadata': log.metadata,
+    }
+
+
+def iter_records(queryset, to_record, chunk_size=None):
+    """Bloques de registros de ``queryset`` leídos con un cursor de ``chunk_size`` filas"""
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield [to_record(row) for row in chunk]
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        value = '; '.join(str(item) for item in value)
+    elif isinstance(value, dict):
+        value = json_dumps(value).decode()
+    elif hasattr(value, 'isoformat'):
+        return value.isoformat()
+    elif not isinstance(value, str):
+        return value
+    # Texto escrito por usuarios: se neutralizan las fórmulas al abrirlo en Excel
+    return f"'{value}" if value.startswith(FORMULA_PREFIXES) else value
+
+
+def stream_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM para que Excel reconozca el UTF-8 (acentos y eñes)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows([csv_value(record[column]) for column in columns] for record in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_ndjson(sections):
+    """``sections`` es una secuencia de ``(tipo, bloques)``; cada registro es una línea"""
+    for record_type, chunks in sections:
+        for chunk in chunks:
+            yield b''.join(json_dumps({'type': record_type, **record}) + b'\n' for record in chunk)
@@ -0,0 +1,274 @@
+"""
+Importación masiva de estudiantes, listas y tarjetas en un tablero.
+
+Los datos llegan como JSON (``{'students': [...], 'lists': [...], 'cards': [...]}``)
+o como un CSV por sección con los nombres de campo en la cabecera. El CSV de
+tarjetas admite el mismo formato que exporta ``api.exports``.
+
+``import_board`` valida todas las filas antes de escribir. Si alguna falla lanza
+``BoardImportError`` con los errores de cada fila y no escribe nada. Si no,
+inserta todo con ``bulk_create`` en una sola transacción:
+
+- Los estudiantes que no existen se crean y los existentes solo se agregan como
+  miembros, con inserciones directas en ``Board.students.through``.
+- Las listas y etiquetas que nombran las tarjetas y aún no existen se crean.
+
+``bulk_create`` no emite señales, así que aquí se actualizan ``BoardAccess``, los
+contadores de ``BoardSummary``, los índices de búsqueda, la caché del snapshot y la
+revisión del tablero (un cambio por entidad creada), y se registra una sola
+entrada de actividad con el resumen.
+"""
+import csv
+import io
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+
+from .access import MEMBER, ASSIGNED, grant_access
+from .activity import log_activity
+from .exports import FORMULA_PREFIXES
+from .models import Profile, Board, List, Card, Label
+from .directory import index_users
+from .ranking import key_between, spread_keys
+from .realtime import publish_board_event
+from .revisions import record_changes
+from .search import index_cards
+from .serializers import StudentImportSerializer, ListImportSerializer, CardImportSerializer
+from .snapshots import invalidate_board_snapshot
+from .summaries import adjust_summary, card_count_deltas
+
+MAX_ROWS = 10000
+BATCH_SIZE = 1000
+
+SECTIONS = {
+    'students': StudentImportSerializer,
+    'lists': ListImportSerializer,
+    'cards': CardImportSerializer,
+}
+
+
+class BoardImportError(Exception):
+    """Filas inválidas: ``errors`` es una lista de ``{'section', 'row', 'errors'}``"""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} errores de importación')
+        self.errors = errors
+
+
+def read_csv(content):
+    """
+    Filas de un CSV (texto o bytes UTF-8). Las celdas vacías se omiten, ``labels``
+    se separa por ``;`` y se quita la comilla con la que la exportación neutraliza
+    las fórmulas.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    content = content.removeprefix('\ufeff')
+    rows = []
+    for raw in csv.DictReader(io.StringIO(content)):
+        row = {}
+        for key, value in raw.items():
+            if not key or not isinstance(value, str) or not value.strip():
+                continue
+            value = value.strip()
+            if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+                value = value[1:]
+            row[key.strip()] = value
+        if 'labels' in row:
+            row['labels'] = [label.strip() for label in row['labels'].split(';') if label.strip()]
+        if row:
+            rows.append(row)
+    return rows
+
+
+def validate_rows(data):
+    """Valida el formato de cada fila; devuelve las filas validadas por sección"""
+    total = sum(len(data.get(section) or ()) for section in SECTIONS)
+    if total > MAX_ROWS:
+        raise BoardImportError([{'section': None, 'row': None, 'errors': [f'Se admiten como máximo {MAX_ROWS} filas']}])
+
+    errors = []
+    validated = {}
+    for section, serializer_class in SECTIONS.items():
+        rows = data.get(section) or []
+        validated[section] = []
+        if not isinstance(rows, list):
+            errors.append({'section': section, 'row': None, 'errors': ['Debe ser una lista de filas']})
+            continue
+        for index, row in enumerate(rows, start=1):
+            serializer = serializer_class(data=row)
+            if serializer.is_valid():
+                validated[section].append(serializer.validated_data)
+            else:
+                errors.append({'section': section, 'row': index, 'errors': serializer.errors})
+    if errors:
+        raise BoardImportError(errors)
+    return validated
+
+
+def import_board(board, data, user, default_password=None):
+    """
+    Importa ``data`` en ``board`` en nombre de ``user`` y devuelve un resumen de lo
+    creado. Los estudiantes nuevos sin contraseña propia reciben
+    ``default_password`` (se calcula un solo hash para todos) o, si no se indica,
+    una contraseña inutilizable que deberán restablecer.
+    """
+    rows = validate_rows(data)
+    errors = []
+
+    def error(section, index, message):
+        errors.append({'section': section, 'row': index, 'errors': [message]})
+
+    # Usuarios referenciados, en una sola consulta
+    usernames = {row['username'] for row in rows['students']}
+    usernames.update(row['assigned_to'] for row in rows['cards'] if row.get('assigned_to'))
+    existing_users = {
+        username: (user_id, role)
+        for username, user_id, role in User.objects.filter(username__in=usernames)
+        .values_list('username', 'id', 'profile__role')
+    }
+
+    repeated = {username for username, count in Counter(row['username'] for row in rows['students']).items() if count > 1}
+    new_students = []
+    for index, row in enumerate(rows['students'], start=1):
+        username = row['username']
+        if username in repeated:
+            error('students', index, f"El usuario '{username}' está repetido")
+        elif username in existing_users and existing_users[username][1] != 'student':
+            error('students', index, f"El usuario '{username}' existe y no es estudiante")
+        elif username not in existing_users:
+            new_students.append(row)
+    new_usernames = {row['username'] for row in new_students}
+
+    for index, row in enumerate(rows['cards'], start=1):
+        username = row.get('assigned_to')
+        if username and username not in new_usernames and existing_users.get(username, (None, None))[1] != 'student':
+            error('cards', index, f"'{username}' no es un estudiante existente ni importado")
+    if errors:
+        raise BoardImportError(errors)
+
+    existing_lists = {}
+    for list_id, title in board.lists.order_by('-rank', '-id').values_list('id', 'title'):
+        existing_lists[title] = list_id  # Con títulos repetidos gana la primera lista del tablero
+    existing_labels = dict(board.labels.values_list('name', 'id'))
+
+    with transaction.atomic():
+        # Estudiantes
+        if default_password:
+            default_password = make_password(default_password)
+        created_users = User.objects.bulk_create(
+            [
+                User(
+                    username=row['username'],
+                    email=row.get('email', ''),
+                    first_name=row.get('first_name', ''),
+                    last_name=row.get('last_name', ''),
+                    password=make_password(row['password']) if row.get('password') else (
+                        default_password or make_password(None)
+                    ),
+                )
+                for row in new_students
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        Profile.objects.bulk_create(
+            [Profile(user=created, role='student') for created in created_users], batch_size=BATCH_SIZE
+        )
+        index_users(created_users)
+        user_ids = {username: user_id for username, (user_id, _) in existing_users.items()}
+        user_ids.update((created.username, created.pk) for created in created_users)
+
+        Membership = Board.students.through
+        members = set(Membership.objects.filter(board_id=board.id).values_list('user_id', flat=True))
+        new_members = sorted({user_ids[row['username']] for row in rows['students']} - members)
+        Membership.objects.bulk_create(
+            [Membership(board_id=board.id, user_id=user_id) for user_id in new_members],
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        grant_access((user_id, board.id, MEMBER) for user_id in new_members)
+
+        # Listas: las de las filas y las que nombran las tarjetas, si no existen, al final del tablero
+        states = {row['title']: row['state'] for row in rows['lists'] if row.get('state')}
+        titles = [row['title'] for row in rows['lists']] + [row['list'] for row in rows['cards']]
+        titles = [title for title in dict.fromkeys(titles) if title not in existing_lists]
+        last_list_rank = board.lists.aggregate(top=Max('rank'))['top'] or None
+        new_lists = {
+            title: List(board=board, title=title, state=states.get(title, 'pending'), rank=rank)
+            for title, rank in zip(titles, spread_keys(len(titles), after=last_list_rank))
+        }
+        created_lists = List.objects.bulk_create(new_lists.values(), batch_size=BATCH_SIZE)
+        list_ids = {**existing_lists, **{created.title: created.pk for created in created_lists}}
+
+        # Etiquetas nombradas por las tarjetas
+        label_names = dict.fromkeys(name for row in rows['cards'] for name in row.get('labels', ()))
+        created_labels = Label.objects.bulk_create(
+            [Label(board=board, name=name) for name in label_names if name not in existing_labels],
+            batch_size=BATCH_SIZE,
+        )
+        label_ids = {**existing_labels, **{created.name: created.pk for created in created_labels}}
+
+        # Tarjetas, al final de su lista en el orden de las filas
+        last_card_rank = dict(
+            Card.objects.filter(list_id__in=list_ids.values())
+            .order_by().values('list_id').annotate(top=Max('rank')).values_list('list_id', 'top')
+        )
+        cards = []
+        for row in rows['cards']:
+            list_id = list_ids[row['list']]
+            last_card_rank[list_id] = key_between(last_card_rank.get(list_id) or None, None)
+            cards.append(Card(
+                list_id=list_id,
+                title=row['title'],
+                description=row.get('description', ''),
+                assigned_to_id=user_ids[row['assigned_to']] if row.get('assigned_to') else None,
+                due_date=row.get('due_date'),
+                rank=last_card_rank[list_id],
+            ))
+        created_cards = Card.objects.bulk_create(cards, batch_size=BATCH_SIZE)
+        Card.labels.through.objects.bulk_create(
+            [
+                Card.labels.through(card_id=card.pk, label_id=label_ids[name])
+                for card, row in zip(created_cards, rows['cards'])
+                for name in dict.fromkeys(row.get('labels', ()))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        grant_access({(card.assigned_to_id, board.id, ASSIGNED) for card in created_cards if card.assigned_to_id})
+        adjust_summary(
+            board.id,
+            members=len(new_members),
+            cards=card_count_deltas((None, card.list_id) for card in created_cards).get(board.id),
+        )
+        index_cards(card.pk for card in created_cards)
+
+        changes = [('list', created.pk, 'created') for created in created_lists]
+        changes += [('label', created.pk, 'created') for created in created_labels]
+        changes += [('card', created.pk, 'created') for created in created_cards]
+        if new_members:
+            changes.append(('board', board.id, 'updated'))
+        revision = record_changes(board.id, changes)
+        invalidate_board_snapshot(board.id)
+
+        summary = {
+            'students_created': len(created_users),
+            'students_added': len(new_members),
+            'lists_created': len(created_lists),
+            'labels_created': len(created_labels),
+            'cards_created': len(created_cards),
+        }
+        if changes:
+            log_activity(
+                board_id=board.id,
+                user=user,
+                activity_type='board_imported',
+                description=(
+                    f"Importación: {summary['students_added']} estudiantes, "
+                    f"{summary['lists_created']} listas y {summary['cards_created']} tarjetas"
+                ),
+                metadata=summary,
+            )
+            publish_board_event(board.id, 'board.imported', {'revision': revision, **summary})
+    return {**summary, 'revision': revision if revision is not None else board.revision}
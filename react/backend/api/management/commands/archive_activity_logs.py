@@ -0,0 +1,81 @@
+"""
+Archiva los meses antiguos del historial de actividad.
+
+Cada mes anterior a la retención (``ACTIVITY_LOG_RETENTION_MONTHS``) se exporta a
+``activity_YYYY_MM.ndjson.gz`` y después se elimina su partición (PostgreSQL) o su
+rango de filas (SQLite). En PostgreSQL además crea por adelantado las particiones
+de los próximos meses, por lo que conviene programarlo al menos una vez al mes.
+
+Ejecutar: python manage.py archive_activity_logs [--output-dir DIR] [--dry-run]
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from api.partitions import get_partition_backend, retention_cutoff, month_start, add_months
+
+
+class Command(BaseCommand):
+    help = 'Exporta a NDJSON comprimido y elimina los meses de actividad fuera de la retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default=getattr(settings, 'ACTIVITY_LOG_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'activity'),
+            help='Directorio donde se guardan los archivos exportados',
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='Meses futuros cuya partición se crea por adelantado (solo PostgreSQL)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Muestra qué meses se archivarían sin exportar ni borrar nada',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_partition_backend()
+        output_dir = Path(options['output_dir'])
+        dry_run = options['dry_run']
+
+        current = month_start(timezone.now())
+        for offset in range(options['ahead'] + 1):
+            start = add_months(current, offset)
+            if not dry_run and backend.ensure_partition(start):
+                self.stdout.write(f'Partición creada para {start:%Y-%m}')
+
+        cutoff = retention_cutoff()
+        expired = [start for start in backend.partitions() if start < cutoff]
+        if not expired:
+            self.stdout.write('No hay meses fuera de la retención')
+            return
+
+        if not dry_run:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        for start in expired:
+            path = output_dir / f'activity_{start:%Y_%m}.ndjson.gz'
+            if dry_run:
+                self.stdout.write(f'Se archivaría {start:%Y-%m} en {path}')
+                continue
+            exported = self.export(backend.rows(start), path)
+            dropped = backend.drop_partition(start)
+            self.stdout.write(self.style.SUCCESS(
+                f'{start:%Y-%m}: {exported} entradas exportadas a {path}, {dropped} eliminadas'
+            ))
+
+    def export(self, rows, path):
+        """Escribe las filas en un archivo temporal y lo renombra al terminar"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        count = 0
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                count += 1
+        os.replace(tmp_path, path)
+        return count
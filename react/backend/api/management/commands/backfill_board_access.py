@@ -0,0 +1,28 @@
+"""
+Reconstruye la tabla de visibilidad ``BoardAccess`` desde los miembros de cada
+tablero y las tarjetas asignadas. Útil tras importar datos con escrituras que no
+emiten señales; para corregir desvíos puntuales basta ``check_board_access --fix``.
+
+Ejecutar: python manage.py backfill_board_access
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.access import expected_access
+from api.models import BoardAccess
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de visibilidad de tableros para estudiantes'
+
+    def handle(self, *args, **options):
+        entries = expected_access()
+        with transaction.atomic():
+            deleted, _ = BoardAccess.objects.all().delete()
+            BoardAccess.objects.bulk_create(
+                [BoardAccess(user_id=user_id, board_id=board_id, reason=reason) for user_id, board_id, reason in entries],
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(entries)} filas de acceso creadas ({deleted} anteriores eliminadas)'
+        ))
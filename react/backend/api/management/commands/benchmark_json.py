@@ -0,0 +1,92 @@
+"""
+Compara el renderer y el parser JSON de DRF con ``FastJSONRenderer`` y
+``FastJSONParser`` sobre un snapshot sintético de tablero (tarjetas con fechas,
+``Decimal`` y ``UUID``). No toca la base de datos.
+
+Ejecutar: python manage.py benchmark_json [--cards 1000] [--iterations 20]
+"""
+import datetime
+import io
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.renderers import FastJSONRenderer, FastJSONParser
+
+
+def synthetic_snapshot(cards):
+    """Estructura equivalente a ``build_board_snapshot`` con ``cards`` tarjetas repartidas en tres listas"""
+    now = timezone.now()
+    lists = [
+        {'id': idx + 1, 'title': title, 'position': idx, 'created_at': now, 'cards': []}
+        for idx, title in enumerate(['Pendiente', 'En Progreso', 'Completada'])
+    ]
+    for idx in range(cards):
+        lists[idx % len(lists)]['cards'].append({
+            'id': idx + 1,
+            'uuid': uuid.uuid4(),
+            'title': f'Tarea {idx}',
+            'description': 'Resolver los ejercicios del capítulo ' * 3,
+            'position': idx,
+            'grade': Decimal('8.75'),
+            'due_date': (now + datetime.timedelta(days=idx % 30)).date(),
+            'created_at': now,
+            'updated_at': now,
+            'assigned_to': {'id': idx % 40, 'username': f'estudiante{idx % 40}'},
+            'labels': [{'id': 1, 'name': 'Examen', 'color': '#ff0000'}],
+            'comments': [
+                {'id': idx * 2 + n, 'author': 'docente', 'content': 'Revisar el paso 2', 'created_at': now}
+                for n in range(2)
+            ],
+            'checklist_items': [
+                {'id': idx * 3 + n, 'text': f'Paso {n}', 'is_completed': n == 0, 'position': n}
+                for n in range(3)
+            ],
+        })
+    return {'id': 1, 'name': 'Tablero de prueba', 'created_at': now, 'lists': lists}
+
+
+def timed(func, iterations):
+    """Mejor tiempo de ``iterations`` ejecuciones, en milisegundos"""
+    best = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compara la velocidad del renderer/parser JSON de DRF con los de api.renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=1000, help='Tarjetas del snapshot sintético')
+        parser.add_argument('--iterations', type=int, default=20, help='Repeticiones por medición')
+
+    def handle(self, *args, **options):
+        data = synthetic_snapshot(options['cards'])
+        iterations = max(1, options['iterations'])
+        context = {'encoding': 'utf-8'}
+
+        base_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        base_parser, fast_parser = JSONParser(), FastJSONParser()
+        body = base_renderer.render(data)
+
+        results = [
+            ('render', timed(lambda: base_renderer.render(data), iterations),
+             timed(lambda: fast_renderer.render(data), iterations)),
+            ('parse', timed(lambda: base_parser.parse(io.BytesIO(body), parser_context=context), iterations),
+             timed(lambda: fast_parser.parse(io.BytesIO(body), parser_context=context), iterations)),
+        ]
+
+        backend = 'orjson' if renderers.orjson is not None else 'json (sin orjson)'
+        self.stdout.write(f"{options['cards']} tarjetas, {len(body) / 1024:.0f} KB, mejor de {iterations}; rápido: {backend}")
+        for name, base, fast in results:
+            self.stdout.write(f'{name:<7} DRF {base:8.2f} ms   rápido {fast:8.2f} ms   x{base / fast:.1f}')
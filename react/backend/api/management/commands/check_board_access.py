@@ -0,0 +1,34 @@
+"""
+Compara la tabla de visibilidad ``BoardAccess`` con los miembros y las tarjetas
+asignadas de cada tablero. Termina con error si encuentra diferencias, así que
+puede programarse como verificación periódica; con ``--fix`` las corrige.
+
+Ejecutar: python manage.py check_board_access [--fix]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.access import access_differences, repair_access
+
+
+class Command(BaseCommand):
+    help = 'Verifica (y opcionalmente corrige) la tabla de visibilidad de tableros'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Crea las filas faltantes y elimina las sobrantes')
+
+    def handle(self, *args, **options):
+        missing, extra = access_differences()
+        if not missing and not extra:
+            self.stdout.write(self.style.SUCCESS('La tabla de acceso está sincronizada'))
+            return
+        for user_id, board_id, reason in sorted(missing):
+            self.stdout.write(f'Falta: usuario {user_id} -> tablero {board_id} ({reason})')
+        for user_id, board_id, reason in sorted(extra):
+            self.stdout.write(f'Sobra: usuario {user_id} -> tablero {board_id} ({reason})')
+        if options['fix']:
+            repair_access(missing, extra)
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(missing)} filas creadas y {len(extra)} eliminadas'
+            ))
+            return
+        raise CommandError(f'{len(missing)} filas faltantes y {len(extra)} sobrantes')
@@ -0,0 +1,70 @@
+"""
+Importa estudiantes, listas y tarjetas en un tablero existente o en uno nuevo.
+
+Los datos pueden venir de un JSON con las secciones ``students``, ``lists`` y
+``cards`` o de un CSV por sección. Todo se valida antes de escribir y se inserta
+en una sola transacción; si hay errores se listan por fila y no se guarda nada.
+
+Ejecutar:
+    python manage.py import_board --board 3 --students alumnos.csv --cards tareas.csv
+    python manage.py import_board --teacher docente1 --name "Física 2025" --json datos.json \
+        --default-password cambiar123
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.imports import SECTIONS, BoardImportError, import_board, read_csv
+from api.models import Board
+
+
+class Command(BaseCommand):
+    help = 'Importa estudiantes, listas y tarjetas desde CSV o JSON en un tablero'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--board', type=int, help='Id del tablero existente')
+        target.add_argument('--name', help='Nombre del tablero a crear (requiere --teacher)')
+        parser.add_argument('--teacher', help='Usuario docente del tablero nuevo')
+        parser.add_argument('--json', help='Archivo JSON con las secciones students, lists y cards')
+        for section in SECTIONS:
+            parser.add_argument(f'--{section}', help=f'Archivo CSV de la sección {section}')
+        parser.add_argument('--default-password', help='Contraseña inicial de los estudiantes nuevos')
+
+    def handle(self, *args, **options):
+        data = {}
+        if options['json']:
+            with open(options['json'], encoding='utf-8') as fh:
+                data = json.load(fh)
+        for section in SECTIONS:
+            if options[section]:
+                with open(options[section], 'rb') as fh:
+                    data[section] = read_csv(fh.read())
+        if not any(data.get(section) for section in SECTIONS):
+            raise CommandError('No hay datos que importar: usa --json o algún CSV por sección')
+
+        with transaction.atomic():
+            if options['board']:
+                board = Board.objects.select_related('teacher').filter(pk=options['board']).first()
+                if board is None:
+                    raise CommandError(f"No existe el tablero {options['board']}")
+            else:
+                teacher = User.objects.filter(username=options['teacher'], profile__role='teacher').first()
+                if teacher is None:
+                    raise CommandError('--name requiere --teacher con un usuario docente existente')
+                board = Board.objects.create(name=options['name'], teacher=teacher)
+            try:
+                summary = import_board(board, data, board.teacher, default_password=options['default_password'])
+            except BoardImportError as exc:
+                for item in exc.errors:
+                    row = f" fila {item['row']}" if item['row'] else ''
+                    self.stderr.write(f"{item['section'] or 'datos'}{row}: {item['errors']}")
+                raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Tablero {board.id}: {summary['students_created']} estudiantes creados, "
+            f"{summary['students_added']} agregados, {summary['lists_created']} listas, "
+            f"{summary['labels_created']} etiquetas y {summary['cards_created']} tarjetas"
+        ))
@@ -0,0 +1,61 @@
+"""
+Rebalancea las claves de orden (``rank``) de listas y tarjetas.
+
+Las inserciones repetidas en el mismo hueco alargan las claves y dos inserciones
+concurrentes pueden dejar claves repetidas. Este comando busca los grupos de
+hermanos (listas de un tablero, tarjetas de una lista) con alguna clave más larga
+que ``--max-length`` o con claves repetidas, y los vuelve a espaciar conservando
+el orden. Conviene programarlo periódicamente, p. ej. una vez al día.
+
+Ejecutar: python manage.py rebalance_ranks [--max-length N] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import Length
+
+from api.models import List, Card
+from api.ranking import REBALANCE_LENGTH, rebalance
+
+
+def groups_to_rebalance(model, parent_field, board_lookup, max_length):
+    """``{parent_id: board_id}`` de los grupos con claves largas o repetidas"""
+    parent_id = f'{parent_field}_id'
+    groups = dict(
+        model.objects.annotate(rank_length=Length('rank')).filter(rank_length__gt=max_length)
+        .order_by().values_list(parent_id, board_lookup).distinct()
+    )
+    groups.update(
+        model.objects.order_by().values(parent_id, 'rank').annotate(repeated=Count('id'))
+        .filter(repeated__gt=1).values_list(parent_id, board_lookup).distinct()
+    )
+    return groups
+
+
+class Command(BaseCommand):
+    help = 'Vuelve a espaciar las claves de orden de listas y tarjetas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-length', type=int, default=REBALANCE_LENGTH,
+            help='Rebalancea los grupos con alguna clave más larga que este valor',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Muestra qué grupos se rebalancearían sin modificar nada',
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            ('list', 'tablero', List, 'board', 'board_id'),
+            ('card', 'lista', Card, 'list', 'list__board_id'),
+        ]
+        for entity, parent_name, model, parent_field, board_lookup in targets:
+            groups = groups_to_rebalance(model, parent_field, board_lookup, options['max_length'])
+            for parent_id, board_id in sorted(groups.items()):
+                if options['dry_run']:
+                    self.stdout.write(f'Se rebalancearía {entity}: {parent_name} {parent_id}')
+                    continue
+                updated = rebalance(model.objects.filter(**{parent_field: parent_id}), board_id, entity)
+                self.stdout.write(f'{entity}: {parent_name} {parent_id}, {updated} claves reescritas')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Claves de orden rebalanceadas'))
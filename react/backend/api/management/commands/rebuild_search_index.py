@@ -0,0 +1,18 @@
+"""
+Reconstruye el índice de búsqueda de tarjetas (``api_card_search``) desde las
+tarjetas, sus comentarios y sus items de checklist. Útil tras escrituras que no
+emiten señales, como un ``QuerySet.update`` sobre títulos o descripciones.
+
+Ejecutar: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from api.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de tarjetas'
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'{total} tarjetas indexadas'))
@@ -0,0 +1,21 @@
+"""
+Recalcula los contadores de ``BoardSummary`` (miembros y tarjetas por etapa)
+desde las tablas de origen y crea los resúmenes que falten. Útil tras escrituras
+que no emiten señales, como un ``QuerySet.update`` sobre tarjetas o listas.
+
+Ejecutar: python manage.py refresh_board_summaries [--board ID ...]
+"""
+from django.core.management.base import BaseCommand
+
+from api.summaries import refresh_board_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del listado de tableros'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, action='append', dest='boards', help='Solo este tablero (repetible)')
+
+    def handle(self, *args, **options):
+        fixed = refresh_board_summaries(options['boards'])
+        self.stdout.write(self.style.SUCCESS(f'{fixed} resúmenes corregidos'))
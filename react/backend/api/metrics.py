@@ -0,0 +1,286 @@
+"""
+Métricas por vista en formato de texto de Prometheus.
+
+``api.middleware.MetricsMiddleware`` mide cada petición y la atribuye a su vista
+(``CardViewSet.list``, ``board_events``...): latencia, número y tiempo de las
+consultas a la base de datos, tiempo de serialización y bytes de la respuesta.
+Si una vista supera su presupuesto de consultas se registra una advertencia en
+el logger ``api.metrics``: así una regresión N+1 se ve antes de llegar a producción.
+
+Las consultas se cuentan con un solo ``execute_wrapper`` instalado en cada
+conexión al crearla, que suma en las métricas de la petición en curso (una
+``ContextVar``): funciona igual con vistas síncronas y asíncronas, y fuera de una
+petición no hace nada más que leer la variable.
+
+Las métricas viven en memoria del proceso y se exponen en ``/api/metrics/``,
+protegido con el token de ``REQUEST_METRICS['TOKEN']`` (``Authorization: Bearer``)
+o con un usuario staff autenticado por JWT. Con varios procesos cada uno expone
+las suyas: Prometheus debe consultarlos por separado.
+
+En las respuestas streaming solo se mide hasta que la vista devuelve la
+respuesta; lo que se genere después no cuenta.
+
+Configuración en ``settings.REQUEST_METRICS`` (ver ``DEFAULTS``).
+"""
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Token para Prometheus; sin token solo pueden leer los usuarios staff
+    'TOKEN': '',
+    # Consultas por petición a partir de las cuales se registra una advertencia
+    'QUERY_BUDGET': 50,
+    # Presupuestos por vista, p. ej. {'BoardViewSet.retrieve': 10}
+    'QUERY_BUDGETS': {},
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels):
+        self.name, self.help_text, self.labels = name, help_text, labels
+        self.values = {}
+
+    def inc(self, label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield f'{self.name}{format_labels(self.labels, label_values)} {format_value(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name, self.help_text, self.labels, self.buckets = name, help_text, labels, buckets
+        # label_values -> [conteo por cubeta (la última es +Inf), suma]
+        self.values = {}
+
+    def observe(self, label_values, value):
+        state = self.values.get(label_values)
+        if state is None:
+            state = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self):
+        for label_values, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{format_labels(self.labels, label_values, le)} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, label_values)} {format_value(total)}'
+            yield f'{self.name}_count{format_labels(self.labels, label_values)} {cumulative}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            'kanban_http_requests_total', 'Peticiones atendidas por vista, método y código de estado',
+            ('view', 'method', 'status'),
+        )
+        self.latency = Histogram(
+            'kanban_http_request_duration_seconds', 'Latencia de las peticiones por vista',
+            ('view', 'method'), LATENCY_BUCKETS,
+        )
+        self.queries = Histogram(
+            'kanban_db_queries_per_request', 'Consultas a la base de datos por petición',
+            ('view',), QUERY_BUCKETS,
+        )
+        self.query_time = Histogram(
+            'kanban_db_query_duration_seconds', 'Tiempo en consultas a la base de datos por petición',
+            ('view',), LATENCY_BUCKETS,
+        )
+        self.serializer_time = Histogram(
+            'kanban_serializer_duration_seconds', 'Tiempo de serialización por petición',
+            ('view',), LATENCY_BUCKETS,
+        )
+        self.response_size = Histogram(
+            'kanban_http_response_size_bytes', 'Tamaño del cuerpo de las respuestas no streaming',
+            ('view',), SIZE_BUCKETS,
+        )
+        self.over_budget = Counter(
+            'kanban_query_budget_exceeded_total', 'Peticiones que superaron el presupuesto de consultas',
+            ('view',),
+        )
+        self.metrics = [
+            self.requests, self.latency, self.queries, self.query_time,
+            self.serializer_time, self.response_size, self.over_budget,
+        ]
+
+    def record(self, request_metrics, method, status, size, over_budget):
+        view = request_metrics.view
+        with self.lock:
+            self.requests.inc((view, method, str(status)))
+            self.latency.observe((view, method), request_metrics.duration)
+            self.queries.observe((view,), request_metrics.query_count)
+            self.query_time.observe((view,), request_metrics.query_time)
+            self.serializer_time.observe((view,), request_metrics.serializer_time)
+            if size is not None:
+                self.response_size.observe((view,), size)
+            if over_budget:
+                self.over_budget.inc((view,))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Lo medido durante una petición"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.view = 'unmatched'
+        self.query_count = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+current_request = ContextVar('current_request_metrics', default=None)
+
+
+def view_name(view_func, method):
+    """``Clase.acción`` para las vistas de DRF; el nombre de la función en otro caso"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.query_count += 1
+        metrics.query_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='api.metrics.install_query_recorder')
+
+
+class serializer_timer:
+    """
+    Suma a la petición en curso el tiempo de la serialización más externa: los
+    serializers anidados no se cuentan dos veces.
+    """
+    __slots__ = ('metrics', 'started')
+
+    def __enter__(self):
+        self.metrics = current_request.get()
+        if self.metrics is not None:
+            self.metrics.serializer_depth += 1
+            if self.metrics.serializer_depth == 1:
+                self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            self.metrics.serializer_depth -= 1
+            if self.metrics.serializer_depth == 0:
+                self.metrics.serializer_time += time.perf_counter() - self.started
+
+
+def query_budget(view, options):
+    return options['QUERY_BUDGETS'].get(view, options['QUERY_BUDGET'])
+
+
+def finish_request(request_metrics, request, response, options):
+    """Registra lo medido en una petición y avisa si superó su presupuesto de consultas"""
+    request_metrics.duration = time.perf_counter() - request_metrics.started
+    budget = query_budget(request_metrics.view, options)
+    over_budget = budget is not None and request_metrics.query_count > budget
+    if over_budget:
+        logger.warning(
+            '%s %s (%s) hizo %d consultas; el presupuesto es %d',
+            request.method, request.path, request_metrics.view, request_metrics.query_count, budget,
+        )
+    size = None if response.streaming else len(response.content)
+    registry.record(request_metrics, request.method, response.status_code, size, over_budget)
+
+
+def metrics_allowed(request, options):
+    """Token de Prometheus o usuario staff autenticado por JWT"""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, credentials = header.partition(' ')
+    token = options['TOKEN']
+    if token and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+        return True
+    from .authentication import CachedJWTAuthentication
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def metrics_view(request):
+    options = get_options()
+    if not metrics_allowed(request, options):
+        return JsonResponse({'detail': 'No tienes permiso para ver las métricas.'}, status=403)
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,154 @@
+"""
+Middleware de la API.
+
+``CompressionMiddleware`` comprime las respuestas según ``Accept-Encoding``:
+Brotli si el cliente lo acepta y el paquete ``brotli`` está instalado, y gzip en
+otro caso. Solo comprime tipos de contenido textuales (JSON, CSV, NDJSON...) por
+encima de un tamaño mínimo. Los streams SSE (``text/event-stream``) y las vistas
+marcadas con ``@compression_exempt`` no se comprimen: el buffer del compresor
+retrasaría cada evento hasta acumular suficientes datos.
+
+Configuración en ``settings.RESPONSE_COMPRESSION`` (ver ``DEFAULTS``).
+
+``MetricsMiddleware`` mide cada petición para ``/api/metrics/`` (ver
+``api.metrics``). Va el primero de ``MIDDLEWARE`` para que la latencia incluya
+al resto y el tamaño sea el de la respuesta ya comprimida.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+DEFAULTS = {
+    # Bytes mínimos del cuerpo para comprimir una respuesta no streaming
+    'MIN_LENGTH': 1024,
+    'CONTENT_TYPES': (
+        'application/json',
+        'application/x-ndjson',
+        'application/javascript',
+        'text/csv',
+        'text/html',
+        'text/plain',
+    ),
+    'BROTLI': True,
+    'BROTLI_QUALITY': 5,
+}
+
+UNCOMPRESSED_CONTENT_TYPES = ('text/event-stream',)
+
+
+def compression_exempt(view_func):
+    """Marca una vista (síncrona o asíncrona) cuyas respuestas nunca deben comprimirse"""
+    view_func.compression_exempt = True
+    return view_func
+
+
+def accepted_encodings(header):
+    """Codificaciones aceptadas en ``Accept-Encoding`` (las de ``q=0`` se excluyen)"""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(name)
+    return accepted
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """``GZipMiddleware`` con negociación de Brotli, umbral configurable y exclusiones"""
+
+    @property
+    def options(self):
+        return {**DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'compression_exempt', False):
+            request._compression_exempt = True
+
+    def should_compress(self, request, response):
+        if getattr(request, '_compression_exempt', False) or response.has_header('Content-Encoding'):
+            return False
+        options = self.options
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type in UNCOMPRESSED_CONTENT_TYPES or content_type not in options['CONTENT_TYPES']:
+            return False
+        return response.streaming or len(response.content) >= options['MIN_LENGTH']
+
+    def process_response(self, request, response):
+        if not self.should_compress(request, response):
+            return response
+
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if 'br' in encodings and brotli is not None and self.options['BROTLI'] and not response.streaming:
+            return self.brotli_response(response)
+        if 'gzip' not in encodings:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        return super().process_response(request, response)
+
+    def brotli_response(self, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=self.options['BROTLI_QUALITY'])
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Latencia, consultas, serialización y tamaño por vista; síncrono y asíncrono"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request_metrics = metrics.current_request.get()
+        if request_metrics is not None:
+            request_metrics.view = metrics.view_name(view_func, request.method)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        options = metrics.get_options()
+        if not options['ENABLED']:
+            return self.get_response(request)
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        metrics.finish_request(request_metrics, request, response, options)
+        return response
+
+    async def __acall__(self, request):
+        options = metrics.get_options()
+        if not options['ENABLED']:
+            return await self.get_response(request)
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        metrics.finish_request(request_metrics, request, response, options)
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_board_color_board_students'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BoardChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveBigIntegerField()),
+                ('entity', models.CharField(choices=[('board', 'Tablero'), ('list', 'Lista'), ('card', 'Tarjeta'), ('label', 'Etiqueta'), ('comment', 'Comentario'), ('checklist_item', 'Item de checklist')], max_length=20)),
+                ('entity_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Creado'), ('updated', 'Actualizado'), ('deleted', 'Eliminado')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='api.board')),
+            ],
+            options={
+                'ordering': ['revision'],
+                'constraints': [models.UniqueConstraint(fields=('board', 'revision'), name='unique_board_change_revision')],
+            },
+        ),
+    ]
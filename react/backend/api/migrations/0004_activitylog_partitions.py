@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+PARTITIONS_AHEAD = 3
+
+
+def partition_activitylog(apps, schema_editor):
+    """
+    En PostgreSQL convierte api_activitylog en una tabla particionada por mes de
+    created_at. La clave primaria pasa a ser (id, created_at), como exige el
+    particionado; Django sigue usando id para localizar filas. En otros motores
+    no hace nada: el historial usa la estrategia de ventana móvil.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('api', 'ActivityLog')._meta.db_table
+    legacy = f'{table}_legacy'
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+    execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)')
+    execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_board_id_fk FOREIGN KEY (board_id) '
+        'REFERENCES api_board (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_fk FOREIGN KEY (user_id) '
+        f'REFERENCES {apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table} (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    execute(f'CREATE INDEX {table}_board_id_idx ON {table} (board_id)')
+    execute(f'CREATE INDEX {table}_user_id_idx ON {table} (user_id)')
+    execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    # Una partición por cada mes con datos y por los próximos meses
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') FROM " + legacy + " "
+            "UNION SELECT date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => n) "
+            "FROM generate_series(0, %s) AS n",
+            [PARTITIONS_AHEAD],
+        )
+        months = sorted(row[0] for row in cursor.fetchall())
+    for start in months:
+        execute(
+            f'CREATE TABLE {table}_y{start.year:04d}m{start.month:02d} PARTITION OF {table} '
+            "FOR VALUES FROM (%s::timestamp AT TIME ZONE 'UTC') "
+            "TO ((%s::timestamp + interval '1 month') AT TIME ZONE 'UTC')",
+            [start, start],
+        )
+
+    execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+    execute(f'DROP TABLE {legacy}')
+    execute(f'CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+    execute(f"SELECT setval('{table}_id_seq', COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_board_revision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activitylog, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['created_at'], name='activitylog_created_idx'),
+        ),
+    ]
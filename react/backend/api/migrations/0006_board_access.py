@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_board_access(apps, schema_editor):
+    """Carga la visibilidad actual: miembros de cada tablero y asignados de sus tarjetas"""
+    Board = apps.get_model('api', 'Board')
+    Card = apps.get_model('api', 'Card')
+    BoardAccess = apps.get_model('api', 'BoardAccess')
+    entries = [
+        BoardAccess(user_id=user_id, board_id=board_id, reason='member')
+        for board_id, user_id in Board.students.through.objects.values_list('board_id', 'user_id')
+    ]
+    entries += [
+        BoardAccess(user_id=user_id, board_id=board_id, reason='assigned')
+        for user_id, board_id in Card.objects.filter(assigned_to__isnull=False)
+        .order_by().values_list('assigned_to_id', 'list__board_id').distinct()
+    ]
+    BoardAccess.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_query_shape_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('member', 'Miembro'), ('assigned', 'Tarea asignada')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_entries', to='api.board')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='board_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'board', 'reason'), name='unique_board_access')],
+            },
+        ),
+        migrations.RunPython(backfill_board_access, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_profile_token_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='activity_type',
+            field=models.CharField(choices=[('card_created', 'Tarjeta creada'), ('card_updated', 'Tarjeta actualizada'), ('card_deleted', 'Tarjeta eliminada'), ('card_moved', 'Tarjeta movida'), ('card_assigned', 'Tarjeta asignada'), ('comment_added', 'Comentario agregado'), ('checklist_item_added', 'Item de checklist agregado'), ('checklist_item_completed', 'Item de checklist completado'), ('board_created', 'Tablero creado'), ('board_updated', 'Tablero actualizado'), ('list_created', 'Lista creada'), ('list_updated', 'Lista actualizada'), ('board_imported', 'Importación masiva')], max_length=30),
+        ),
+    ]
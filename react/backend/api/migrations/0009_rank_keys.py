@@ -0,0 +1,102 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+# Copia de api.ranking al momento de la migración: parte entera de 6 dígitos en
+# base 36, claves espaciadas 36**2
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+STEP = 36 ** 2
+
+
+def encode_integer(value):
+    digits = []
+    for _ in range(6):
+        value, digit = divmod(value, 36)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits))
+
+
+def fill_ranks(model, parent_field):
+    """Claves en el orden actual (position, created_at, id) dentro de cada padre"""
+    rows = model.objects.order_by(parent_field, 'position', 'created_at', 'id').only('pk', parent_field)
+    items = []
+    for _, siblings in groupby(rows.iterator(chunk_size=2000), key=lambda item: getattr(item, f'{parent_field}_id')):
+        for index, item in enumerate(siblings, start=1):
+            item.rank = encode_integer(STEP * index)
+            items.append(item)
+        if len(items) >= 2000:
+            model.objects.bulk_update(items, ['rank'])
+            items = []
+    model.objects.bulk_update(items, ['rank'])
+
+
+def positions_to_ranks(apps, schema_editor):
+    fill_ranks(apps.get_model('api', 'List'), 'board')
+    fill_ranks(apps.get_model('api', 'Card'), 'list')
+
+
+def ranks_to_positions(apps, schema_editor):
+    for model_name, parent_field in (('List', 'board'), ('Card', 'list')):
+        model = apps.get_model('api', model_name)
+        rows = model.objects.order_by(parent_field, 'rank', 'id').only('pk', parent_field)
+        items = []
+        for _, siblings in groupby(rows, key=lambda item: getattr(item, f'{parent_field}_id')):
+            for index, item in enumerate(siblings):
+                item.position = index
+                items.append(item)
+        model.objects.bulk_update(items, ['position'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_activitylog_board_imported'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='rank',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='rank',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(positions_to_ranks, ranks_to_positions),
+        migrations.RemoveIndex(
+            model_name='card',
+            name='card_list_order_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='list',
+            name='list_board_order_idx',
+        ),
+        migrations.AlterModelOptions(
+            name='card',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='list',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.RemoveField(
+            model_name='card',
+            name='position',
+        ),
+        migrations.RemoveField(
+            model_name='list',
+            name='position',
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['list', 'rank', 'id'], name='card_list_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['board', 'rank', 'id'], name='list_board_rank_idx'),
+        ),
+    ]
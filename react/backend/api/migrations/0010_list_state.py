@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+def states_from_titles(apps, schema_editor):
+    """
+    Deduce la etapa de las listas existentes por su título, como hacía el filtro
+    ``?status=``; las que no coinciden quedan como pendientes.
+    """
+    List = apps.get_model('api', 'List')
+    List.objects.filter(title__icontains='progreso').update(state='in_progress')
+    List.objects.filter(title__icontains='complet').update(state='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_rank_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('in_progress', 'En progreso'), ('done', 'Completada')], default='pending', max_length=12),
+        ),
+        migrations.RunPython(states_from_titles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['board', 'state'], name='list_board_state_idx'),
+        ),
+    ]
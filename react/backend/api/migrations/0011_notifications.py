@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_list_state'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationInbox',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_inbox', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('read_cursor', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.CharField(choices=[('card_created', 'Tarjeta creada'), ('card_updated', 'Tarjeta actualizada'), ('card_deleted', 'Tarjeta eliminada'), ('card_moved', 'Tarjeta movida'), ('card_assigned', 'Tarjeta asignada'), ('comment_added', 'Comentario agregado'), ('checklist_item_added', 'Item de checklist agregado'), ('checklist_item_completed', 'Item de checklist completado'), ('board_created', 'Tablero creado'), ('board_updated', 'Tablero actualizado'), ('list_created', 'Lista creada'), ('list_updated', 'Lista actualizada'), ('board_imported', 'Importación masiva')], max_length=30)),
+                ('description', models.TextField()),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='api.board')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['recipient', 'id'], name='notification_inbox_idx'), models.Index(condition=models.Q(('is_read', False)), fields=['recipient', 'id'], name='notification_unread_idx')],
+            },
+        ),
+    ]
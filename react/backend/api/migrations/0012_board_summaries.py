@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+COUNT_FIELDS = {'pending': 'pending_count', 'in_progress': 'in_progress_count', 'done': 'done_count'}
+
+
+def build_summaries(apps, schema_editor):
+    """Un resumen por tablero con los contadores calculados desde las tablas de origen"""
+    Board = apps.get_model('api', 'Board')
+    Card = apps.get_model('api', 'Card')
+    BoardChange = apps.get_model('api', 'BoardChange')
+    BoardSummary = apps.get_model('api', 'BoardSummary')
+
+    last_change = dict(
+        BoardChange.objects.order_by().values('board_id').annotate(last=Max('created_at')).values_list('board_id', 'last')
+    )
+    summaries = {
+        board_id: BoardSummary(board_id=board_id, member_count=members, last_activity_at=last_change.get(board_id, updated_at))
+        for board_id, members, updated_at in Board.objects.order_by().annotate(members=Count('students'))
+        .values_list('id', 'members', 'updated_at')
+    }
+    for board_id, state, total in (
+        Card.objects.order_by().values_list('list__board_id', 'list__state').annotate(total=Count('id'))
+    ):
+        setattr(summaries[board_id], COUNT_FIELDS[state], total)
+    BoardSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardSummary',
+            fields=[
+                ('board', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.board')),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('in_progress_count', models.PositiveIntegerField(default=0)),
+                ('done_count', models.PositiveIntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
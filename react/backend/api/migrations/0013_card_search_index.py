@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:30
+
+import unicodedata
+from collections import defaultdict
+
+from django.db import migrations
+
+# Copia de api.search al momento de la migración
+TABLE = 'api_card_search'
+SEARCH_CONFIG = 'spanish'
+
+
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def create_search_index(apps, schema_editor):
+    """Crea el índice de búsqueda del motor activo e indexa las tarjetas existentes"""
+    Card = apps.get_model('api', 'Card')
+    Comment = apps.get_model('api', 'Comment')
+    ChecklistItem = apps.get_model('api', 'ChecklistItem')
+    postgres = schema_editor.connection.vendor == 'postgresql'
+
+    if postgres:
+        schema_editor.execute(
+            f'CREATE TABLE {TABLE} (card_id bigint PRIMARY KEY REFERENCES {Card._meta.db_table} (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)'
+        )
+        schema_editor.execute(f'CREATE INDEX {TABLE}_document_idx ON {TABLE} USING gin (document)')
+        document = ' || '.join(f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), '{weight}')" for weight in 'ABCD')
+        insert = f'INSERT INTO {TABLE} (card_id, document) VALUES (%s, {document})'
+    else:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {TABLE} USING fts5('
+            "title, description, comments, checklist, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        insert = f'INSERT INTO {TABLE} (rowid, title, description, comments, checklist) VALUES (%s, %s, %s, %s, %s)'
+
+    comments = defaultdict(list)
+    for card_id, content in Comment.objects.order_by('id').values_list('card_id', 'content').iterator():
+        comments[card_id].append(content)
+    checklist = defaultdict(list)
+    for card_id, text in ChecklistItem.objects.order_by('id').values_list('card_id', 'text').iterator():
+        checklist[card_id].append(text)
+    documents = []
+    for card_id, title, description in Card.objects.order_by('id').values_list('id', 'title', 'description').iterator():
+        texts = [title, description, '\n'.join(comments[card_id]), '\n'.join(checklist[card_id])]
+        if postgres:
+            texts = [fold(text) for text in texts]
+        documents.append((card_id, *texts))
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, len(documents), 1000):
+            cursor.executemany(insert, documents[start:start + 1000])
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_board_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:22
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Copia de api.directory al momento de la migración
+TERM = re.compile(r'\w+')
+
+
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def index_existing_users(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserSearchKey = apps.get_model('api', 'UserSearchKey')
+    keys = []
+    for user_id, username, email, first_name, last_name in (
+        User.objects.order_by('pk').values_list('pk', 'username', 'email', 'first_name', 'last_name').iterator()
+    ):
+        text = ' '.join([username, email.partition('@')[0], first_name, last_name])
+        keys.extend(UserSearchKey(user_id=user_id, key=key) for key in sorted({term[:150] for term in TERM.findall(fold(text))}))
+        if len(keys) >= 2000:
+            UserSearchKey.objects.bulk_create(keys)
+            keys = []
+    UserSearchKey.objects.bulk_create(keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_card_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='search_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'key'], name='usersearchkey_user_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('key', 'user'), name='unique_user_search_key')],
+            },
+        ),
+        migrations.RunPython(index_existing_users, migrations.RunPython.noop),
+    ]
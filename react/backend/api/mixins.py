@@ -0,0 +1,137 @@
+"""
+Mixins reutilizables para los viewsets de la API.
+"""
+import hashlib
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max, Sum
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .renderers import iter_json_array
+
+
+async def iterate_in_thread(iterator):
+    """
+    Recorre un iterador síncrono desde código asíncrono, un bloque cada vez. Los
+    bloques se generan en el hilo de las vistas síncronas de la petición
+    (``thread_sensitive``), el mismo que abrió el cursor de la base de datos.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while (chunk := await next_chunk(iterator, done)) is not done:
+        yield chunk
+
+
+def streaming_response(request, content, **kwargs):
+    """
+    ``StreamingHttpResponse`` que envía ``content`` a medida que se genera. Bajo
+    ASGI Django consume entero un iterador síncrono antes de enviarlo, así que se
+    entrega como iterador asíncrono.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = iterate_in_thread(iter(content))
+    return StreamingHttpResponse(content, **kwargs)
+
+
+class ConditionalGetMixin:
+    """``304 Not Modified`` para ``list`` y ``retrieve`` sin instanciar serializers"""
+    # El validador sale de una sola consulta de agregación sobre el mismo queryset
+    # filtrado que usaría la respuesta: el ``updated_at`` máximo, el número de filas
+    # y, si el recurso anida datos de su tablero, la suma de las revisiones de los
+    # tableros implicados (cualquier escritura en el tablero la incrementa).
+    #
+    # ``conditional_sum_fields`` agrega al validador la suma de otras columnas o
+    # anotaciones del queryset, para datos que cambian sin que cambie la revisión.
+    #
+    # ``Last-Modified`` solo se envía en el detalle: en un listado el máximo
+    # ``updated_at`` no refleja las eliminaciones, que sí quedan cubiertas por el ETag.
+    conditional_timestamp_field = 'updated_at'
+    conditional_revision_field = None
+    conditional_sum_fields = ()
+
+    def get_conditional_validators(self):
+        """Devuelve ``(etag, last_modified)`` o ``None`` si no hay datos que validar"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        is_detail = lookup_url_kwarg in self.kwargs
+        if is_detail:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        aggregates = {
+            'last_modified': Max(self.conditional_timestamp_field),
+            'count': Count('pk'),
+        }
+        if self.conditional_revision_field:
+            aggregates['revision'] = Sum(self.conditional_revision_field)
+        for field in self.conditional_sum_fields:
+            aggregates[f'sum_{field}'] = Sum(field)
+        values = queryset.order_by().aggregate(**aggregates)
+        if is_detail and not values['count']:
+            # Que el flujo normal resuelva el 404 o el 403
+            return None
+
+        last_modified = values['last_modified']
+        parts = [
+            self.request.user.pk,
+            self.request.get_full_path(),
+            last_modified.isoformat() if last_modified else '',
+            values['count'],
+            values.get('revision') or 0,
+            *(values[f'sum_{field}'] or 0 for field in self.conditional_sum_fields),
+        ]
+        digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False)
+        etag = f'"{digest.hexdigest()}"'
+        if is_detail and last_modified:
+            return etag, int(last_modified.timestamp())
+        return etag, None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_conditional_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = validators
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is None:
+            response = handler(request, *args, **kwargs)
+        else:
+            response = not_modified
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Las respuestas dependen del usuario autenticado
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class StreamingListMixin:
+    """
+    Con ``?stream=true``, ``list`` devuelve el listado filtrado completo, sin
+    paginar, como un array JSON que se genera por bloques de
+    ``stream_chunk_size`` filas: la base de datos se recorre con un cursor y nunca
+    se tiene en memoria más de un bloque serializado, tanto bajo WSGI como bajo
+    ASGI (ver ``streaming_response``).
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) not in ('1', 'true'):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_response(request, self.stream_list(queryset), content_type='application/json')
+
+    def stream_list(self, queryset):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        chunks = iter(lambda: list(islice(rows, self.stream_chunk_size)), [])
+        return iter_json_array(self.get_serializer(chunk, many=True).data for chunk in chunks)
@@ -11,6 +11,7 @@ class Profile(models.Model):
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
+    token_version = models.PositiveIntegerField(default=0)  # Se incrementa para revocar los tokens del usuario
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -24,25 +25,41 @@ class Board(models.Model):
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='boards')
     students = models.ManyToManyField(User, related_name='student_boards', blank=True)  # Miembros del tablero
     color = models.CharField(max_length=7, default='#2196f3', blank=True)  # Color/tema del tablero
+    revision = models.PositiveBigIntegerField(default=0)  # Se incrementa con cada cambio del tablero
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['teacher', '-created_at'], name='board_teacher_recent_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class List(models.Model):
+    STATE_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('in_progress', 'En progreso'),
+        ('done', 'Completada'),
+    ]
+
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='lists')
     title = models.CharField(max_length=200)
-    position = models.IntegerField(default=0)
+    state = models.CharField(max_length=12, choices=STATE_CHOICES, default='pending')  # Etapa del flujo de trabajo
+    rank = models.CharField(max_length=64, blank=True)  # Clave de orden fraccionaria (ver api.ranking)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['position', 'created_at']
+        ordering = ['rank', 'id']
+        indexes = [
+            models.Index(fields=['board', 'rank', 'id'], name='list_board_rank_idx'),
+            # ?status= y progreso por etapa: listas de un tablero en un estado
+            models.Index(fields=['board', 'state'], name='list_board_state_idx'),
+        ]
 
     def __str__(self):
         return f"{self.board.name} - {self.title}"
@@ -64,13 +81,24 @@ class Card(models.Model):
     description = models.TextField(blank=True)
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_cards')
     due_date = models.DateTimeField(null=True, blank=True)
-    position = models.IntegerField(default=0)
+    rank = models.CharField(max_length=64, blank=True)  # Clave de orden fraccionaria (ver api.ranking)
     labels = models.ManyToManyField(Label, blank=True, related_name='cards')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['position', 'created_at']
+        ordering = ['rank', 'id']
+        indexes = [
+            models.Index(fields=['list', 'rank', 'id'], name='card_list_rank_idx'),
+            # Filtro upcoming=true: tareas de un usuario por rango de vencimiento
+            models.Index(
+                fields=['assigned_to', 'due_date'],
+                name='card_assignee_due_idx',
+                condition=models.Q(due_date__isnull=False),
+            ),
+            # ?ordering=due_date: el listado se pagina por cursor sobre (due_date, id)
+            models.Index(fields=['due_date', 'id'], name='card_due_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.list.title} - {self.title}"
@@ -85,6 +113,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['card', '-created_at'], name='comment_card_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.card.title} - {self.author.username}"
@@ -100,11 +131,24 @@ class ChecklistItem(models.Model):
 
     class Meta:
         ordering = ['position', 'created_at']
+        indexes = [
+            models.Index(fields=['card', 'position', 'created_at'], name='checklist_card_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.card.title} - {self.text}"
 
 
+class ActivityLogQuerySet(models.QuerySet):
+    def recent(self):
+        """
+        Limita la consulta a los meses dentro de la retención. En PostgreSQL el filtro
+        sobre created_at hace que solo se lean las particiones recientes.
+        """
+        from .partitions import retention_cutoff
+        return self.filter(created_at__gte=retention_cutoff())
+
+
 class ActivityLog(models.Model):
     ACTIVITY_TYPES = [
         ('card_created', 'Tarjeta creada'),
@@ -119,6 +163,7 @@ class ActivityLog(models.Model):
         ('board_updated', 'Tablero actualizado'),
         ('list_created', 'Lista creada'),
         ('list_updated', 'Lista actualizada'),
+        ('board_imported', 'Importación masiva'),
     ]
     
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='activity_logs')
@@ -128,13 +173,152 @@ class ActivityLog(models.Model):
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ActivityLogQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Rango mensual de archivado y retención
+            models.Index(fields=['created_at'], name='activitylog_created_idx'),
+            models.Index(fields=['board', '-created_at'], name='activitylog_board_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.board.name} - {self.get_activity_type_display()}"
 
 
+class BoardChange(models.Model):
+    """Registro de cambios por revisión que alimenta la sincronización incremental"""
+    ENTITY_CHOICES = [
+        ('board', 'Tablero'),
+        ('list', 'Lista'),
+        ('card', 'Tarjeta'),
+        ('label', 'Etiqueta'),
+        ('comment', 'Comentario'),
+        ('checklist_item', 'Item de checklist'),
+    ]
+    ACTION_CHOICES = [
+        ('created', 'Creado'),
+        ('updated', 'Actualizado'),
+        ('deleted', 'Eliminado'),
+    ]
+
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='changes')
+    revision = models.PositiveBigIntegerField()
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['revision']
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'revision'], name='unique_board_change_revision'),
+        ]
+
+    def __str__(self):
+        return f"{self.board_id} r{self.revision} - {self.entity} {self.entity_id} {self.action}"
+
+
+class BoardAccess(models.Model):
+    """
+    Tableros visibles para cada estudiante, mantenida por ``api.access``. Hay una
+    fila por motivo: ser miembro del tablero o tener tareas asignadas en él.
+    """
+    REASON_CHOICES = [
+        ('member', 'Miembro'),
+        ('assigned', 'Tarea asignada'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='board_access')
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='access_entries')
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'board', 'reason'], name='unique_board_access'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.board_id} ({self.reason})"
+
+
+class Notification(models.Model):
+    """
+    Entrada del buzón de un usuario, copiada de una actividad al escribirla (ver
+    ``api.notifications``). No referencia a ``ActivityLog``: en PostgreSQL esa
+    tabla está particionada y sus filas se archivan por mes.
+    """
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name='notifications')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    activity_type = models.CharField(max_length=30, choices=ActivityLog.ACTIVITY_TYPES)
+    description = models.TextField()
+    metadata = models.JSONField(default=dict, blank=True)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # Buzón por cursor (?after=<id>) y marcado en lote
+            models.Index(fields=['recipient', 'id'], name='notification_inbox_idx'),
+            models.Index(
+                fields=['recipient', 'id'],
+                name='notification_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_id} - {self.activity_type}"
+
+
+class NotificationInbox(models.Model):
+    """Contador de no leídas y cursor de lectura de cada usuario, mantenidos al escribir"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_inbox')
+    unread_count = models.PositiveIntegerField(default=0)
+    read_cursor = models.PositiveBigIntegerField(default=0)  # Id de la última notificación marcada hasta ahí
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} sin leer"
+
 
+class BoardSummary(models.Model):
+    """
+    Contadores de un tablero para el listado de tableros, mantenidos al escribir
+    tarjetas, listas y miembros (ver ``api.summaries``).
+    """
+    board = models.OneToOneField(Board, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    member_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    in_progress_count = models.PositiveIntegerField(default=0)
+    done_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)  # Última revisión registrada
 
+    def __str__(self):
+        return f"Resumen de {self.board_id}"
 
+
+class UserSearchKey(models.Model):
+    """
+    Palabras normalizadas (minúsculas, sin tildes) del nombre de usuario, el nombre,
+    los apellidos y el correo de cada usuario, para el autocompletado por prefijo
+    (ver ``api.directory``).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_keys', db_index=False)
+    key = models.CharField(max_length=150)
+
+    class Meta:
+        constraints = [
+            # También es el índice que recorre el autocompletado: (key, user) en orden
+            models.UniqueConstraint(fields=['key', 'user'], name='unique_user_search_key'),
+        ]
+        indexes = [
+            # Comprobación de las demás palabras de la consulta para un usuario
+            models.Index(fields=['user', 'key'], name='usersearchkey_user_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
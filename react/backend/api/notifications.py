@@ -0,0 +1,127 @@
+"""
+Buzón de notificaciones por usuario.
+
+Cada entrada de actividad se reparte al escribirse (``fan_out``, llamado por el
+escritor de ``api.activity``) en una ``Notification`` por destinatario:
+
+- el docente del tablero recibe toda la actividad de sus tableros;
+- un estudiante recibe la actividad de las tarjetas que tiene asignadas
+  (creación, cambios, asignación y comentarios).
+
+Quien hizo el cambio no recibe su propia notificación. ``NotificationInbox``
+guarda el contador de no leídas de cada usuario, que se actualiza en la misma
+transacción que las notificaciones: consultar cuántas hay sin leer es leer una
+fila por clave primaria, y el buzón se recorre por id con un índice por usuario.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import Board, Card, Notification, NotificationInbox
+
+# Actividad que se notifica a los estudiantes asignados a la tarjeta
+STUDENT_ACTIVITY_TYPES = {'card_created', 'card_updated', 'card_moved', 'card_assigned', 'comment_added'}
+
+
+def card_ids_of(entry):
+    metadata = entry.metadata or {}
+    if 'card_ids' in metadata:
+        return list(metadata['card_ids'])
+    return [metadata['card_id']] if metadata.get('card_id') else []
+
+
+def notifications_for(entries):
+    """Notificaciones de un lote de actividad, con dos consultas para todo el lote"""
+    teachers = dict(Board.objects.filter(pk__in={entry.board_id for entry in entries}).values_list('id', 'teacher_id'))
+    card_ids = {
+        card_id for entry in entries if entry.activity_type in STUDENT_ACTIVITY_TYPES for card_id in card_ids_of(entry)
+    }
+    assignees = dict(
+        Card.objects.filter(pk__in=card_ids, assigned_to__isnull=False).values_list('id', 'assigned_to_id')
+    ) if card_ids else {}
+
+    notifications = []
+    for entry in entries:
+        recipients = {teachers.get(entry.board_id)}
+        if entry.activity_type in STUDENT_ACTIVITY_TYPES:
+            recipients.update(assignees.get(card_id) for card_id in card_ids_of(entry))
+        recipients -= {None, entry.user_id}
+        notifications.extend(
+            Notification(
+                recipient_id=recipient_id,
+                board_id=entry.board_id,
+                actor_id=entry.user_id,
+                activity_type=entry.activity_type,
+                description=entry.description,
+                metadata=entry.metadata,
+            )
+            for recipient_id in sorted(recipients)
+        )
+    return notifications
+
+
+def adjust_unread(counts):
+    """
+    Suma ``counts`` (``{user_id: n}``, ``n`` puede ser negativo) a los contadores,
+    creando los que falten. Un UPDATE por cada valor distinto de ``n``.
+    """
+    if not counts:
+        return
+    NotificationInbox.objects.bulk_create(
+        [NotificationInbox(user_id=user_id) for user_id in counts], ignore_conflicts=True
+    )
+    by_amount = defaultdict(list)
+    for user_id, amount in counts.items():
+        by_amount[amount].append(user_id)
+    for amount, user_ids in by_amount.items():
+        NotificationInbox.objects.filter(user_id__in=user_ids).update(
+            unread_count=Greatest(F('unread_count') + amount, Value(0))
+        )
+
+
+def fan_out(entries, batch_size=1000):
+    """Crea las notificaciones de ``entries`` y actualiza los contadores"""
+    notifications = notifications_for(entries)
+    if not notifications:
+        return 0
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        adjust_unread(Counter(notification.recipient_id for notification in notifications))
+    return len(notifications)
+
+
+def get_unread_count(user):
+    return NotificationInbox.objects.filter(user_id=user.pk).values_list('unread_count', flat=True).first() or 0
+
+
+def mark_notifications_read(user, ids=None, up_to=None):
+    """
+    Marca como leídas las notificaciones ``ids`` de ``user``, las de id menor o
+    igual a ``up_to`` o, sin ninguno de los dos, todas. Devuelve cuántas cambiaron.
+    """
+    with transaction.atomic():
+        unread = Notification.objects.filter(recipient=user, is_read=False)
+        if ids is not None:
+            unread = unread.filter(pk__in=ids)
+        if up_to is not None:
+            unread = unread.filter(pk__lte=up_to)
+        updated = unread.update(is_read=True)
+        changes = {}
+        if updated:
+            changes['unread_count'] = Greatest(F('unread_count') - updated, Value(0))
+        if up_to is not None:
+            changes['read_cursor'] = Greatest(F('read_cursor'), Value(up_to))
+        if changes:
+            NotificationInbox.objects.filter(user_id=user.pk).update(**changes)
+    return updated
+
+
+def forget_board_notifications(board_id):
+    """Descuenta de los contadores las no leídas de un tablero que se va a eliminar"""
+    adjust_unread({
+        user_id: -total
+        for user_id, total in Notification.objects.filter(board_id=board_id, is_read=False).order_by()
+        .values('recipient_id').annotate(total=Count('id')).values_list('recipient_id', 'total')
+    })
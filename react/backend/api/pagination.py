@@ -0,0 +1,243 @@
+"""
+Paginación por cursor (keyset) para listados que crecen sin límite.
+
+``PageNumberPagination`` necesita un ``COUNT(*)`` y un ``OFFSET`` que recorre
+todas las filas anteriores, así que cada página es más cara que la previa.
+``KeysetPagination`` ordena por una clave única, por ejemplo
+``(created_at, id)``, y pide la página siguiente con
+``WHERE (created_at, id) < (último visto)``. Cada página es una búsqueda por
+índice, sin importar su profundidad.
+
+La respuesta tiene ``next``, ``previous`` y ``results``. El total es opcional
+(``?count=true``) y aproximado: en PostgreSQL es la estimación del planificador
+y en otros motores un conteo acotado a ``COUNT_LIMIT``. ``count_estimated``
+indica si el número no es exacto.
+"""
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(values, forward):
+    payload = {
+        'v': [value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value for value in values],
+        'd': 'n' if forward else 'p',
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Devuelve ``(valores, hacia_adelante)``; lanza ValueError si el cursor no es válido"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return payload['v'], payload['d'] == 'n'
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as exc:
+        raise ValueError(cursor) from exc
+
+
+def compare(field, lookup, value, nullable=False):
+    """
+    ``field <lookup> value``. En los campos nulables ``NULL`` cuenta como el mayor
+    de los valores, igual que en el ``ORDER BY`` de ``KeysetPagination``.
+    """
+    if not nullable:
+        return Q(**{f'{field}__{lookup}': value})
+    is_null = Q(**{f'{field}__isnull': True})
+    if value is None:
+        return {
+            'exact': is_null,
+            'gt': Q(pk__in=[]),
+            'gte': is_null,
+            'lt': ~is_null,
+            'lte': Q(),
+        }[lookup]
+    condition = Q(**{f'{field}__{lookup}': value})
+    return condition | is_null if lookup in ('gt', 'gte') else condition
+
+
+def keyset_filter(ordering, values, forward, nullable=()):
+    """
+    Condición ``(a, b) > (va, vb)`` según el sentido de cada campo, expandida como
+    ``a > va OR (a = va AND b > vb)`` para que funcione en cualquier motor.
+    ``nullable`` son los campos que admiten ``NULL``.
+    """
+    clauses = []
+    equal = Q()
+    for (field, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        clauses.append(equal & compare(field, lookup, value, field in nullable))
+        equal &= compare(field, 'exact', value, field in nullable)
+    # Cota sobre el primer campo: permite al planificador recorrer solo un rango del índice
+    first_field, first_descending = ordering[0]
+    lookup = 'lte' if first_descending == forward else 'gte'
+    bound = compare(first_field, lookup, values[0], first_field in nullable)
+    return bound & reduce(or_, clauses)
+
+
+def estimated_count(queryset, limit):
+    """``(total, es_estimado)`` sin recorrer toda la tabla"""
+    if connection.vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows']), True
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count > limit
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre ``view.keyset_ordering`` (o ``ordering``), p. ej.
+    ``('-created_at', '-id')``. El último campo debe ser único y no nulo; en los
+    demás ``NULL`` se ordena como el mayor valor (al final en sentido ascendente).
+    Si la vista usa ``OrderingFilter``, ``?ordering=campo`` cambia el primer
+    campo de la clave y el último se mantiene como desempate en el mismo sentido.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    COUNT_LIMIT = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.key = self.get_ordering(request, queryset, view)
+        self.nullable = {
+            field for field, _ in self.key if queryset.model._meta.get_field(field).null
+        }
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        forward = True
+        unbounded = queryset
+        queryset = queryset.order_by(*self.order_by(forward))
+        if cursor:
+            try:
+                raw_values, forward = decode_cursor(cursor)
+                values = self.to_python(queryset.model, raw_values)
+            except (ValueError, TypeError):
+                raise NotFound('Cursor inválido.')
+            queryset = queryset.order_by(*self.order_by(forward)).filter(
+                keyset_filter(self.key, values, forward, self.nullable)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if not forward:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if forward else bool(cursor)
+        self.has_previous = bool(cursor) if forward else has_more
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            # Sobre el queryset filtrado, sin la condición del cursor
+            self.count = estimated_count(unbounded, self.COUNT_LIMIT)
+        return rows
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(getattr(view, 'keyset_ordering', self.ordering))
+        if view is not None and OrderingFilter in getattr(view, 'filter_backends', ()):
+            requested = OrderingFilter().get_ordering(request, queryset, view)
+            if requested and request.query_params.get('ordering') and requested[0] != ordering[0]:
+                field = requested[0]
+                tiebreak = ordering[-1].lstrip('-')
+                ordering = [field, f'-{tiebreak}' if field.startswith('-') else tiebreak]
+        return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    def order_by(self, forward):
+        ordering = []
+        for field, descending in self.key:
+            if field in self.nullable:
+                expression = F(field)
+                ordering.append(
+                    expression.desc(nulls_first=True) if descending == forward
+                    else expression.asc(nulls_last=True)
+                )
+            else:
+                ordering.append(f"{'-' if descending == forward else ''}{field}")
+        return ordering
+
+    def to_python(self, model, raw_values):
+        if len(raw_values) != len(self.key):
+            raise ValueError(raw_values)
+        values = []
+        for (field, _), raw in zip(self.key, raw_values):
+            model_field = model._meta.get_field(field)
+            if raw is None and field in self.nullable:
+                value = None
+            elif model_field.get_internal_type() == 'DateTimeField':
+                value = parse_datetime(raw)
+                if value is None:
+                    raise ValueError(raw)
+            else:
+                value = model_field.to_python(raw)
+            values.append(value)
+        return values
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def cursor_link(self, row, forward):
+        values = [getattr(row, field) for field, _ in self.key]
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_cursor(values, forward))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.cursor_link(self.page[-1], forward=True)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.cursor_link(self.page[0], forward=False)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            payload['count'], payload['count_estimated'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Solo con ?count=true; puede ser aproximado'},
+                'count_estimated': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Cursor de la página (valor de next/previous)', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': f'Tamaño de página (máximo {self.max_page_size})', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'description': 'Incluir el total aproximado', 'schema': {'type': 'boolean'}},
+        ]
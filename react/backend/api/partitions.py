@@ -0,0 +1,170 @@
+"""
+Particiones mensuales del historial de actividad.
+
+En PostgreSQL ``api_activitylog`` es una tabla particionada por rango de
+``created_at`` con una partición por mes (``api_activitylog_y2025m03``) más una
+partición por defecto; archivar un mes es exportar su partición y eliminarla.
+Si al crear la partición de un mes ya hay filas suyas en la partición por
+defecto, se trasladan a la nueva partición.
+
+En SQLite (y cualquier otro motor) se usa una ventana móvil sobre la misma tabla:
+cada mes es el rango ``[inicio, fin)`` de ``created_at`` y archivarlo es exportar
+ese rango y borrarlo, con lo que la tabla solo conserva los meses recientes.
+
+Los límites de cada mes se calculan en UTC en ambos casos.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ActivityLog
+
+TABLE = ActivityLog._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(value):
+    """Primer instante (UTC) del mes de ``value``"""
+    value = value.astimezone(datetime.timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(start, months):
+    month_index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+def retention_cutoff(now=None):
+    """
+    Inicio del mes más antiguo dentro de la retención: se conservan el mes actual
+    y los ``ACTIVITY_LOG_RETENTION_MONTHS - 1`` anteriores.
+    """
+    months = getattr(settings, 'ACTIVITY_LOG_RETENTION_MONTHS', 12)
+    return add_months(month_start(now or timezone.now()), -(months - 1))
+
+
+def partition_name(start):
+    return f'{TABLE}_y{start.year:04d}m{start.month:02d}'
+
+
+class RollingTableBackend:
+    """Meses como rangos de ``created_at`` dentro de la tabla de actividad"""
+
+    def ensure_partition(self, start):
+        # No hay nada que crear: cualquier fila cae en la tabla principal
+        return False
+
+    def partitions(self):
+        """Inicio de cada mes que tiene filas, en orden cronológico"""
+        return list(
+            ActivityLog.objects.order_by()
+            .datetimes('created_at', 'month', tzinfo=datetime.timezone.utc)
+        )
+
+    def rows(self, start):
+        return (
+            ActivityLog.objects.filter(created_at__gte=start, created_at__lt=add_months(start, 1))
+            .order_by('id')
+            .values('id', 'board_id', 'user_id', 'activity_type', 'description', 'metadata', 'created_at')
+            .iterator(chunk_size=2000)
+        )
+
+    def drop_partition(self, start):
+        with transaction.atomic():
+            deleted, _ = ActivityLog.objects.filter(
+                created_at__gte=start, created_at__lt=add_months(start, 1)
+            ).delete()
+        return deleted
+
+
+class PostgresPartitionBackend(RollingTableBackend):
+    """Particiones nativas de PostgreSQL (``PARTITION BY RANGE (created_at)``)"""
+
+    def ensure_partition(self, start):
+        name = partition_name(start)
+        end = add_months(start, 1)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is not None:
+                return False
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM {connection.ops.quote_name(DEFAULT_PARTITION)} '
+                'WHERE created_at >= %s AND created_at < %s)',
+                [start, end],
+            )
+            if not cursor.fetchone()[0]:
+                cursor.execute(
+                    f'CREATE TABLE {connection.ops.quote_name(name)} PARTITION OF {TABLE} '
+                    'FOR VALUES FROM (%s) TO (%s)',
+                    [start, end],
+                )
+                return True
+            self.move_default_rows(cursor, name, start, end)
+        return True
+
+    def move_default_rows(self, cursor, name, start, end):
+        """
+        Crea la partición de un mes que ya tiene filas en la partición por defecto:
+        PostgreSQL no deja crearla mientras esas filas sigan ahí. Se crea como tabla
+        suelta, se le pasan las filas y se adjunta.
+        """
+        quoted = connection.ops.quote_name(name)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in ActivityLog._meta.concrete_fields)
+        with transaction.atomic():
+            cursor.execute(f'CREATE TABLE {quoted} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {connection.ops.quote_name(DEFAULT_PARTITION)} '
+                f'WHERE created_at >= %s AND created_at < %s RETURNING {columns}) '
+                f'INSERT INTO {quoted} ({columns}) SELECT {columns} FROM moved',
+                [start, end],
+            )
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ATTACH PARTITION {quoted} FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+
+    def partitions(self):
+        """Inicio de cada partición mensual existente más los meses con filas en la partición por defecto"""
+        starts = set()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE parent.relname = %s',
+                [TABLE],
+            )
+            for (name,) in cursor.fetchall():
+                suffix = name[len(TABLE) + 1:]
+                if suffix.startswith('y') and 'm' in suffix:
+                    year, month = suffix[1:].split('m')
+                    starts.add(datetime.datetime(int(year), int(month), 1, tzinfo=datetime.timezone.utc))
+            cursor.execute(
+                "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') "
+                f'FROM {connection.ops.quote_name(DEFAULT_PARTITION)}'
+            )
+            for (start,) in cursor.fetchall():
+                starts.add(start.replace(tzinfo=datetime.timezone.utc))
+        return sorted(starts)
+
+    def drop_partition(self, start):
+        name = partition_name(start)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is None:
+                # Filas del mes que cayeron en la partición por defecto
+                return super().drop_partition(start)
+            cursor.execute(f'SELECT count(*) FROM {connection.ops.quote_name(name)}')
+            count = cursor.fetchone()[0]
+            with transaction.atomic():
+                cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {connection.ops.quote_name(name)}')
+                cursor.execute(f'DROP TABLE {connection.ops.quote_name(name)}')
+        return count
+
+
+def get_partition_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresPartitionBackend()
+    return RollingTableBackend()
@@ -1,37 +1,35 @@
 from rest_framework import permissions
 
+from .authz import AuthzContext, get_authz
+
+
+def visible_boards(user):
+    """Tableros que el usuario puede ver según su rol"""
+    # Docentes ven sus propios tableros; estudiantes, aquellos donde son miembros
+    # o tienen tareas asignadas (tabla BoardAccess)
+    return AuthzContext(user).boards()
+
 
 class IsTeacherOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return request.user.is_authenticated
-        return request.user.is_authenticated and hasattr(request.user, 'profile') and request.user.profile.role == 'teacher'
+        return request.user.is_authenticated and get_authz(request).is_teacher
 
 
 class IsBoardTeacher(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'teacher'):
-            return obj.teacher == request.user
-        if hasattr(obj, 'board'):
-            return obj.board.teacher == request.user
-        if hasattr(obj, 'list'):
-            return obj.list.board.teacher == request.user
-        if hasattr(obj, 'card'):
-            return obj.card.list.board.teacher == request.user
-        return False
+        # Se compara el id del tablero del objeto, sin cargar tablero ni docente
+        return get_authz(request).owns(obj)
 
 
 class IsAssignedStudentOrTeacher(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if hasattr(request.user, 'profile'):
-            if request.user.profile.role == 'teacher':
-                return obj.list.board.teacher == request.user
-            elif request.user.profile.role == 'student':
-                return obj.assigned_to == request.user
+        authz = get_authz(request)
+        if authz.is_teacher:
+            return authz.owns(obj)
+        if authz.is_student:
+            # Los items de checklist heredan el permiso de su tarjeta
+            card = obj.card if hasattr(obj, 'card') else obj
+            return card.assigned_to_id == request.user.pk
         return False
-
-
-
-
-
-
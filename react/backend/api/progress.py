@@ -0,0 +1,62 @@
+"""
+Progreso de un tablero por etapa del flujo de trabajo.
+
+Cada lista tiene un ``state`` (pendiente, en progreso, completada) indexado junto
+al tablero. El progreso se calcula con una sola agregación agrupada por estudiante
+asignado y estado, sin depender de los títulos de las listas.
+"""
+from django.db.models import Count
+
+from .models import List, Card
+
+STATES = [state for state, _ in List.STATE_CHOICES]
+
+# Valores aceptados en ?status=: la etapa o la clave de columna que usa el frontend
+STATUS_ALIASES = {
+    **{state: state for state in STATES},
+    'pendiente': 'pending',
+    'progreso': 'in_progress',
+    'completada': 'done',
+}
+
+
+def empty_counts():
+    return {state: 0 for state in STATES}
+
+
+def completion(counts):
+    total = sum(counts.values())
+    return round(100 * counts['done'] / total, 1) if total else 0.0
+
+
+def board_progress(board_id, assigned_to=None):
+    """
+    Tarjetas por estado del tablero y de cada estudiante asignado. Con
+    ``assigned_to`` solo se cuentan las tarjetas de ese usuario.
+    """
+    cards = Card.objects.filter(list__board_id=board_id)
+    if assigned_to is not None:
+        cards = cards.filter(assigned_to_id=assigned_to)
+    rows = (
+        cards.order_by().values_list('assigned_to_id', 'assigned_to__username', 'list__state')
+        .annotate(total=Count('id'))
+    )
+
+    states = empty_counts()
+    by_student = {}
+    usernames = {}
+    for user_id, username, state, total in rows:
+        states[state] += total
+        if user_id is not None:
+            by_student.setdefault(user_id, empty_counts())[state] += total
+            usernames[user_id] = username
+
+    return {
+        'total': sum(states.values()),
+        'states': states,
+        'completion': completion(states),
+        'students': [
+            {'id': user_id, 'username': usernames.get(user_id), 'states': counts, 'completion': completion(counts)}
+            for user_id, counts in sorted(by_student.items())
+        ],
+    }
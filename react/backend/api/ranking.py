@@ -0,0 +1,233 @@
+"""
+Claves de orden fraccionarias para listas y tarjetas.
+
+El orden de las listas de un tablero y de las tarjetas de una lista lo da
+``rank``, un texto que se compara lexicográficamente. Para colocar un elemento
+entre otros dos basta con calcular una clave intermedia y guardar esa única fila:
+mover o insertar cuesta una escritura en lugar de renumerar a todos los hermanos.
+
+Formato: una parte entera de ancho fijo (``INTEGER_WIDTH`` dígitos en base 36) y
+una fracción opcional en base 36 sin ceros finales, p. ej. ``'0000a0'`` o
+``'0000a0i'``. Con ese formato el orden lexicográfico coincide con el numérico.
+Solo se usan ``0-9a-z``, que ordenan igual en la intercalación binaria de SQLite
+y en las intercalaciones habituales de PostgreSQL.
+
+Las claves nuevas al final o al principio saltan ``STEP`` enteros, así que agregar
+tarjetas no alarga las claves. Insertar muchas veces en el mismo hueco sí alarga
+la fracción: cuando una clave supera ``REBALANCE_LENGTH`` se programa
+``rebalance`` para sus hermanos, que vuelve a espaciarlos sin cambiar el orden.
+Según ``settings.RANK_REBALANCE['MODE']`` corre tras el commit en un hilo
+trabajador (``'background'``), fuera de la petición, o en el mismo hilo
+(``'inline'``, para desarrollo y pruebas).
+``manage.py rebalance_ranks`` hace lo mismo de forma periódica. Dentro de una
+misma transacción (un lote) el rebalanceo aún no ha corrido: si una clave fuese a
+superar ``RANK_MAX_LENGTH``, ``respread_ranks`` reespacia el grupo en el momento.
+
+Dos inserciones concurrentes en el mismo hueco pueden obtener la misma clave; el
+desempate por ``id`` mantiene el orden determinista hasta el siguiente rebalanceo.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .revisions import record_changes
+from .snapshots import invalidate_board_snapshot
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+INTEGER_WIDTH = 6
+MAX_INTEGER = BASE ** INTEGER_WIDTH - 1
+STEP = BASE ** 2
+RANK_MAX_LENGTH = 64
+REBALANCE_LENGTH = 16
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MODE': 'background',
+}
+
+
+def encode_integer(value):
+    digits = []
+    for _ in range(INTEGER_WIDTH):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits))
+
+
+def split_key(key):
+    return int(key[:INTEGER_WIDTH], BASE), key[INTEGER_WIDTH:]
+
+
+def midpoint(a, b):
+    """
+    Fracción en base 36 estrictamente entre ``a`` y ``b`` (``''`` es 0 y ``None``
+    es 1). Ninguna de las dos puede terminar en cero.
+    """
+    if b is not None:
+        # Prefijo común: se conserva y se busca el punto medio en el resto
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n:
+            return b[:n] + midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + midpoint(a[1:], None)
+
+
+def key_between(a, b):
+    """Clave estrictamente entre ``a`` y ``b``; ``None`` indica que no hay vecino por ese lado"""
+    if a is None and b is None:
+        return encode_integer(STEP)
+    if b is None:
+        integer_a, fraction_a = split_key(a)
+        if integer_a + STEP <= MAX_INTEGER:
+            return encode_integer(integer_a + STEP)
+        return encode_integer(integer_a) + midpoint(fraction_a, None)
+    integer_b, fraction_b = split_key(b)
+    if a is None:
+        if fraction_b:
+            return encode_integer(integer_b) if integer_b else encode_integer(0) + midpoint('', fraction_b)
+        if integer_b > STEP:
+            return encode_integer(integer_b - STEP)
+        if integer_b > 1:
+            return encode_integer(integer_b // 2)
+        return encode_integer(0) + midpoint('', None)
+    if a >= b:
+        raise ValueError(f'{a!r} debe ser menor que {b!r}')
+    integer_a, fraction_a = split_key(a)
+    if integer_b - integer_a > 1:
+        return encode_integer((integer_a + integer_b) // 2)
+    if integer_b - integer_a == 1:
+        if fraction_b:
+            return encode_integer(integer_b)
+        return encode_integer(integer_a) + midpoint(fraction_a, None)
+    return encode_integer(integer_a) + midpoint(fraction_a, fraction_b)
+
+
+def spread_keys(count, after=None):
+    """``count`` claves crecientes, espaciadas ``STEP``, a partir de ``after`` (exclusivo)"""
+    keys = []
+    for _ in range(count):
+        after = key_between(after, None)
+        keys.append(after)
+    return keys
+
+
+def rank_between_ranks(ranks, index):
+    """
+    Clave para ocupar la posición ``index`` (0 = primero) en ``ranks``, la lista
+    ordenada de claves de los hermanos. Un índice mayor que la cantidad de
+    hermanos coloca el elemento al final.
+    """
+    index = min(max(index, 0), len(ranks))
+    before = ranks[index - 1] if index else None
+    after = ranks[index] if index < len(ranks) else None
+    if before is not None and before == after:
+        # Claves repetidas por una carrera: se usa la siguiente clave distinta
+        after = next((rank for rank in ranks[index:] if rank > before), None)
+    return key_between(before, after)
+
+
+def respread_ranks(ranks, index):
+    """
+    ``(clave, claves nuevas)`` para ocupar la posición ``index`` de ``ranks``
+    reespaciando todo el grupo: la clave y las nuevas claves de los hermanos,
+    en su mismo orden, son cortas y equiespaciadas.
+    """
+    index = min(max(index, 0), len(ranks))
+    keys = spread_keys(len(ranks) + 1)
+    return keys[index], keys[:index] + keys[index + 1:]
+
+
+def rank_at(siblings, index, exclude=None):
+    """
+    Clave para colocar un elemento en la posición ``index`` (0 = primero) de
+    ``siblings``. Solo se leen los vecinos del hueco. ``exclude`` es el id del
+    propio elemento cuando se mueve dentro del mismo grupo.
+    """
+    if exclude is not None:
+        siblings = siblings.exclude(pk=exclude)
+    ordered = siblings.order_by('rank', 'id').values_list('rank', flat=True)
+    if index <= 0:
+        return key_between(None, ordered.first())
+    neighbours = list(ordered[index - 1:index + 1])
+    if not neighbours:
+        return rank_last(siblings)
+    before = neighbours[0]
+    after = neighbours[1] if len(neighbours) > 1 else None
+    if after == before:
+        # Claves repetidas por una carrera: se usa la siguiente clave distinta
+        after = ordered.filter(rank__gt=before).first()
+    return key_between(before, after)
+
+
+def rank_last(siblings):
+    """Clave para agregar un elemento al final de ``siblings``"""
+    last = siblings.order_by('-rank').values_list('rank', flat=True).first()
+    return key_between(last, None)
+
+
+def rebalance(siblings, board_id, entity):
+    """
+    Reasigna claves cortas y equiespaciadas a ``siblings`` (listas de un tablero o
+    tarjetas de una lista) conservando su orden. ``bulk_update`` no emite señales:
+    se registran los cambios en la revisión del tablero y se invalida su snapshot.
+    Devuelve la cantidad de filas reescritas.
+    """
+    with transaction.atomic():
+        items = list(siblings.select_for_update().order_by('rank', 'id').only('pk', 'rank'))
+        changed = []
+        for item, key in zip(items, spread_keys(len(items))):
+            if item.rank != key:
+                item.rank = key
+                changed.append(item)
+        if changed:
+            siblings.model.objects.bulk_update(changed, ['rank'], batch_size=1000)
+            record_changes(board_id, [(entity, item.pk, 'updated') for item in changed])
+            invalidate_board_snapshot(board_id)
+    return len(changed)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_rebalance_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rank-rebalance')
+    return _executor
+
+
+def rebalance_in_worker(siblings, board_id, entity):
+    # El hilo tiene su propia conexión: respetar CONN_MAX_AGE y descartar conexiones rotas
+    close_old_connections()
+    try:
+        rebalance(siblings, board_id, entity)
+    except Exception:
+        logger.exception('Error al rebalancear las claves de %s del tablero %s', entity, board_id)
+
+
+def schedule_rebalance(rank, siblings, board_id, entity):
+    """Si ``rank`` ya es demasiado larga, rebalancea ``siblings`` tras el commit"""
+    if len(rank) <= REBALANCE_LENGTH:
+        return
+    options = {**DEFAULTS, **getattr(settings, 'RANK_REBALANCE', {})}
+    if options['MODE'] == 'inline':
+        transaction.on_commit(lambda: rebalance(siblings, board_id, entity))
+    else:
+        transaction.on_commit(
+            lambda: get_rebalance_executor().submit(rebalance_in_worker, siblings, board_id, entity)
+        )
@@ -0,0 +1,134 @@
+"""
+Pub/sub de eventos en vivo de los tableros.
+
+Las escrituras publican eventos en el canal del tablero una vez confirmada la
+transacción, y el endpoint SSE (``api.events``) los reenvía a cada pestaña
+suscrita. El backend se elige con el setting ``REALTIME_BROKER`` (ruta a una
+clase con ``publish`` y ``subscribe``); ``LocalBroker`` reparte los eventos dentro
+del proceso, así que con varios procesos hace falta un backend compartido.
+"""
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .renderers import json_dumps
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBroker:
+    """Interfaz de los backends de pub/sub"""
+
+    def publish(self, channel, event):
+        """Publica ``event`` (un dict serializable) en ``channel``. Puede llamarse desde cualquier hilo."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Context manager asíncrono que entrega una ``asyncio.Queue`` con los eventos del canal"""
+        raise NotImplementedError
+
+
+class LocalBroker(BaseBroker):
+    """
+    Broker en memoria del proceso. Cada suscriptor tiene una cola acotada en su
+    propio event loop; si un cliente lento la llena, los eventos nuevos se
+    descartan para él en lugar de frenar a quien publica.
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró
+                pass
+
+    @staticmethod
+    def _deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Cola de eventos llena, se descarta un evento para un suscriptor lento")
+
+    def subscribe(self, channel):
+        return _LocalSubscription(self, channel)
+
+    def _add(self, channel, subscriber):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+
+    def _remove(self, channel, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class _LocalSubscription:
+    """Suscripción de LocalBroker; se da de baja al salir del ``async with``"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.subscriber = None
+
+    async def __aenter__(self):
+        self.subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.broker.max_queue_size))
+        self.broker._add(self.channel, self.subscriber)
+        return self.subscriber[1]
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.broker._remove(self.channel, self.subscriber)
+        return False
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    broker_class = import_string(getattr(settings, 'REALTIME_BROKER', 'api.realtime.LocalBroker'))
+    return broker_class()
+
+
+def board_channel(board_id):
+    return f'board:{board_id}'
+
+
+def publish_board_event(board_id, event_type, data):
+    """Publica un evento del tablero cuando se confirme la transacción en curso"""
+    event = {'type': event_type, 'board': board_id, **data}
+
+    def publish():
+        try:
+            get_broker().publish(board_channel(board_id), event)
+        except Exception:
+            # Un fallo del pub/sub nunca debe afectar a la escritura ya confirmada
+            logger.exception("Error al publicar evento del tablero %s", board_id)
+
+    transaction.on_commit(publish)
+
+
+def format_sse(event):
+    """Formatea un evento como mensaje Server-Sent Events"""
+    lines = []
+    if event.get('revision') is not None:
+        lines.append(f"id: {event['revision']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json_dumps(event).decode()}")
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,114 @@
+"""
+Revisiones por tablero y sincronización incremental.
+
+Cada escritura sobre un tablero incrementa ``Board.revision``, deja una fila en
+``BoardChange`` y actualiza la fecha de actividad de su ``BoardSummary``. Un
+cliente que conoce la revisión N pide solo lo que cambió desde entonces: las
+entidades creadas y actualizadas con su estado actual y las eliminadas como
+tombstones (``{'entity', 'id', 'revision'}``).
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Board, List, Card, Label, Comment, ChecklistItem, BoardChange
+from .snapshots import board_row, list_rows, card_rows, label_rows, comment_rows, checklist_item_rows
+from .summaries import touch_summary
+
+# Entidad -> (clave en la respuesta, función que obtiene sus filas, lookup hasta el tablero)
+ENTITY_ROWS = {
+    'list': ('lists', list_rows, 'board_id'),
+    'card': ('cards', card_rows, 'list__board_id'),
+    'label': ('labels', label_rows, 'board_id'),
+    'comment': ('comments', comment_rows, 'card__list__board_id'),
+    'checklist_item': ('checklist_items', checklist_item_rows, 'card__list__board_id'),
+}
+
+
+def board_id_for(instance):
+    """Obtiene el id del tablero al que pertenece una entidad con a lo sumo una consulta"""
+    if isinstance(instance, Board):
+        return instance.pk
+    if isinstance(instance, (List, Label)):
+        return instance.board_id
+    if isinstance(instance, Card):
+        # La lista queda cargada en la tarjeta: las siguientes llamadas no consultan
+        return instance.list.board_id
+    if isinstance(instance, (Comment, ChecklistItem)):
+        if type(instance).card.is_cached(instance):
+            return board_id_for(instance.card)
+        return Card.objects.filter(pk=instance.card_id).values_list('list__board_id', flat=True).first()
+    return None
+
+
+def record_change(board_id, entity, entity_id, action):
+    """
+    Incrementa la revisión del tablero y registra el cambio. El UPDATE bloquea la
+    fila del tablero hasta el final de la transacción, así que las revisiones de un
+    mismo tablero quedan estrictamente ordenadas.
+    """
+    with transaction.atomic(savepoint=False):
+        Board.objects.filter(pk=board_id).update(revision=F('revision') + 1)
+        revision = Board.objects.filter(pk=board_id).values_list('revision', flat=True).get()
+        BoardChange.objects.create(
+            board_id=board_id,
+            revision=revision,
+            entity=entity,
+            entity_id=entity_id,
+            action=action,
+        )
+        touch_summary(board_id)
+    return revision
+
+
+def record_changes(board_id, changes):
+    """
+    Registra varios cambios ``(entity, entity_id, action)`` de un tablero con un
+    solo UPDATE: la revisión avanza tantas posiciones como cambios y cada uno
+    recibe la suya. Devuelve la última revisión, o ``None`` si no hay cambios.
+    """
+    changes = list(changes)
+    if not changes:
+        return None
+    with transaction.atomic(savepoint=False):
+        Board.objects.filter(pk=board_id).update(revision=F('revision') + len(changes))
+        revision = Board.objects.filter(pk=board_id).values_list('revision', flat=True).get()
+        first = revision - len(changes) + 1
+        BoardChange.objects.bulk_create(
+            [
+                BoardChange(board_id=board_id, revision=first + offset, entity=entity, entity_id=entity_id, action=action)
+                for offset, (entity, entity_id, action) in enumerate(changes)
+            ],
+            batch_size=1000,
+        )
+        touch_summary(board_id)
+    return revision
+
+
+def get_board_changes(board, since):
+    """
+    Resume los cambios del tablero posteriores a la revisión ``since``. Si una
+    entidad cambió varias veces solo cuenta la última acción.
+    """
+    last_action = {}
+    for entity, entity_id, action, revision in (
+        BoardChange.objects.filter(board_id=board.id, revision__gt=since)
+        .values_list('entity', 'entity_id', 'action', 'revision')
+    ):
+        last_action[(entity, entity_id)] = (action, revision)
+
+    upserted_ids = {}
+    deleted = []
+    for (entity, entity_id), (action, revision) in last_action.items():
+        if action == 'deleted':
+            deleted.append({'entity': entity, 'id': entity_id, 'revision': revision})
+        else:
+            upserted_ids.setdefault(entity, set()).add(entity_id)
+
+    changes = {'revision': board.revision, 'since': since, 'deleted': deleted}
+    if 'board' in upserted_ids:
+        changes['board'] = board_row(board)
+    for entity, (key, rows, board_lookup) in ENTITY_ROWS.items():
+        ids = upserted_ids.get(entity)
+        if ids:
+            changes[key] = rows(id__in=ids, **{board_lookup: board.id})
+    return changes
@@ -0,0 +1,21 @@
+"""
+Extensiones de drf-spectacular para las clases propias de la API. Se registran al
+importar el módulo desde ``ApiConfig.ready``.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.plumbing import get_lib_doc_excludes as get_default_doc_excludes
+
+from .mixins import ConditionalGetMixin, StreamingListMixin
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Documenta ``CachedJWTAuthentication`` con el mismo esquema Bearer de simplejwt"""
+    target_class = 'api.authentication.CachedJWTAuthentication'
+
+
+def get_lib_doc_excludes():
+    """
+    Las vistas sin descripción propia heredarían la docstring del primer mixin
+    de la API en su MRO: se excluyen como las clases de DRF.
+    """
+    return [*get_default_doc_excludes(), ConditionalGetMixin, StreamingListMixin]
@@ -0,0 +1,290 @@
+"""
+Búsqueda de texto completo sobre tarjetas.
+
+Cada tarjeta tiene un documento en ``api_card_search`` con su título, su
+descripción, el texto de sus comentarios y el de sus items de checklist. El
+índice depende del motor:
+
+- SQLite: tabla virtual FTS5 (``rowid`` = id de la tarjeta) con el tokenizador
+  ``unicode61`` sin diacríticos. El orden sale de ``bm25`` con más peso para el
+  título que para la descripción, los comentarios y el checklist.
+- PostgreSQL: columna ``tsvector`` con índice GIN y la configuración ``spanish``,
+  con un peso (A-D) por campo. El orden sale de ``ts_rank``. Las tildes se quitan
+  en Python al indexar y al consultar.
+
+Las señales (``api.signals``) actualizan el documento de una tarjeta cuando cambia
+su texto o el de sus comentarios o items de checklist, y solo reescriben la parte
+que cambió. Las escrituras que no emiten señales
+(``bulk_create``) deben llamar a ``index_cards``, y ``rebuild_search_index``
+reconstruye el índice completo.
+
+El índice solo guarda texto: el tablero y el asignado se leen de las tablas de
+origen en la misma consulta, así que mover una tarjeta o una lista no obliga a
+reindexar y la visibilidad siempre es la actual.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from .models import List, Card, Comment, ChecklistItem
+
+TABLE = 'api_card_search'
+SEARCH_CONFIG = 'spanish'
+MAX_TERMS = 8
+TERM = re.compile(r'\w+')
+
+# Secciones del documento que salen de otros modelos y su peso en PostgreSQL
+SECTION_WEIGHTS = {'comments': 'C', 'checklist': 'D'}
+
+
+def fold(text):
+    """Minúsculas y sin tildes ni diéresis: 'Añadir Índice' -> 'anadir indice'"""
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def query_terms(query):
+    """Palabras de la consulta, normalizadas; la última se busca como prefijo"""
+    return TERM.findall(fold(query))[:MAX_TERMS]
+
+
+def section_texts(card_id, section):
+    """Texto de los comentarios o del checklist de una tarjeta, como en ``card_documents``"""
+    if section == 'comments':
+        texts = Comment.objects.filter(card_id=card_id).order_by('id').values_list('content', flat=True)
+    else:
+        texts = ChecklistItem.objects.filter(card_id=card_id).order_by('id').values_list('text', flat=True)
+    return '\n'.join(texts)
+
+
+def card_documents(card_ids):
+    """``(card_id, título, descripción, comentarios, checklist)`` de cada tarjeta, con tres consultas"""
+    comments = defaultdict(list)
+    for card_id, content in Comment.objects.filter(card_id__in=card_ids).order_by('id').values_list('card_id', 'content'):
+        comments[card_id].append(content)
+    checklist = defaultdict(list)
+    for card_id, text in ChecklistItem.objects.filter(card_id__in=card_ids).order_by('id').values_list('card_id', 'text'):
+        checklist[card_id].append(text)
+    return [
+        (card_id, title, description, '\n'.join(comments[card_id]), '\n'.join(checklist[card_id]))
+        for card_id, title, description in Card.objects.filter(pk__in=card_ids).values_list('id', 'title', 'description')
+    ]
+
+
+class FTS5SearchBackend:
+    key = 'rowid'
+
+    def create_index(self, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+            "title, description, comments, checklist, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop_index(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def delete(self, cursor, card_ids):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({", ".join(["%s"] * len(card_ids))})', card_ids)
+
+    def insert(self, cursor, documents):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, title, description, comments, checklist) VALUES (%s, %s, %s, %s, %s)',
+            documents,
+        )
+
+    def update_text(self, cursor, card_id, title, description):
+        cursor.execute(f'UPDATE {TABLE} SET title = %s, description = %s WHERE rowid = %s', [title, description, card_id])
+        return cursor.rowcount
+
+    def update_section(self, cursor, card_id, section, text):
+        cursor.execute(f'UPDATE {TABLE} SET {section} = %s WHERE rowid = %s', [text, card_id])
+        return cursor.rowcount
+
+    def append_section(self, cursor, card_id, section, text):
+        cursor.execute(
+            f"UPDATE {TABLE} SET {section} = CASE WHEN {section} = '' THEN %s ELSE {section} || char(10) || %s END "
+            'WHERE rowid = %s',
+            [text, text, card_id],
+        )
+        return cursor.rowcount
+
+    def match(self, terms):
+        """``(condición, puntuación, parámetros)``: cada palabra es obligatoria"""
+        expression = ' '.join(f'"{term}"' for term in terms) + '*'
+        return f'{TABLE} MATCH %s', f'-bm25({TABLE}, 10.0, 4.0, 2.0, 1.0)', [expression], []
+
+
+class PostgresSearchBackend:
+    key = 'card_id'
+    document = ' || '.join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), '{weight}')" for weight in 'ABCD'
+    )
+
+    def create_index(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            f'card_id bigint PRIMARY KEY REFERENCES {Card._meta.db_table} (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING gin (document)')
+
+    def drop_index(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def delete(self, cursor, card_ids):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE card_id = ANY(%s)', [list(card_ids)])
+
+    def insert(self, cursor, documents):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (card_id, document) VALUES (%s, {self.document})',
+            [(card_id, *(fold(text) for text in texts)) for card_id, *texts in documents],
+        )
+
+    # Las actualizaciones parciales conservan los lexemas de los demás campos por su peso
+    def update_text(self, cursor, card_id, title, description):
+        cursor.execute(
+            f"UPDATE {TABLE} SET document = setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'B') || ts_filter(document, '{{c,d}}') "
+            'WHERE card_id = %s',
+            [fold(title), fold(description), card_id],
+        )
+        return cursor.rowcount
+
+    def update_section(self, cursor, card_id, section, text):
+        weight = SECTION_WEIGHTS[section]
+        kept = ','.join(other for other in 'abcd' if other != weight.lower())
+        cursor.execute(
+            f"UPDATE {TABLE} SET document = ts_filter(document, '{{{kept}}}') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), '{weight}') WHERE card_id = %s",
+            [fold(text), card_id],
+        )
+        return cursor.rowcount
+
+    def append_section(self, cursor, card_id, section, text):
+        cursor.execute(
+            f"UPDATE {TABLE} SET document = document || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), '{SECTION_WEIGHTS[section]}') WHERE card_id = %s",
+            [fold(text), card_id],
+        )
+        return cursor.rowcount
+
+    def match(self, terms):
+        expression = ' & '.join(terms) + ':*'
+        query = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        return f'{TABLE}.document @@ {query}', f'ts_rank({TABLE}.document, {query})', [expression], [expression]
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return FTS5SearchBackend()
+
+
+def index_cards(card_ids):
+    """Reescribe los documentos de ``card_ids``; las tarjetas que ya no existen salen del índice"""
+    card_ids = sorted(set(card_ids))
+    if not card_ids:
+        return
+    backend = get_search_backend()
+    documents = card_documents(card_ids)
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        backend.delete(cursor, card_ids)
+        if documents:
+            backend.insert(cursor, documents)
+
+
+def index_new_card(card):
+    """Indexa una tarjeta recién creada desde la instancia: aún no tiene comentarios ni checklist"""
+    with connection.cursor() as cursor:
+        get_search_backend().insert(cursor, [(card.pk, card.title, card.description, '', '')])
+
+
+def reindex_card_text(card):
+    """Actualiza el título y la descripción de una tarjeta sin leer el resto del documento"""
+    with connection.cursor() as cursor:
+        if get_search_backend().update_text(cursor, card.pk, card.title, card.description):
+            return
+    # Sin documento previo (p. ej. creada con bulk_create): se indexa completa
+    index_cards([card.pk])
+
+
+def reindex_card_section(card_id, section, appended=None):
+    """
+    Reescribe la sección ``'comments'`` o ``'checklist'`` de una tarjeta. Con
+    ``appended`` (un comentario o item nuevo, que va al final) se agrega el texto
+    sin releer la sección.
+    """
+    backend = get_search_backend()
+    with connection.cursor() as cursor:
+        if appended is not None:
+            updated = backend.append_section(cursor, card_id, section, appended)
+        else:
+            updated = backend.update_section(cursor, card_id, section, section_texts(card_id, section))
+    if not updated:
+        index_cards([card_id])
+
+
+def unindex_cards(card_ids):
+    card_ids = sorted(set(card_ids))
+    if card_ids:
+        with connection.cursor() as cursor:
+            get_search_backend().delete(cursor, card_ids)
+
+
+def unindex_queryset(cards):
+    """Quita del índice las tarjetas de un queryset con un solo DELETE (p. ej. las de una lista)"""
+    backend = get_search_backend()
+    subquery, params = cards.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE {backend.key} IN ({subquery})', params)
+
+
+def rebuild_search_index(chunk_size=1000):
+    """Vacía el índice y vuelve a indexar todas las tarjetas. Devuelve cuántas"""
+    backend = get_search_backend()
+    total = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        card_ids = Card.objects.order_by('pk').values_list('pk', flat=True)
+        for start in range(0, card_ids.count(), chunk_size):
+            documents = card_documents(list(card_ids[start:start + chunk_size]))
+            with connection.cursor() as cursor:
+                backend.insert(cursor, documents)
+            total += len(documents)
+    return total
+
+
+def search_cards(terms, board_ids=None, assigned_to=None, limit=20):
+    """
+    ``[(card_id, puntuación)]`` de las tarjetas que contienen todas las palabras,
+    de mayor a menor puntuación. ``board_ids`` (``None`` = sin restricción) y
+    ``assigned_to`` aplican la visibilidad en la misma consulta.
+    """
+    if not terms or board_ids is not None and not board_ids:
+        return []
+    backend = get_search_backend()
+    condition, score, condition_params, score_params = backend.match(terms)
+    card_table, list_table = Card._meta.db_table, List._meta.db_table
+    sql = [
+        f'SELECT c.id, {score} AS score FROM {TABLE}',
+        f'JOIN {card_table} c ON c.id = {TABLE}.{backend.key}',
+        f'JOIN {list_table} l ON l.id = c.list_id',
+        f'WHERE {condition}',
+    ]
+    params = [*score_params, *condition_params]
+    if board_ids is not None:
+        board_ids = sorted(board_ids)
+        sql.append(f'AND l.board_id IN ({", ".join(["%s"] * len(board_ids))})')
+        params.extend(board_ids)
+    if assigned_to is not None:
+        sql.append('AND c.assigned_to_id = %s')
+        params.append(assigned_to)
+    sql.append('ORDER BY score DESC, c.id LIMIT %s')
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return [(card_id, float(score)) for card_id, score in cursor.fetchall()]
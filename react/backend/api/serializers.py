@@ -1,17 +1,135 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
-from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from .metrics import serializer_timer
+from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog, Notification
+from .ranking import rank_at, schedule_rebalance
+from .summaries import COUNT_FIELDS
+
+
+def parse_field_list(value):
+    """Convierte ``'a, b,c'`` en ``{'a', 'b', 'c'}``; ``None`` si no se indicó"""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fieldset(request):
+    """``(campos, expandidos)`` pedidos con ``?fields=`` y ``?expand=``"""
+    params = getattr(request, 'query_params', request.GET)
+    return parse_field_list(params.get('fields')), parse_field_list(params.get('expand'))
+
+
+class SparseFieldsetMixin:
+    """
+    Campos a demanda para los serializers de la API.
+
+    - ``?fields=id,title`` limita la respuesta a esos campos.
+    - ``?expand=comments`` incluye campos de ``Meta.expandable_fields``, que por
+      defecto se omiten.
+
+    Los parámetros de la petición solo afectan al serializer raíz (no a los
+    anidados); también pueden pasarse como argumentos ``fields=`` y ``expand=``.
+    Los campos escribibles se conservan siempre para validar la entrada; solo se
+    omiten de la respuesta.
+
+    El tiempo de ``to_representation`` se suma a las métricas de la petición.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sparse_fields = fields
+        self._sparse_expand = expand
+
+    def sparse_fieldset(self):
+        """Devuelve ``(campos pedidos o None, campos expandidos)``"""
+        fields, expand = self._sparse_fields, self._sparse_expand
+        request = self.context.get('request')
+        is_root = self.parent is None or (
+            isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+        )
+        if request is not None and is_root:
+            requested, expanded = requested_fieldset(request)
+            fields = requested if fields is None else fields
+            expand = expanded if expand is None else expand
+        return (set(fields) if fields is not None else None), set(expand or ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.sparse_fieldset()
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expand:
+                fields.pop(name, None)
+        # Los campos escribibles no pedidos se quedan para no ignorar su entrada en
+        # POST/PATCH; ``_readable_fields`` los omite de la respuesta
+        self._sparse_readable = requested
+        if requested is not None:
+            for name in list(fields):
+                if name not in requested and fields[name].read_only:
+                    fields.pop(name)
+        return fields
+
+    @property
+    def _readable_fields(self):
+        fields = self.fields  # get_fields fija _sparse_readable
+        requested = self._sparse_readable
+        for field in fields.values():
+            if not field.write_only and (requested is None or field.field_name in requested):
+                yield field
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class RankedSerializerMixin:
+    """
+    Ubicación de listas y tarjetas por índice. El cliente envía ``position`` (0 =
+    primero entre sus hermanos) y se guarda una clave ``rank`` entre los dos
+    vecinos, sin tocar las demás filas. Sin ``position`` un elemento nuevo, o uno
+    que cambia de padre, va al final: queda sin clave y la asigna la señal
+    ``pre_save``, igual que al crear desde el ORM.
+    """
+    rank_parent = None
+    rank_entity = None
+
+    def place(self, validated_data, instance=None):
+        position = validated_data.pop('position', None)
+        parent = validated_data.get(self.rank_parent)
+        if position is None:
+            if instance is not None and parent is not None and getattr(instance, f'{self.rank_parent}_id') != parent.pk:
+                # Sin clave la señal pre_save lo agrega al final del nuevo padre
+                validated_data['rank'] = ''
+            return
+        if parent is None:
+            if instance is None:
+                return
+            parent = getattr(instance, self.rank_parent)
+        model = self.Meta.model
+        siblings = model.objects.filter(**{self.rank_parent: parent})
+        rank = rank_at(siblings, position, exclude=instance.pk if instance is not None else None)
+        validated_data['rank'] = rank
+        board_id = parent.pk if isinstance(parent, Board) else parent.board_id
+        schedule_rebalance(rank, siblings, board_id, self.rank_entity)
+
+    def create(self, validated_data):
+        self.place(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        self.place(validated_data, instance)
+        return super().update(instance, validated_data)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
         read_only_fields = ['id']
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
@@ -44,35 +162,35 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class LabelSerializer(serializers.ModelSerializer):
+class LabelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Label
         fields = ['id', 'board', 'name', 'color', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class BoardBasicSerializer(serializers.ModelSerializer):
+class BoardBasicSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Board
         fields = ['id', 'name', 'color']
 
 
-class ListBasicSerializer(serializers.ModelSerializer):
+class ListBasicSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     board = BoardBasicSerializer(read_only=True)
 
     class Meta:
         model = List
-        fields = ['id', 'title', 'position', 'board']
+        fields = ['id', 'title', 'state', 'rank', 'board']
 
 
-class ChecklistItemSerializer(serializers.ModelSerializer):
+class ChecklistItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ChecklistItem
         fields = ['id', 'text', 'is_completed', 'position', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     
     class Meta:
@@ -81,7 +199,12 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
 
 
-class CardSerializer(serializers.ModelSerializer):
+class CardSerializer(RankedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    rank_parent = 'list'
+    rank_entity = 'card'
+
+    position = serializers.IntegerField(write_only=True, required=False, min_value=0,
+                                        help_text='Índice de destino dentro de la lista (0 = primera)')
     assigned_to = UserSerializer(read_only=True)
     assigned_to_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
@@ -105,54 +228,104 @@ class CardSerializer(serializers.ModelSerializer):
         model = Card
         fields = [
             'id', 'list', 'title', 'description', 'assigned_to', 'assigned_to_id',
-            'due_date', 'position', 'labels', 'label_ids', 'comments',
+            'due_date', 'rank', 'position', 'labels', 'label_ids', 'comments',
             'checklist_items', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
-
-    def update(self, instance, validated_data):
-        # Extraer el campo list si está presente
-        list_value = validated_data.pop('list', None)
-        
-        # Llamar al método update del padre para actualizar los demás campos
-        updated_instance = super().update(instance, validated_data)
-        
-        # Si se proporcionó un nuevo valor para list, actualizarlo explícitamente
-        if list_value is not None:
-            # Obtener el ID de la lista (puede ser un objeto List o un ID)
-            if hasattr(list_value, 'id'):
-                list_id = list_value.id
-            elif isinstance(list_value, int):
-                list_id = list_value
-            else:
-                list_id = list_value
-            
-            # Actualizar el campo list_id directamente
-            updated_instance.list_id = list_id
-            # Guardar solo los campos list y updated_at para eficiencia
-            updated_instance.save(update_fields=['list_id', 'updated_at'])
-        
-        return updated_instance
+        read_only_fields = ['id', 'rank', 'created_at', 'updated_at']
+        extra_kwargs = {
+            # La respuesta y las señales usan el tablero de la lista: se carga al validar
+            'list': {'queryset': List.objects.select_related('board')},
+        }
 
     def to_representation(self, instance):
-        data = super().to_representation(instance)
-        if instance.list_id:
-            data['list'] = ListBasicSerializer(instance.list).data
-        else:
-            data['list'] = None
+        return represent_card_list(self, instance, super().to_representation(instance))
+
+
+def represent_card_list(serializer, instance, data):
+    """Reemplaza el id de la lista de una tarjeta por su representación básica"""
+    if 'list' not in data:
         return data
+    if instance.list_id:
+        # La lista (y su board) llegan ya cargadas desde el prefetch del padre;
+        # se serializan una sola vez por lista y se reutilizan entre sus tarjetas
+        list_cache = serializer.context.setdefault('_list_basic_cache', {})
+        if instance.list_id not in list_cache:
+            list_cache[instance.list_id] = ListBasicSerializer(instance.list).data
+        data['list'] = list_cache[instance.list_id]
+    else:
+        data['list'] = None
+    return data
+
+
+class CardSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Representación compacta de una tarjeta para los listados: en lugar de los
+    comentarios e items de checklist trae sus conteos, anotados en la consulta.
+    ``?expand=comments,checklist_items`` agrega los arreglos completos.
+    """
+    assigned_to = UserSerializer(read_only=True)
+    labels = LabelSerializer(many=True, read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+    checklist_total = serializers.IntegerField(read_only=True)
+    checklist_completed = serializers.IntegerField(read_only=True)
+    comments = CommentSerializer(many=True, read_only=True)
+    checklist_items = ChecklistItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Card
+        fields = [
+            'id', 'list', 'title', 'description', 'assigned_to', 'due_date', 'rank', 'labels',
+            'comment_count', 'checklist_total', 'checklist_completed', 'comments', 'checklist_items',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+        expandable_fields = ['comments', 'checklist_items']
+
+    def to_representation(self, instance):
+        return represent_card_list(self, instance, super().to_representation(instance))
+
+
+class CardBatchOperationSerializer(serializers.Serializer):
+    """Una operación de ``POST /api/cards/batch/``: solo se cambian los campos enviados"""
+    id = serializers.IntegerField()
+    list = serializers.IntegerField(required=False)
+    position = serializers.IntegerField(required=False, min_value=0)
+    assigned_to_id = serializers.IntegerField(required=False, allow_null=True)
+    label_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        if len(attrs) == 1:
+            raise serializers.ValidationError('La operación no cambia ningún campo.')
+        return attrs
 
 
-class ListSerializer(serializers.ModelSerializer):
+class CardBatchSerializer(serializers.Serializer):
+    MAX_OPERATIONS = 500
+
+    operations = CardBatchOperationSerializer(many=True, allow_empty=False, max_length=MAX_OPERATIONS)
+
+    def validate_operations(self, operations):
+        ids = [operation['id'] for operation in operations]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('Cada tarjeta puede aparecer en una sola operación.')
+        return operations
+
+
+class ListSerializer(RankedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    rank_parent = 'board'
+    rank_entity = 'list'
+
     cards = CardSerializer(many=True, read_only=True)
-    
+    position = serializers.IntegerField(write_only=True, required=False, min_value=0,
+                                        help_text='Índice de destino dentro del tablero (0 = primera)')
+
     class Meta:
         model = List
-        fields = ['id', 'board', 'title', 'position', 'cards', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'board', 'title', 'state', 'rank', 'position', 'cards', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'rank', 'created_at', 'updated_at']
 
 
-class BoardSerializer(serializers.ModelSerializer):
+class BoardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher = UserSerializer(read_only=True)
     lists = ListSerializer(many=True, read_only=True)
     labels = LabelSerializer(many=True, read_only=True)
@@ -164,7 +337,31 @@ class BoardSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'teacher', 'created_at', 'updated_at']
 
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class BoardSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Representación del listado de tableros: los contadores salen de ``BoardSummary``
+    y ``overdue_count`` de una anotación del queryset.
+    """
+    teacher = UserSerializer(read_only=True)
+    member_count = serializers.IntegerField(source='summary.member_count', read_only=True)
+    cards = serializers.SerializerMethodField()
+    overdue_count = serializers.IntegerField(read_only=True)
+    last_activity_at = serializers.DateTimeField(source='summary.last_activity_at', read_only=True)
+
+    class Meta:
+        model = Board
+        fields = [
+            'id', 'name', 'description', 'teacher', 'color', 'member_count', 'cards', 'overdue_count',
+            'last_activity_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_cards(self, obj) -> dict:
+        summary = getattr(obj, 'summary', None)
+        return {state: getattr(summary, field, 0) for state, field in COUNT_FIELDS.items()}
+
+
+class ActivityLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     board_name = serializers.CharField(source='board.name', read_only=True)
     
@@ -174,6 +371,62 @@ class ActivityLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'board_name', 'user', 'created_at']
 
 
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    board_name = serializers.CharField(source='board.name', read_only=True)
+    actor = serializers.CharField(source='actor.username', read_only=True, default=None)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'board', 'board_name', 'actor', 'activity_type', 'description', 'metadata', 'is_read', 'created_at']
+        read_only_fields = fields
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    """Sin ``ids`` ni ``up_to`` se marcan todas"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    up_to = serializers.IntegerField(required=False, min_value=0, help_text='Marca las de id menor o igual')
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200, help_text='Palabras a buscar; la última admite prefijo')
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=50)
+
+
+class UserAutocompleteSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=150, help_text='Inicio del nombre, apellido, usuario o correo')
+    role = serializers.ChoiceField(choices=Profile.ROLE_CHOICES, required=False)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=25)
+
+
+# Filas de importación masiva (api.imports): solo validan formato; las referencias
+# entre filas (lista, estudiante, etiquetas) se resuelven en lote al importar.
+class StudentImportSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(required=False, allow_blank=True)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    password = serializers.CharField(required=False, allow_blank=True, write_only=True)
+
+
+class ListImportSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=200)
+    state = serializers.ChoiceField(choices=List.STATE_CHOICES, required=False)
+
 
+class CardImportSerializer(serializers.Serializer):
+    list = serializers.CharField(max_length=200, help_text='Título de la lista')
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True)
+    assigned_to = serializers.CharField(max_length=150, required=False, allow_blank=True,
+                                        help_text='Nombre de usuario del estudiante')
+    due_date = serializers.DateTimeField(required=False, allow_null=True)
+    labels = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
 
 
+class BoardImportSerializer(serializers.Serializer):
+    """Cuerpo JSON de la importación (documentación del esquema)"""
+    students = StudentImportSerializer(many=True, required=False)
+    lists = ListImportSerializer(many=True, required=False)
+    cards = CardImportSerializer(many=True, required=False)
+    default_password = serializers.CharField(required=False, write_only=True,
+                                             help_text='Contraseña de los estudiantes nuevos')
@@ -0,0 +1,420 @@
+"""
+Señales del modelo Kanban.
+
+Mantienen sincronizados los datos derivados (como el snapshot cacheado de cada
+tablero, la tabla de visibilidad ``BoardAccess``, los contadores de
+``BoardSummary`` o el índice de búsqueda) con las escrituras sobre las entidades
+del tablero, e invalidan los tokens de un usuario cuando cambian sus
+credenciales.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .access import ASSIGNED, MEMBER, grant_access, revoke_access, sync_assignment_access
+from .authentication import bump_token_version, invalidate_cached_user
+from .directory import KEY_FIELDS, index_users
+from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, BoardSummary
+from .notifications import forget_board_notifications
+from .ranking import rank_last
+from .revisions import board_id_for
+from .search import index_new_card, reindex_card_text, reindex_card_section, unindex_cards, unindex_queryset
+from .snapshots import invalidate_board_snapshot
+from .summaries import adjust_summary, count_card_moves, move_list_cards, refresh_member_count
+
+
+def cascade_root(origin):
+    """Modelo sobre el que se llamó a ``delete()``, según el ``origin`` de las señales de eliminación"""
+    return getattr(origin, 'model', type(origin))
+
+
+def deleted_with_parent(origin):
+    """
+    En una eliminación de tablero o de lista las tarjetas se tratan en bloque desde
+    el padre (un recálculo, un UPDATE, un DELETE), no una por una.
+    """
+    return cascade_root(origin) in (Board, List)
+
+
+def list_locations(card, list_ids):
+    """
+    ``{list_id: (board_id, state)}`` de las listas de una tarjeta. Se guarda en la
+    instancia mientras dura el guardado o la eliminación, para que las señales no
+    repitan la consulta, y parte de la lista ya cargada en la tarjeta.
+    """
+    known = card.__dict__.setdefault('_list_locations', {})
+    if Card.list.is_cached(card) and card.list is not None:
+        known.setdefault(card.list_id, (card.list.board_id, card.list.state))
+    missing = {list_id for list_id in list_ids if list_id and list_id not in known}
+    if missing:
+        known.update(
+            (list_id, (board_id, state))
+            for list_id, board_id, state in List.objects.filter(pk__in=missing).values_list('id', 'board_id', 'state')
+        )
+    return known
+
+
+def remember_card_lists(card, *lists):
+    """Registra listas ya cargadas (p. ej. la de origen de un movimiento) para las señales de ``card``"""
+    known = card.__dict__.setdefault('_list_locations', {})
+    for list_obj in lists:
+        known[list_obj.pk] = (list_obj.board_id, list_obj.state)
+
+
+@receiver(post_save, sender=Board)
+@receiver(post_save, sender=List)
+@receiver(post_save, sender=Card)
+@receiver(post_save, sender=Label)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=ChecklistItem)
+@receiver(post_delete, sender=Board)
+@receiver(post_delete, sender=List)
+@receiver(post_delete, sender=Card)
+@receiver(post_delete, sender=Label)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ChecklistItem)
+def invalidate_snapshot_on_write(sender, instance, origin=None, **kwargs):
+    # En una cascada basta con invalidar una vez, desde la entidad eliminada
+    root = cascade_root(origin)
+    if root is not sender and root in (Board, List, Card):
+        return
+    invalidate_board_snapshot(board_id_for(instance))
+
+
+@receiver(pre_delete, sender=Board)
+def discount_board_notifications(sender, instance, **kwargs):
+    # Las notificaciones se borran en cascada: sus no leídas dejan de contar
+    forget_board_notifications(instance.pk)
+
+
+@receiver(pre_delete, sender=Board)
+def unindex_board_cards(sender, instance, origin=None, **kwargs):
+    # El acceso y el resumen del tablero se borran en cascada; el índice no tiene FK
+    if cascade_root(origin) is Board:
+        unindex_queryset(Card.objects.filter(list__board_id=instance.pk))
+
+
+@receiver(post_save, sender=Board)
+def create_board_summary(sender, instance, created, **kwargs):
+    if created:
+        BoardSummary.objects.create(board=instance, last_activity_at=instance.created_at)
+
+
+@receiver(m2m_changed, sender=Card.labels.through)
+def invalidate_snapshot_on_card_labels(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # instance es la etiqueta: todas sus tarjetas pertenecen a su tablero
+        invalidate_board_snapshot(instance.board_id)
+    else:
+        invalidate_board_snapshot(board_id_for(instance))
+
+
+@receiver(m2m_changed, sender=Board.students.through)
+def invalidate_snapshot_on_students(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # En un clear inverso pk_set llega vacío: se resuelven los tableros antes de borrar
+        pk_set = set(instance.student_boards.values_list('pk', flat=True))
+        action = 'post_clear'
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # instance es el usuario y pk_set los tableros afectados
+        for board_id in pk_set or ():
+            invalidate_board_snapshot(board_id)
+    else:
+        invalidate_board_snapshot(instance.pk)
+
+
+@receiver(m2m_changed, sender=Board.students.through)
+def sync_member_access(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        if reverse:
+            grant_access((instance.pk, board_id, MEMBER) for board_id in pk_set)
+        else:
+            grant_access((user_id, instance.pk, MEMBER) for user_id in pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            revoke_access(MEMBER, user_ids=[instance.pk], board_ids=pk_set)
+        else:
+            revoke_access(MEMBER, user_ids=pk_set, board_ids=[instance.pk])
+    elif action == 'post_clear':
+        if reverse:
+            revoke_access(MEMBER, user_ids=[instance.pk])
+        else:
+            revoke_access(MEMBER, board_ids=[instance.pk])
+
+
+@receiver(m2m_changed, sender=Board.students.through)
+def count_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._summary_boards = set(instance.student_boards.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_member_count([instance.pk])
+    elif action == 'post_clear':
+        refresh_member_count(instance.__dict__.pop('_summary_boards', ()))
+    else:
+        refresh_member_count(pk_set or ())
+
+
+@receiver(pre_save, sender=List)
+def assign_list_rank(sender, instance, **kwargs):
+    # Sin clave explícita la lista se agrega al final del tablero
+    if not instance.rank:
+        instance.rank = rank_last(List.objects.filter(board_id=instance.board_id))
+
+
+@receiver(pre_save, sender=Card)
+def assign_card_rank(sender, instance, **kwargs):
+    if not instance.rank:
+        instance.rank = rank_last(Card.objects.filter(list_id=instance.list_id))
+
+
+@receiver(post_init, sender=Card)
+def remember_card_assignment(sender, instance, **kwargs):
+    # Con campos diferidos no se consulta nada aquí: el estado original se lee al guardar
+    values = instance.__dict__
+    if 'assigned_to_id' in values and 'list_id' in values:
+        instance._access_origin = (values['assigned_to_id'], values['list_id'])
+    if 'list_id' in values:
+        instance._summary_list = values['list_id']
+
+
+@receiver(pre_save, sender=Card)
+def load_card_assignment(sender, instance, **kwargs):
+    if not instance._state.adding and not hasattr(instance, '_access_origin'):
+        instance._access_origin = (
+            Card.objects.filter(pk=instance.pk).values_list('assigned_to_id', 'list_id').first()
+        )
+        if instance._access_origin and not hasattr(instance, '_summary_list'):
+            instance._summary_list = instance._access_origin[1]
+
+
+@receiver(post_save, sender=Card)
+def sync_card_access(sender, instance, created, **kwargs):
+    current = (instance.assigned_to_id, instance.list_id)
+    origin = None if created else getattr(instance, '_access_origin', None)
+    instance._access_origin = current
+    if origin == current:
+        return
+    old_assigned_to_id, old_list_id = origin or (None, None)
+    lists = list_locations(
+        instance, [instance.list_id if instance.assigned_to_id else None, old_list_id if old_assigned_to_id else None]
+    )
+    pair = (instance.assigned_to_id, lists[instance.list_id][0]) if instance.assigned_to_id else None
+    old_pair = (old_assigned_to_id, lists.get(old_list_id, (None,))[0]) if old_assigned_to_id else None
+    if pair == old_pair:
+        return
+    # La tarjeta está en el tablero nuevo: el acceso se concede sin recalcular
+    if pair:
+        grant_access([(*pair, ASSIGNED)])
+    if old_pair:
+        sync_assignment_access([old_pair])
+
+
+@receiver(post_delete, sender=Card)
+def sync_deleted_card_access(sender, instance, origin=None, **kwargs):
+    if deleted_with_parent(origin):
+        return
+    assigned_to_id, list_id = getattr(instance, '_access_origin', (instance.assigned_to_id, instance.list_id))
+    if assigned_to_id:
+        board_id = list_locations(instance, [list_id]).get(list_id, (None,))[0]
+        sync_assignment_access([(assigned_to_id, board_id)])
+
+
+@receiver(post_save, sender=Card)
+def count_saved_card(sender, instance, created, **kwargs):
+    origin = None if created else getattr(instance, '_summary_list', None)
+    instance._summary_list = instance.list_id
+    if created or (origin is not None and origin != instance.list_id):
+        move = (origin, instance.list_id)
+        count_card_moves([move], list_locations(instance, move))
+
+
+@receiver(post_delete, sender=Card)
+def count_deleted_card(sender, instance, origin=None, **kwargs):
+    if deleted_with_parent(origin):
+        return
+    move = (getattr(instance, '_summary_list', instance.list_id), None)
+    count_card_moves([move], list_locations(instance, move))
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def forget_card_lists(sender, instance, **kwargs):
+    # Las listas pueden cambiar de etapa o de tablero antes del próximo guardado
+    instance.__dict__.pop('_list_locations', None)
+
+
+@receiver(pre_delete, sender=List)
+def collect_list_cards(sender, instance, origin=None, **kwargs):
+    # Una consulta para todas las tarjetas de la lista, antes de que se borren
+    if cascade_root(origin) is not List:
+        return
+    assignees = (
+        Card.objects.filter(list_id=instance.pk).order_by()
+        .values_list('assigned_to_id').annotate(total=Count('id'))
+    )
+    instance._deleted_cards = dict(assignees)
+    unindex_queryset(Card.objects.filter(list_id=instance.pk))
+
+
+@receiver(post_delete, sender=List)
+def sync_deleted_list_access(sender, instance, **kwargs):
+    assignees = getattr(instance, '_deleted_cards', {})
+    sync_assignment_access((user_id, instance.board_id) for user_id in assignees if user_id)
+
+
+@receiver(post_delete, sender=List)
+def count_deleted_list_cards(sender, instance, **kwargs):
+    total = sum(getattr(instance, '_deleted_cards', {}).values())
+    if total:
+        adjust_summary(instance.board_id, cards={instance.state: -total})
+
+
+@receiver(post_init, sender=List)
+def remember_list_board(sender, instance, **kwargs):
+    values = instance.__dict__
+    if 'board_id' in values:
+        instance._access_board = values['board_id']
+    if 'board_id' in values and 'state' in values:
+        instance._summary_origin = (values['board_id'], values['state'])
+
+
+@receiver(post_save, sender=List)
+def sync_moved_list_access(sender, instance, created, **kwargs):
+    old_board_id = getattr(instance, '_access_board', None)
+    instance._access_board = instance.board_id
+    if created or old_board_id is None or old_board_id == instance.board_id:
+        return
+    # La lista cambió de tablero: sus asignados pueden ganar o perder acceso en ambos
+    assignees = set(
+        instance.cards.filter(assigned_to__isnull=False).values_list('assigned_to_id', flat=True)
+    )
+    sync_assignment_access(
+        [(user_id, old_board_id) for user_id in assignees]
+        + [(user_id, instance.board_id) for user_id in assignees]
+    )
+
+
+@receiver(post_save, sender=List)
+def count_moved_list_cards(sender, instance, created, **kwargs):
+    # Cambio de etapa o de tablero: sus tarjetas pasan a contar en otro contador
+    origin = getattr(instance, '_summary_origin', None)
+    current = instance._summary_origin = (instance.board_id, instance.state)
+    if not created and origin is not None and origin != current:
+        move_list_cards(instance.pk, origin, current)
+
+
+# Campos de cada modelo que forman parte del documento de búsqueda de la tarjeta
+SEARCH_FIELDS = {
+    Card: ('title', 'description'),
+    Comment: ('content',),
+    ChecklistItem: ('text',),
+}
+# Sección del documento que ocupa el texto de cada modelo hijo de la tarjeta
+SEARCH_SECTIONS = {
+    Comment: 'comments',
+    ChecklistItem: 'checklist',
+}
+
+
+@receiver(post_init, sender=Card)
+@receiver(post_init, sender=Comment)
+@receiver(post_init, sender=ChecklistItem)
+def remember_search_text(sender, instance, **kwargs):
+    values = instance.__dict__
+    fields = SEARCH_FIELDS[sender]
+    if all(field in values for field in fields):
+        instance._search_origin = tuple(values[field] for field in fields)
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=ChecklistItem)
+def index_saved_text(sender, instance, created, **kwargs):
+    origin = getattr(instance, '_search_origin', None)
+    current = instance._search_origin = tuple(getattr(instance, field) for field in SEARCH_FIELDS[sender])
+    if not created and origin == current:
+        return
+    # Solo se reescribe la parte del documento que cambió
+    if sender is not Card:
+        reindex_card_section(instance.card_id, SEARCH_SECTIONS[sender], appended=current[0] if created else None)
+    elif created:
+        index_new_card(instance)
+    else:
+        reindex_card_text(instance)
+
+
+@receiver(post_delete, sender=Card)
+def unindex_deleted_card(sender, instance, origin=None, **kwargs):
+    if not deleted_with_parent(origin):
+        unindex_cards([instance.pk])
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ChecklistItem)
+def index_deleted_text(sender, instance, origin=None, **kwargs):
+    # En una eliminación en cascada la tarjeta también se elimina: no hay nada que reindexar
+    if cascade_root(origin) is sender:
+        reindex_card_section(instance.card_id, SEARCH_SECTIONS[sender])
+
+
+@receiver(post_init, sender=User)
+def remember_credentials(sender, instance, **kwargs):
+    values = instance.__dict__
+    if 'password' in values and 'is_active' in values:
+        instance._credentials_origin = (values['password'], values['is_active'])
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_credentials_change(sender, instance, created, update_fields=None, **kwargs):
+    origin = getattr(instance, '_credentials_origin', None)
+    instance._credentials_origin = (instance.password, instance.is_active)
+    if created or origin is None:
+        return
+    if update_fields is not None and not {'password', 'is_active'} & set(update_fields):
+        return
+    password, is_active = origin
+    # Cambio de contraseña o desactivación: los tokens emitidos dejan de valer
+    if instance.password != password or (is_active and not instance.is_active):
+        bump_token_version(instance)
+
+
+@receiver(post_init, sender=User)
+def remember_search_keys(sender, instance, **kwargs):
+    values = instance.__dict__
+    if all(field in values for field in KEY_FIELDS):
+        instance._keys_origin = tuple(values[field] for field in KEY_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def index_user_keys(sender, instance, created, update_fields=None, **kwargs):
+    # Los inicios de sesión guardan solo last_login
+    if update_fields is not None and not set(KEY_FIELDS) & set(update_fields):
+        return
+    origin = getattr(instance, '_keys_origin', None)
+    current = instance._keys_origin = tuple(getattr(instance, field) for field in KEY_FIELDS)
+    if created or origin != current:
+        index_users([instance])
+
+
+@receiver(post_init, sender=Profile)
+def remember_role(sender, instance, **kwargs):
+    if 'role' in instance.__dict__:
+        instance._role_origin = instance.role
+
+
+@receiver(pre_save, sender=Profile)
+def bump_version_on_role_change(sender, instance, **kwargs):
+    origin = getattr(instance, '_role_origin', None)
+    if not instance._state.adding and origin is not None and origin != instance.role:
+        # El rol va en los claims del token: los tokens emitidos dejan de valer
+        instance.token_version += 1
+        instance._role_origin = instance.role
+        invalidate_cached_user(instance.user_id)
@@ -0,0 +1,130 @@
+"""
+Snapshot normalizado de un tablero.
+
+El snapshot reúne en un solo documento el tablero, sus listas, tarjetas, etiquetas,
+comentarios, items de checklist y miembros. Las relaciones se expresan con ids en
+lugar de anidar objetos, y el JSON ya renderizado se guarda en caché por tablero
+hasta que alguna escritura sobre el tablero lo invalida (ver ``api.signals``).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Board, List, Card, Label, Comment, ChecklistItem
+from .renderers import json_dumps
+
+SNAPSHOT_CACHE_TIMEOUT = getattr(settings, 'BOARD_SNAPSHOT_CACHE_TIMEOUT', 60 * 15)
+
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name')
+
+
+def snapshot_cache_key(board_id):
+    return f'board-snapshot:{board_id}'
+
+
+def board_row(board):
+    student_ids = list(
+        Board.students.through.objects.filter(board_id=board.id).values_list('user_id', flat=True)
+    )
+    return {
+        'id': board.id,
+        'name': board.name,
+        'description': board.description,
+        'color': board.color,
+        'teacher': board.teacher_id,
+        'students': student_ids,
+        'revision': board.revision,
+        'created_at': board.created_at,
+        'updated_at': board.updated_at,
+    }
+
+
+def list_rows(**filters):
+    return list(
+        List.objects.filter(**filters)
+        .values('id', 'title', 'state', 'rank', 'created_at', 'updated_at')
+    )
+
+
+def card_rows(**filters):
+    cards = list(
+        Card.objects.filter(**filters)
+        .values('id', 'list', 'title', 'description', 'assigned_to', 'due_date',
+                'rank', 'created_at', 'updated_at')
+    )
+    card_labels = {}
+    for card_id, label_id in Card.labels.through.objects.filter(
+        card_id__in=Card.objects.filter(**filters).values('id')
+    ).values_list('card_id', 'label_id'):
+        card_labels.setdefault(card_id, []).append(label_id)
+    for card in cards:
+        card['labels'] = card_labels.get(card['id'], [])
+    return cards
+
+
+def label_rows(**filters):
+    return list(Label.objects.filter(**filters).values('id', 'name', 'color', 'created_at'))
+
+
+def comment_rows(**filters):
+    return list(
+        Comment.objects.filter(**filters)
+        .values('id', 'card', 'author', 'content', 'created_at', 'updated_at')
+    )
+
+
+def checklist_item_rows(**filters):
+    return list(
+        ChecklistItem.objects.filter(**filters)
+        .values('id', 'card', 'text', 'is_completed', 'position', 'created_at', 'updated_at')
+    )
+
+
+def build_board_snapshot(board):
+    """Construye el snapshot normalizado con una consulta por tipo de entidad"""
+    board_data = board_row(board)
+    cards = card_rows(list__board_id=board.id)
+    comments = comment_rows(card__list__board_id=board.id)
+
+    member_ids = {board.teacher_id, *board_data['students']}
+    member_ids.update(card['assigned_to'] for card in cards if card['assigned_to'])
+    member_ids.update(comment['author'] for comment in comments)
+    members = list(User.objects.filter(id__in=member_ids).order_by('id').values(*USER_FIELDS))
+
+    return {
+        'board': board_data,
+        'lists': list_rows(board_id=board.id),
+        'cards': cards,
+        'labels': label_rows(board_id=board.id),
+        'comments': comments,
+        'checklist_items': checklist_item_rows(card__list__board_id=board.id),
+        'members': members,
+    }
+
+
+def get_board_snapshot_json(board):
+    """
+    Devuelve ``(json, hit)`` con el snapshot renderizado del tablero, leyendo de la
+    caché cuando está disponible.
+    """
+    key = snapshot_cache_key(board.id)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload, True
+    payload = json_dumps(build_board_snapshot(board))
+    cache.set(key, payload, SNAPSHOT_CACHE_TIMEOUT)
+    return payload, False
+
+
+def invalidate_board_snapshot(board_id):
+    """
+    Elimina el snapshot cacheado del tablero. Se borra de inmediato y otra vez al
+    confirmar la transacción, para que una lectura concurrente no deje en caché
+    datos anteriores a la escritura.
+    """
+    if not board_id:
+        return
+    key = snapshot_cache_key(board_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,157 @@
+"""
+Resumen por tablero para el listado de tableros.
+
+``BoardSummary`` guarda, por tablero, el número de miembros, las tarjetas en cada
+etapa del flujo de trabajo y la fecha de la última revisión. Las señales
+(``api.signals``) lo actualizan con deltas al crear, mover o eliminar tarjetas,
+al cambiar la etapa o el tablero de una lista y al cambiar los miembros, y
+``record_change``/``record_changes`` actualizan la fecha de actividad: el listado
+solo lee una fila por tablero.
+
+Las tarjetas vencidas son la excepción: dejan de estar al día con el paso del
+tiempo sin que nada se escriba, así que ``overdue_count`` es una subconsulta
+correlacionada que se evalúa en la misma consulta del listado.
+
+Las escrituras que no emiten señales (``bulk_create``, ``bulk_update``) deben
+llamar a ``adjust_summary`` con los deltas. ``refresh_board_summaries`` recalcula
+los contadores desde las tablas de origen y corrige los desvíos.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Board, List, Card, BoardSummary
+
+# Etapa de la lista -> contador de tarjetas
+COUNT_FIELDS = {
+    'pending': 'pending_count',
+    'in_progress': 'in_progress_count',
+    'done': 'done_count',
+}
+
+
+def adjust_summary(board_id, members=0, cards=None):
+    """
+    Suma ``members`` y ``cards`` (``{etapa: n}``, ``n`` puede ser negativo) a los
+    contadores del tablero con un solo UPDATE.
+    """
+    deltas = {'member_count': members}
+    for state, amount in (cards or {}).items():
+        deltas[COUNT_FIELDS[state]] = amount
+    changes = {
+        field: Greatest(F(field) + amount, Value(0))
+        for field, amount in deltas.items() if amount
+    }
+    if changes:
+        BoardSummary.objects.filter(board_id=board_id).update(**changes)
+
+
+def card_count_deltas(moves, lists=None):
+    """
+    Deltas ``{board_id: {etapa: n}}`` de las tarjetas que pasan de una lista a
+    otra. ``moves`` son pares ``(old_list_id, new_list_id)``; ``None`` en el origen
+    es una tarjeta creada y en el destino una eliminada. ``lists`` (``{list_id:
+    (board_id, state)}``) son las listas ya conocidas; las demás se leen con una
+    consulta por lote.
+    """
+    moves = [(old, new) for old, new in moves if old != new]
+    lists = dict(lists or {})
+    missing = {list_id for move in moves for list_id in move if list_id and list_id not in lists}
+    if missing:
+        lists.update(
+            (list_id, (board_id, state))
+            for list_id, board_id, state in List.objects.filter(pk__in=missing).values_list('id', 'board_id', 'state')
+        )
+    deltas = defaultdict(Counter)
+    for old, new in moves:
+        if old in lists:
+            board_id, state = lists[old]
+            deltas[board_id][state] -= 1
+        if new in lists:
+            board_id, state = lists[new]
+            deltas[board_id][state] += 1
+    return deltas
+
+
+def count_card_moves(moves, lists=None):
+    for board_id, cards in card_count_deltas(moves, lists).items():
+        adjust_summary(board_id, cards=cards)
+
+
+def move_list_cards(list_id, origin, current):
+    """Traslada las tarjetas de una lista cuyo ``(board_id, state)`` cambió de ``origin`` a ``current``"""
+    total = Card.objects.filter(list_id=list_id).count()
+    if not total:
+        return
+    with transaction.atomic(savepoint=False):
+        adjust_summary(origin[0], cards={origin[1]: -total})
+        adjust_summary(current[0], cards={current[1]: total})
+
+
+def refresh_member_count(board_ids):
+    """Recuenta los miembros de ``board_ids`` con un solo UPDATE"""
+    Membership = Board.students.through
+    members = (
+        Membership.objects.filter(board_id=OuterRef('board_id')).order_by()
+        .values('board_id').annotate(total=Count('id')).values('total')
+    )
+    BoardSummary.objects.filter(board_id__in=board_ids).update(
+        member_count=Coalesce(Subquery(members, output_field=IntegerField()), 0)
+    )
+
+
+def touch_summary(board_id):
+    BoardSummary.objects.filter(board_id=board_id).update(last_activity_at=timezone.now())
+
+
+def overdue_count():
+    """
+    Anotación con las tarjetas vencidas de cada tablero que no están en una lista
+    completada. Depende de la hora actual, así que se calcula al leer.
+    """
+    overdue = (
+        Card.objects.filter(list__board_id=OuterRef('pk'), due_date__lt=timezone.now())
+        .exclude(list__state='done').order_by().values('list__board_id')
+        .annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(overdue, output_field=IntegerField()), 0)
+
+
+def expected_summaries(board_ids=None):
+    """``{board_id: {campo: valor}}`` calculado desde las tablas de origen"""
+    boards = Board.objects.all() if board_ids is None else Board.objects.filter(pk__in=board_ids)
+    expected = {
+        board_id: {'member_count': members, **{field: 0 for field in COUNT_FIELDS.values()}}
+        for board_id, members in boards.order_by().annotate(members=Count('students')).values_list('id', 'members')
+    }
+    for board_id, state, total in (
+        Card.objects.filter(list__board_id__in=expected).order_by()
+        .values_list('list__board_id', 'list__state').annotate(total=Count('id'))
+    ):
+        expected[board_id][COUNT_FIELDS[state]] = total
+    return expected
+
+
+def refresh_board_summaries(board_ids=None):
+    """
+    Crea los resúmenes que falten y corrige los contadores que no coinciden con
+    las tablas de origen. Devuelve el número de resúmenes corregidos.
+    """
+    expected = expected_summaries(board_ids)
+    fields = ['member_count', *COUNT_FIELDS.values()]
+    with transaction.atomic():
+        BoardSummary.objects.bulk_create(
+            [BoardSummary(board_id=board_id) for board_id in expected], ignore_conflicts=True
+        )
+        stale = []
+        for summary in BoardSummary.objects.select_for_update().filter(board_id__in=expected):
+            values = expected[summary.board_id]
+            if any(getattr(summary, field) != values[field] for field in fields):
+                for field in fields:
+                    setattr(summary, field, values[field])
+                stale.append(summary)
+        BoardSummary.objects.bulk_update(stale, fields, batch_size=1000)
+    return len(stale)
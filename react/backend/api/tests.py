@@ -1,9 +1,1709 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import io
+import json
+import random
+import tempfile
+import threading
+import uuid
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 
+from api.access import access_differences
+from api.activity import ActivityLogWriter
+from api.authentication import CachedJWTAuthentication, get_user_cache
+from api.authz import get_authz
+from api.directory import index_users
+from api.metrics import registry
+from api.models import (
+    Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog, BoardAccess, Notification, NotificationInbox,
+    UserSearchKey,
+)
+from api.permissions import visible_boards
+from api.ranking import INTEGER_WIDTH, RANK_MAX_LENGTH, REBALANCE_LENGTH, key_between, spread_keys
+from api.realtime import LocalBroker, board_channel
+from api.renderers import FastJSONRenderer, json_dumps
+from api.search import TABLE as SEARCH_TABLE, fold, search_cards
+from api.serializers import CardBatchSerializer
+from api.summaries import expected_summaries, refresh_board_summaries
 
 
+def crear_usuario(username, role):
+    user = User.objects.create_user(username=username, password='password123')
+    Profile.objects.create(user=user, role=role)
+    return user
 
 
+@override_settings(ACTIVITY_LOG_WRITER={'MODE': 'inline'}, RANK_REBALANCE={'MODE': 'inline'})
+class KanbanTestCase(TestCase):
+    """Base con un docente, un estudiante y un tablero con tres listas"""
 
+    def setUp(self):
+        cache.clear()
+        get_user_cache().clear()
+        self.teacher = crear_usuario('docente', 'teacher')
+        self.student = crear_usuario('estudiante', 'student')
+        self.board = Board.objects.create(name='Matemáticas', teacher=self.teacher)
+        self.board.students.add(self.student)
+        self.lists = [
+            List.objects.create(board=self.board, title=title, state=state)
+            for title, state in [('Pendiente', 'pending'), ('En Progreso', 'in_progress'), ('Completada', 'done')]
+        ]
+        self.label = Label.objects.create(board=self.board, name='Examen')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def crear_tarjetas(self, cantidad):
+        for idx in range(cantidad):
+            card = Card.objects.create(
+                list=self.lists[idx % len(self.lists)],
+                title=f'Tarea {idx}',
+                assigned_to=self.student,
+            )
+            card.labels.add(self.label)
+            Comment.objects.create(card=card, author=self.student, content='Listo')
+            ChecklistItem.objects.create(card=card, text='Paso 1')
+
+
+class BoardQueryCountTests(KanbanTestCase):
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_detalle_de_tablero_no_crece_con_las_tarjetas(self):
+        url = f'/api/boards/{self.board.id}/'
+        self.crear_tarjetas(3)
+        pocas = self.contar_consultas(url)
+        self.crear_tarjetas(30)
+        muchas = self.contar_consultas(url)
+        self.assertEqual(pocas, muchas)
+
+    def test_listado_de_tableros_no_crece_con_las_tarjetas(self):
+        self.crear_tarjetas(3)
+        pocas = self.contar_consultas('/api/boards/')
+        self.crear_tarjetas(30)
+        Board.objects.create(name='Física', teacher=self.teacher)
+        muchas = self.contar_consultas('/api/boards/')
+        self.assertEqual(pocas, muchas)
+
+    def test_listado_de_tarjetas_no_crece_con_las_tarjetas(self):
+        self.crear_tarjetas(3)
+        pocas = self.contar_consultas(f'/api/cards/?board={self.board.id}')
+        self.crear_tarjetas(15)
+        muchas = self.contar_consultas(f'/api/cards/?board={self.board.id}')
+        self.assertEqual(pocas, muchas)
+
+    def test_representacion_de_tarjeta_reutiliza_lista_y_tablero(self):
+        self.crear_tarjetas(3)
+        response = self.client.get(f'/api/boards/{self.board.id}/')
+        card = response.data['lists'][0]['cards'][0]
+        self.assertEqual(card['list']['id'], self.lists[0].id)
+        self.assertEqual(card['list']['board']['id'], self.board.id)
+
+
+class CardWriteQueryCountTests(KanbanTestCase):
+    """Las señales, las revisiones y el snapshot reutilizan la lista ya cargada"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(6)
+        self.card = Card.objects.filter(list=self.lists[0]).first()
+
+    def test_crear_tarjeta(self):
+        with self.assertNumQueries(14):
+            response = self.client.post(
+                '/api/cards/', {'list': self.lists[0].id, 'title': 'Nueva', 'assigned_to_id': self.student.id},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_editar_titulo(self):
+        with self.assertNumQueries(14):
+            response = self.client.patch(f'/api/cards/{self.card.id}/', {'title': 'Otra'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_mover_tarjeta(self):
+        with self.assertNumQueries(16):
+            response = self.client.patch(f'/api/cards/{self.card.id}/', {'list': self.lists[1].id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['list']['board']['id'], self.board.id)
+
+    def test_comentar(self):
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/comments/', {'card': self.card.id, 'content': 'Hola'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_eliminar_tarjeta(self):
+        with self.assertNumQueries(15):
+            response = self.client.delete(f'/api/cards/{self.card.id}/')
+        self.assertEqual(response.status_code, 204)
+
+
+class BoardSnapshotTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(4)
+        self.url = f'/api/boards/{self.board.id}/snapshot/'
+
+    def test_snapshot_normalizado(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['board']['id'], self.board.id)
+        self.assertEqual(data['board']['students'], [self.student.id])
+        self.assertEqual(len(data['lists']), 3)
+        self.assertEqual(len(data['cards']), 4)
+        self.assertEqual(len(data['comments']), 4)
+        self.assertEqual(len(data['checklist_items']), 4)
+        self.assertEqual(data['cards'][0]['labels'], [self.label.id])
+        self.assertIn(data['cards'][0]['list'], [lst.id for lst in self.lists])
+        self.assertEqual({m['id'] for m in data['members']}, {self.teacher.id, self.student.id})
+
+    def test_segunda_lectura_sale_de_cache(self):
+        self.assertEqual(self.client.get(self.url)['X-Snapshot-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Snapshot-Cache'], 'hit')
+        # Solo la consulta del tablero para comprobar el acceso
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_escrituras_invalidan_el_snapshot(self):
+        escrituras = [
+            lambda: Card.objects.create(list=self.lists[0], title='Nueva'),
+            lambda: Comment.objects.create(card=Card.objects.first(), author=self.teacher, content='Hola'),
+            lambda: ChecklistItem.objects.first().save(),
+            lambda: Label.objects.create(board=self.board, name='Tarea'),
+            lambda: Card.objects.first().labels.clear(),
+            lambda: List.objects.first().delete(),
+        ]
+        for escribir in escrituras:
+            self.client.get(self.url)
+            escribir()
+            self.assertEqual(self.client.get(self.url)['X-Snapshot-Cache'], 'miss')
+
+    def test_eliminacion_en_cascada_invalida_una_vez(self):
+        with mock.patch('api.signals.invalidate_board_snapshot') as invalidate:
+            self.lists[0].delete()
+            Card.objects.first().delete()
+        self.assertEqual(invalidate.call_args_list, [mock.call(self.board.id)] * 2)
+
+    def test_estudiante_miembro_puede_leer_snapshot(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        otro = crear_usuario('otro', 'student')
+        self.client.force_authenticate(otro)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class BoardChangesTests(KanbanTestCase):
+    def cambios(self, since):
+        return self.client.get(f'/api/boards/{self.board.id}/changes/?since={since}')
+
+    def revision(self):
+        self.board.refresh_from_db()
+        return self.board.revision
+
+    def test_tablero_sin_cambios_responde_vacio(self):
+        response = self.cambios(self.revision())
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.content, b'')
+
+    def test_creaciones_actualizaciones_y_tombstones(self):
+        inicio = self.revision()
+        card_id = self.client.post('/api/cards/', {'list': self.lists[0].id, 'title': 'Ensayo'}).data['id']
+        self.client.post('/api/comments/', {'card': card_id, 'content': 'Revisar'})
+        self.client.patch(f'/api/lists/{self.lists[1].id}/', {'title': 'Haciendo'})
+        self.assertEqual(self.revision(), inicio + 3)
+
+        data = self.cambios(inicio).data
+        self.assertEqual(data['revision'], inicio + 3)
+        self.assertEqual([card['id'] for card in data['cards']], [card_id])
+        self.assertEqual(len(data['comments']), 1)
+        self.assertEqual(data['lists'][0]['title'], 'Haciendo')
+        self.assertEqual(data['deleted'], [])
+
+        medio = self.revision()
+        self.client.delete(f'/api/cards/{card_id}/')
+        data = self.cambios(medio).data
+        self.assertNotIn('cards', data)
+        self.assertEqual(data['deleted'], [{'entity': 'card', 'id': card_id, 'revision': medio + 1}])
+
+    def test_revision_invalida(self):
+        self.assertEqual(self.cambios('abc').status_code, 400)
+        self.assertTrue(self.cambios(self.revision() + 5).data['reset'])
+
+
+class ConditionalGetTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(3)
+
+    def assertNotModifiedSinSerializar(self, url, **headers):
+        with mock.patch.object(BaseSerializer, '__init__', side_effect=AssertionError('serializer creado')):
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        return response
+
+    def test_etag_en_listados_y_detalles(self):
+        urls = [
+            '/api/boards/',
+            f'/api/boards/{self.board.id}/',
+            f'/api/lists/?board={self.board.id}',
+            f'/api/cards/?board={self.board.id}',
+            f'/api/cards/{Card.objects.first().id}/',
+            f'/api/labels/?board={self.board.id}',
+            '/api/comments/',
+            '/api/checklist-items/',
+            '/api/profiles/',
+        ]
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotModifiedSinSerializar(url, if_none_match=response['ETag'])
+
+    def test_last_modified_en_detalle(self):
+        url = f'/api/cards/{Card.objects.first().id}/'
+        response = self.client.get(url)
+        self.assertNotModifiedSinSerializar(url, if_modified_since=response['Last-Modified'])
+
+    def test_escritura_anidada_cambia_el_etag(self):
+        url = f'/api/boards/{self.board.id}/'
+        etag = self.client.get(url)['ETag']
+        card = Card.objects.first()
+        self.client.post('/api/comments/', {'card': card.id, 'content': 'Nuevo'})
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_eliminacion_cambia_el_etag_del_listado(self):
+        url = f'/api/cards/?board={self.board.id}'
+        etag = self.client.get(url)['ETag']
+        Card.objects.first().delete()
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+
+    def test_etag_depende_del_usuario(self):
+        url = f'/api/boards/{self.board.id}/'
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+
+    def test_esquema_sin_documentacion_interna(self):
+        paths = SchemaGenerator().get_schema(request=None, public=True)['paths']
+        for path, metodo in [('/api/boards/', 'get'), ('/api/cards/{id}/', 'get'), ('/api/comments/', 'get')]:
+            self.assertNotIn('Not Modified', paths[path][metodo].get('description', ''), path)
+
+    def test_snapshot_condicional(self):
+        url = f'/api/boards/{self.board.id}/snapshot/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+
+class BoardEventsTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.broker = LocalBroker()
+        patcher = mock.patch('api.realtime.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        events_patcher = mock.patch('api.events.get_broker', return_value=self.broker)
+        events_patcher.start()
+        self.addCleanup(events_patcher.stop)
+
+    async def test_stream_entrega_eventos_del_tablero(self):
+        token = AccessToken.for_user(self.teacher)
+        response = await self.async_client.get(f'/api/boards/{self.board.id}/events/?token={token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertIn(b'event: ready', await anext(stream))
+        self.assertEqual(self.broker.subscriber_count(board_channel(self.board.id)), 1)
+
+        self.broker.publish(board_channel(self.board.id), {'type': 'card.moved', 'id': 1, 'revision': 7})
+        chunk = await anext(stream)
+        self.assertIn(b'id: 7\nevent: card.moved\n', chunk)
+        await stream.aclose()
+
+    async def test_stream_requiere_acceso_al_tablero(self):
+        response = await self.async_client.get(f'/api/boards/{self.board.id}/events/')
+        self.assertEqual(response.status_code, 401)
+        otro = await sync_to_async(crear_usuario)('otro', 'student')
+        token = AccessToken.for_user(otro)
+        response = await self.async_client.get(f'/api/boards/{self.board.id}/events/?token={token}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_escrituras_publican_tras_el_commit(self):
+        card = Card.objects.create(list=self.lists[0], title='Mover')
+        item = ChecklistItem.objects.create(card=card, text='Paso')
+        with mock.patch.object(self.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.client.patch(f'/api/cards/{card.id}/', {'list': self.lists[1].id}, format='json')
+                self.client.post('/api/comments/', {'card': card.id, 'content': 'Hecho'})
+                self.client.patch(f'/api/checklist-items/{item.id}/', {'is_completed': True}, format='json')
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+        tipos = [llamada.args[1]['type'] for llamada in publish.call_args_list]
+        self.assertEqual(tipos, ['card.moved', 'comment.created', 'checklist_item.completed'])
+        self.assertEqual(publish.call_args_list[0].args[1]['new_list'], self.lists[1].id)
+
+
+class ActivityLogWriterTests(KanbanTestCase):
+    def entrada(self, descripcion='x'):
+        return ActivityLog(board=self.board, user=self.teacher, activity_type='card_updated', description=descripcion)
+
+    def test_se_escribe_al_confirmar_la_transaccion(self):
+        card = Card.objects.create(list=self.lists[0], title='Ensayo')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post('/api/comments/', {'card': card.id, 'content': 'Revisar'})
+        self.assertFalse(ActivityLog.objects.exists())
+        for callback in callbacks:
+            callback()
+        log = ActivityLog.objects.get()
+        self.assertEqual(log.activity_type, 'comment_added')
+        self.assertEqual(log.board_id, self.board.id)
+
+    def test_el_hilo_agrupa_en_lotes(self):
+        writer = ActivityLogWriter(batch_size=2, flush_interval=60)
+        with mock.patch.object(writer, 'write') as write:
+            for idx in range(5):
+                writer.submit(self.entrada(str(idx)))
+            writer.flush()
+            writer.stop()
+        lotes = [[e.description for e in llamada.args[0]] for llamada in write.call_args_list]
+        self.assertEqual(lotes, [['0', '1'], ['2', '3'], ['4']])
+
+    def test_cola_llena_descarta_sin_bloquear(self):
+        writer = ActivityLogWriter(batch_size=1, max_queue_size=1)
+        bloqueo = threading.Event()
+        with mock.patch.object(writer, 'write', side_effect=lambda batch: bloqueo.wait(5)):
+            with self.assertLogs('api.activity', level='WARNING'):
+                for idx in range(20):
+                    writer.submit(self.entrada(str(idx)))
+            self.assertGreater(writer.dropped, 0)
+            bloqueo.set()
+            writer.stop()
+
+    def test_error_al_escribir_no_se_propaga(self):
+        writer = ActivityLogWriter(mode='inline')
+        with mock.patch.object(ActivityLog.objects, 'bulk_create', side_effect=RuntimeError('bd caída')):
+            with self.assertLogs('api.activity', level='ERROR'):
+                writer.submit(self.entrada())
+        self.assertEqual(writer.dropped, 1)
+
+
+@override_settings(ACTIVITY_LOG_RETENTION_MONTHS=2)
+class ActivityLogArchiveTests(KanbanTestCase):
+    def registrar(self, meses_atras, cantidad=1):
+        momento = timezone.now() - datetime.timedelta(days=31 * meses_atras)
+        for _ in range(cantidad):
+            log = ActivityLog.objects.create(
+                board=self.board, user=self.teacher, activity_type='card_updated', description=f'hace {meses_atras}'
+            )
+            ActivityLog.objects.filter(pk=log.pk).update(created_at=momento)
+
+    def test_consultas_limitadas_a_la_retencion(self):
+        self.registrar(0)
+        self.registrar(5)
+        response = self.client.get('/api/activity-logs/')
+        self.assertEqual([log['description'] for log in response.data['results']], ['hace 0'])
+        response = self.client.get(f'/api/boards/{self.board.id}/activity/')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_archiva_y_elimina_meses_antiguos(self):
+        self.registrar(0)
+        self.registrar(4, cantidad=2)
+        self.registrar(6)
+        with tempfile.TemporaryDirectory() as directorio:
+            call_command('archive_activity_logs', output_dir=directorio, stdout=mock.MagicMock())
+            archivos = sorted(Path(directorio).glob('*.ndjson.gz'))
+            self.assertEqual(len(archivos), 2)
+            with gzip.open(archivos[-1], 'rt', encoding='utf-8') as archivo:
+                filas = [json.loads(linea) for linea in archivo]
+        self.assertEqual([fila['description'] for fila in filas], ['hace 4', 'hace 4'])
+        self.assertEqual(list(ActivityLog.objects.values_list('description', flat=True)), ['hace 0'])
+
+    def test_dry_run_no_modifica_nada(self):
+        self.registrar(6)
+        with tempfile.TemporaryDirectory() as directorio:
+            call_command('archive_activity_logs', output_dir=directorio, dry_run=True, stdout=mock.MagicMock())
+            self.assertEqual(list(Path(directorio).iterdir()), [])
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+
+class QueryPlanTests(KanbanTestCase):
+    """Las consultas más frecuentes deben resolverse con índices, sin recorrer la tabla"""
+
+    def assertUsaIndice(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan, plan)
+        elif connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            for linea in plan.splitlines():
+                detalle = linea.split(' ', 3)[-1]
+                self.assertFalse(
+                    detalle.startswith('SCAN ') and ' USING ' not in detalle,
+                    f'Recorrido completo en el plan:\n{plan}',
+                )
+        else:
+            self.skipTest(f'Sin verificación de planes para {connection.vendor}')
+
+    def test_tarjetas_de_una_lista(self):
+        self.assertUsaIndice(Card.objects.filter(list=self.lists[0]).order_by('rank', 'id'))
+
+    def test_tareas_proximas_de_un_estudiante(self):
+        ahora = timezone.now()
+        self.assertUsaIndice(Card.objects.filter(
+            assigned_to=self.student,
+            due_date__isnull=False,
+            due_date__gte=ahora,
+            due_date__lte=ahora + datetime.timedelta(days=7),
+        ))
+
+    def test_actividad_reciente_de_un_tablero(self):
+        self.assertUsaIndice(ActivityLog.objects.recent().filter(board=self.board).order_by('-created_at'))
+
+    def test_comentarios_de_una_tarjeta(self):
+        card = Card.objects.create(list=self.lists[0], title='Tarea')
+        self.assertUsaIndice(Comment.objects.filter(card=card).order_by('-created_at'))
+
+    def test_tableros_de_un_docente(self):
+        self.assertUsaIndice(Board.objects.filter(teacher=self.teacher).order_by('-created_at'))
+
+
+class BoardAccessTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.otro = crear_usuario('otro', 'student')
+        self.otro_tablero = Board.objects.create(name='Historia', teacher=self.teacher)
+        self.otra_lista = List.objects.create(board=self.otro_tablero, title='Pendiente')
+
+    def accesos(self, user):
+        return set(BoardAccess.objects.filter(user=user).values_list('board_id', 'reason'))
+
+    def test_miembros_del_tablero(self):
+        self.assertEqual(self.accesos(self.student), {(self.board.id, 'member')})
+        self.otro.student_boards.add(self.board, self.otro_tablero)
+        self.assertEqual(self.accesos(self.otro), {(self.board.id, 'member'), (self.otro_tablero.id, 'member')})
+        self.board.students.remove(self.otro)
+        self.assertEqual(self.accesos(self.otro), {(self.otro_tablero.id, 'member')})
+        self.otro.student_boards.clear()
+        self.board.students.clear()
+        self.assertFalse(BoardAccess.objects.exists())
+
+    def test_asignaciones_de_tarjetas(self):
+        card = Card.objects.create(list=self.otra_lista, title='Ensayo', assigned_to=self.otro)
+        segunda = Card.objects.create(list=self.otra_lista, title='Mapa', assigned_to=self.otro)
+        self.assertEqual(self.accesos(self.otro), {(self.otro_tablero.id, 'assigned')})
+
+        segunda.delete()
+        self.assertEqual(self.accesos(self.otro), {(self.otro_tablero.id, 'assigned')})
+
+        card = Card.objects.only('id', 'title').get(pk=card.pk)
+        card.assigned_to = self.student
+        card.save()
+        self.assertEqual(self.accesos(self.otro), set())
+        self.assertIn((self.otro_tablero.id, 'assigned'), self.accesos(self.student))
+
+        card.list = self.lists[0]
+        card.save()
+        self.assertEqual(self.accesos(self.student), {(self.board.id, 'member'), (self.board.id, 'assigned')})
+
+        card.delete()
+        self.assertEqual(self.accesos(self.student), {(self.board.id, 'member')})
+
+    def test_eliminar_lista_con_varias_tarjetas(self):
+        Card.objects.create(list=self.lists[0], title='Mapa', assigned_to=self.otro)
+        for idx in range(6):
+            Card.objects.create(
+                list=self.otra_lista, title=f'Tarea {idx}', assigned_to=self.otro if idx % 2 else self.student,
+            )
+        lista = List.objects.get(pk=self.otra_lista.pk)
+        # Una consulta de asignados y un recálculo para toda la lista, no uno por tarjeta
+        with self.assertNumQueries(11):
+            lista.delete()
+        self.assertEqual(self.accesos(self.otro), {(self.board.id, 'assigned')})
+        self.assertEqual(self.accesos(self.student), {(self.board.id, 'member')})
+        self.assertEqual(access_differences(), (set(), set()))
+
+    def test_lista_movida_a_otro_tablero(self):
+        Card.objects.create(list=self.otra_lista, title='Ensayo', assigned_to=self.otro)
+        self.otra_lista.board = self.board
+        self.otra_lista.save()
+        self.assertEqual(self.accesos(self.otro), {(self.board.id, 'assigned')})
+
+    def test_visibilidad_sin_joins_a_tarjetas(self):
+        Card.objects.create(list=self.otra_lista, title='Ensayo', assigned_to=self.otro)
+        queryset = visible_boards(self.otro)
+        sql = str(queryset.query)
+        self.assertNotIn('api_card', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertEqual(list(queryset), [self.otro_tablero])
+
+        self.client.force_authenticate(self.otro)
+        response = self.client.get(f'/api/boards/{self.otro_tablero.id}/activity/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/boards/{self.board.id}/activity/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_verificacion_y_reconstruccion(self):
+        Card.objects.create(list=self.otra_lista, title='Ensayo', assigned_to=self.otro)
+        # Escrituras sin señales dejan la tabla desfasada
+        Card.objects.filter(assigned_to=self.otro).update(assigned_to=self.student)
+        BoardAccess.objects.filter(user=self.student, reason='member').delete()
+
+        with self.assertRaises(CommandError):
+            call_command('check_board_access', stdout=mock.MagicMock())
+        call_command('check_board_access', fix=True, stdout=mock.MagicMock())
+        call_command('check_board_access', stdout=mock.MagicMock())
+        self.assertEqual(self.accesos(self.otro), set())
+        self.assertEqual(
+            self.accesos(self.student), {(self.board.id, 'member'), (self.otro_tablero.id, 'assigned')}
+        )
+
+        BoardAccess.objects.all().delete()
+        call_command('backfill_board_access', stdout=mock.MagicMock())
+        call_command('check_board_access', stdout=mock.MagicMock())
+
+
+class AuthzContextTests(KanbanTestCase):
+    def consultas(self, user, url, data):
+        # Usuario recién cargado: el perfil no viene en caché
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def test_rol_y_tableros_se_resuelven_una_vez(self):
+        request = APIRequestFactory().get('/api/boards/')
+        request.user = User.objects.get(pk=self.student.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            authz = get_authz(request)
+            self.assertTrue(authz.is_student)
+            self.assertEqual(authz.visible_board_ids, {self.board.id})
+            self.assertIs(get_authz(request), authz)
+            self.assertTrue(get_authz(request).can_view_board(self.board.id))
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_permisos_de_escritura_no_cargan_relaciones(self):
+        self.crear_tarjetas(1)
+        item = ChecklistItem.objects.get()
+        consultas = self.consultas(self.student, f'/api/checklist-items/{item.id}/', {'is_completed': True})
+        self.assertEqual(sum('FROM "api_profile"' in sql for sql in consultas), 1)
+        self.assertFalse([sql for sql in consultas if 'FROM "auth_user"' in sql])
+
+        # La tarjeta ya trae su lista y tablero: no hace falta consultar los tableros del docente
+        card = Card.objects.get()
+        consultas = self.consultas(self.teacher, f'/api/cards/{card.id}/', {'title': 'Editada'})
+        self.assertFalse([sql for sql in consultas if '"api_board"."teacher_id" =' in sql])
+
+    def test_estudiante_no_edita_tarjetas_ajenas(self):
+        otro = crear_usuario('otro', 'student')
+        card = Card.objects.create(list=self.lists[0], title='Ajena', assigned_to=otro)
+        self.client.force_authenticate(self.student)
+        response = self.client.patch(f'/api/cards/{card.id}/', {'title': 'x'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.board.students.add(otro)
+        self.client.force_authenticate(otro)
+        response = self.client.patch(f'/api/lists/{self.lists[0].id}/', {'title': 'x'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class CachedJWTAuthenticationTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        response = self.client.post('/api/token/', {'username': 'estudiante', 'password': 'password123'})
+        self.tokens = response.data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def consultas_de_usuario(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/profiles/me/')
+        sql = [query['sql'] for query in ctx.captured_queries]
+        return response, [q for q in sql if 'FROM "auth_user"' in q or 'FROM "api_profile"' in q]
+
+    def test_claims_del_token(self):
+        token = AccessToken(self.tokens['access'])
+        self.assertEqual(token['role'], 'student')
+        self.assertEqual(token['ver'], 0)
+
+    def test_cada_peticion_recibe_su_propio_perfil(self):
+        token = AccessToken(self.tokens['access'])
+        auth = CachedJWTAuthentication()
+        primero = auth.get_user(token)
+        primero.profile.role = 'teacher'
+        primero.profile.token_version = 7
+        segundo = auth.get_user(token)
+        self.assertIsNot(segundo.profile, primero.profile)
+        self.assertIs(segundo.profile.user, segundo)
+        self.assertEqual(segundo.profile.role, 'student')
+        self.assertEqual(segundo.profile.token_version, 0)
+
+    def test_usuario_sale_de_la_cache(self):
+        response, consultas = self.consultas_de_usuario()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+        response, consultas = self.consultas_de_usuario()
+        self.assertEqual(response.data['role'], 'student')
+        self.assertEqual(consultas, [])
+
+    def test_cambio_de_contrasena_revoca_tokens(self):
+        self.consultas_de_usuario()
+        user = User.objects.get(pk=self.student.pk)
+        user.set_password('otra-clave')
+        user.save()
+        self.assertEqual(self.client.get('/api/profiles/me/').status_code, 401)
+        response = APIClient().post('/api/token/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.post('/api/token/', {'username': 'estudiante', 'password': 'otra-clave'})
+        self.assertEqual(AccessToken(response.data['access'])['ver'], 1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/profiles/me/').status_code, 200)
+
+    def test_desactivacion_y_cambio_de_rol(self):
+        self.consultas_de_usuario()
+        self.student.profile.role = 'teacher'
+        self.student.profile.save()
+        self.assertEqual(Profile.objects.get(user=self.student).token_version, 1)
+        self.assertEqual(self.client.get('/api/profiles/me/').status_code, 401)
+
+        response = self.client.post('/api/token/', {'username': 'estudiante', 'password': 'password123'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/profiles/me/').data['role'], 'teacher')
+        user = User.objects.get(pk=self.student.pk)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get('/api/profiles/me/').status_code, 401)
+
+
+class CardSummaryTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(6)
+        for item in ChecklistItem.objects.all()[:2]:
+            item.is_completed = True
+            item.save()
+
+    def test_listado_compacto_por_defecto(self):
+        response = self.client.get('/api/cards/', {'board': self.board.id})
+        card = response.data['results'][0]
+        self.assertNotIn('comments', card)
+        self.assertNotIn('checklist_items', card)
+        self.assertEqual(card['comment_count'], 1)
+        self.assertEqual(card['checklist_total'], 1)
+        self.assertEqual(sum(c['checklist_completed'] for c in response.data['results']), 2)
+        self.assertEqual(card['list']['board']['id'], self.board.id)
+        self.assertEqual(card['labels'][0]['id'], self.label.id)
+
+        detalle = self.client.get(f"/api/cards/{card['id']}/").data
+        self.assertEqual(len(detalle['comments']), 1)
+
+    def test_campos_y_expansion(self):
+        response = self.client.get('/api/cards/', {'fields': 'id,title,due_date'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'due_date'})
+
+        response = self.client.get('/api/cards/', {'expand': 'comments,checklist_items'})
+        card = response.data['results'][0]
+        self.assertEqual(card['comments'][0]['author']['id'], self.student.id)
+        self.assertEqual(len(card['checklist_items']), 1)
+
+        response = self.client.get(f'/api/boards/{self.board.id}/', {'fields': 'id,name'})
+        self.assertEqual(set(response.data), {'id', 'name'})
+
+    def test_campos_no_ignoran_la_entrada_al_escribir(self):
+        card = Card.objects.first()
+        response = self.client.patch(
+            f'/api/cards/{card.id}/?fields=id', {'title': 'Renombrada', 'list': self.lists[2].id}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'id'})
+        card.refresh_from_db()
+        self.assertEqual((card.title, card.list_id), ('Renombrada', self.lists[2].id))
+
+    def test_consultas_y_tamano(self):
+        def medir(params):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/cards/', params)
+            return len(ctx.captured_queries), len(response.content)
+
+        consultas_compacto, _ = medir({})
+        self.crear_tarjetas(10)
+        self.assertEqual(medir({})[0], consultas_compacto)
+        consultas_minimo, _ = medir({'fields': 'id,title'})
+        self.assertLess(consultas_minimo, consultas_compacto)
+        _, tamano_completo = medir({'expand': 'comments,checklist_items'})
+        self.assertLess(medir({})[1], tamano_completo)
+
+
+class KeysetPaginationTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        # Varias entradas con el mismo created_at: el id desempata
+        momento = timezone.now()
+        for idx in range(7):
+            log = ActivityLog.objects.create(
+                board=self.board, user=self.teacher, activity_type='card_updated', description=f'evento {idx}'
+            )
+            ActivityLog.objects.filter(pk=log.pk).update(created_at=momento - datetime.timedelta(minutes=idx // 2))
+
+    def recorrer(self, url, params):
+        vistos = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            vistos.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return vistos, response
+            response = self.client.get(response.data['next'])
+
+    def test_recorre_el_historial_sin_repetir(self):
+        esperado = list(ActivityLog.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        vistos, ultima = self.recorrer('/api/activity-logs/', {'page_size': 3})
+        self.assertEqual(vistos, esperado)
+
+        anterior = self.client.get(ultima.data['previous'])
+        self.assertEqual([item['id'] for item in anterior.data['results']], esperado[3:6])
+        self.assertIsNotNone(anterior.data['previous'])
+
+        ascendente, _ = self.recorrer('/api/activity-logs/', {'page_size': 2, 'ordering': 'created_at'})
+        self.assertEqual(ascendente, esperado[::-1])
+
+    def test_actividad_del_tablero_paginada(self):
+        vistos, _ = self.recorrer(f'/api/boards/{self.board.id}/activity/', {'page_size': 4})
+        self.assertEqual(len(vistos), 7)
+        self.assertNotIn('count', self.client.get(f'/api/boards/{self.board.id}/activity/').data)
+
+    def test_conteo_opcional_y_cursor_invalido(self):
+        response = self.client.get('/api/activity-logs/', {'count': 'true', 'page_size': 2})
+        self.assertEqual(response.data['count'], 7)
+        self.assertFalse(response.data['count_estimated'])
+        response = self.client.get('/api/activity-logs/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_paginas_profundas_no_usan_offset(self):
+        self.crear_tarjetas(5)
+        for card in Card.objects.all():
+            Comment.objects.create(card=card, author=self.teacher, content='Otro')
+        vistos, _ = self.recorrer('/api/comments/', {'page_size': 3})
+        self.assertEqual(len(vistos), 10)
+        ultima = self.client.get('/api/cards/', {'page_size': 2})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(ultima.data['next'])
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(*) AS "__count"', sql)
+
+    def test_orden_por_vencimiento_con_tareas_sin_fecha(self):
+        self.crear_tarjetas(7)
+        momento = timezone.now()
+        for idx, card in enumerate(Card.objects.order_by('id')[:4]):
+            # Dos tareas con la misma fecha: el id desempata
+            Card.objects.filter(pk=card.pk).update(due_date=momento + datetime.timedelta(days=idx // 2))
+        con_fecha = list(Card.objects.filter(due_date__isnull=False).order_by('due_date', 'id').values_list('id', flat=True))
+        sin_fecha = list(Card.objects.filter(due_date__isnull=True).order_by('id').values_list('id', flat=True))
+
+        vistos, ultima = self.recorrer('/api/cards/', {'page_size': 2, 'ordering': 'due_date'})
+        self.assertEqual(vistos, con_fecha + sin_fecha)
+        anterior = self.client.get(ultima.data['previous'])
+        self.assertEqual([item['id'] for item in anterior.data['results']], (con_fecha + sin_fecha)[4:6])
+
+        descendente, _ = self.recorrer('/api/cards/', {'page_size': 3, 'ordering': '-due_date'})
+        self.assertEqual(descendente, (con_fecha + sin_fecha)[::-1])
+
+
+class FastJSONRendererTests(KanbanTestCase):
+    def datos(self):
+        return {
+            'fecha': datetime.datetime(2024, 3, 1, 12, 30, tzinfo=datetime.timezone.utc),
+            'dia': datetime.date(2024, 3, 1),
+            'nota': Decimal('8.75'),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'texto': 'línea\u2028separada',
+        }
+
+    def test_tipos_nativos(self):
+        datos = json.loads(FastJSONRenderer().render(self.datos()))
+        self.assertEqual(datos['fecha'], '2024-03-01T12:30:00Z')
+        self.assertEqual(datos['dia'], '2024-03-01')
+        # Igual que el JSONRenderer de DRF (los serializers ya entregan los Decimal como texto)
+        self.assertEqual(datos['nota'], json.loads(JSONRenderer().render(self.datos()))['nota'])
+        self.assertEqual(datos['id'], '12345678-1234-5678-1234-567812345678')
+        self.assertNotIn(b'\xe2\x80\xa8', FastJSONRenderer().render(self.datos()))
+
+    def test_sin_orjson_usa_el_renderer_de_drf(self):
+        with_orjson = json.loads(json_dumps(self.datos()))
+        with mock.patch('api.renderers.orjson', None):
+            self.assertEqual(json.loads(FastJSONRenderer().render(self.datos())), with_orjson)
+            response = self.client.post('/api/boards/', {'name': 'Física'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_peticiones_json(self):
+        response = self.client.post(
+            '/api/boards/', data=json.dumps({'name': 'Química'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content)['name'], 'Química')
+        response = self.client.post('/api/boards/', data='{"name": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_benchmark(self):
+        salida = io.StringIO()
+        call_command('benchmark_json', cards=10, iterations=1, stdout=salida)
+        self.assertIn('render', salida.getvalue())
+        self.assertIn('parse', salida.getvalue())
+
+
+class CompressionTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(30)
+
+    def test_comprime_json_grande_con_gzip(self):
+        url = f'/api/boards/{self.board.id}/'
+        plano = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plano.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plano.json())
+
+        # El ETag pasa a ser débil y sigue validando
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        repetida = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_respeta_umbral_y_negociacion(self):
+        card = Card.objects.first()
+        response = self.client.get(f'/api/checklist-items/?card={card.id}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        url = f'/api/boards/{self.board.id}/'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        with override_settings(RESPONSE_COMPRESSION={'MIN_LENGTH': 10 ** 9}):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    async def test_sse_no_se_comprime(self):
+        token = AccessToken.for_user(self.teacher)
+        response = await self.async_client.get(
+            f'/api/boards/{self.board.id}/events/?token={token}', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        stream = response.streaming_content
+        self.assertIn(b'event: ready', await anext(stream))
+        await stream.aclose()
+
+    def test_listado_en_streaming(self):
+        paginado = self.client.get('/api/cards/', {'page_size': 100, 'fields': 'id,title'})
+        with mock.patch('api.mixins.StreamingListMixin.stream_chunk_size', 7):
+            response = self.client.get('/api/cards/', {'stream': 'true', 'fields': 'id,title'})
+            self.assertTrue(response.streaming)
+            partes = list(response.streaming_content)
+        self.assertGreater(len(partes), 3)
+        self.assertEqual(json.loads(b''.join(partes)), paginado.data['results'])
+
+        response = self.client.get('/api/comments/', {'stream': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        comentarios = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(comentarios), 30)
+
+    async def test_listado_en_streaming_bajo_asgi(self):
+        token = AccessToken.for_user(self.teacher)
+        with mock.patch('api.mixins.StreamingListMixin.stream_chunk_size', 7):
+            response = await self.async_client.get(
+                '/api/cards/', {'stream': 'true', 'fields': 'id'}, headers={'authorization': f'Bearer {token}'}
+            )
+            self.assertTrue(response.is_async)
+            partes = [parte async for parte in response.streaming_content]
+        self.assertGreater(len(partes), 3)
+        self.assertEqual(len(json.loads(b''.join(partes))), await Card.objects.acount())
+
+
+class BoardExportTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(5)
+        card = Card.objects.get(title='Tarea 0')
+        card.title = '=HYPERLINK("http://x")'
+        card.save()
+        ChecklistItem.objects.filter(card=card).update(is_completed=True)
+        ActivityLog.objects.create(board=self.board, user=self.teacher, activity_type='card_created', description='Creada')
+        self.url = f'/api/boards/{self.board.id}/export/'
+
+    def descargar(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig')
+
+    def test_csv_de_tarjetas(self):
+        with mock.patch('api.exports.EXPORT_CHUNK_SIZE', 2):
+            contenido = self.descargar({'format': 'csv'})
+        filas = list(csv.DictReader(io.StringIO(contenido)))
+        self.assertEqual(len(filas), 5)
+        primera = next(fila for fila in filas if fila['id'] == str(Card.objects.get(title__startswith='=').id))
+        self.assertEqual(primera['title'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(primera['labels'], 'Examen')
+        self.assertEqual((primera['checklist_completed'], primera['checklist_total'], primera['comment_count']), ('1', '1', '1'))
+        self.assertEqual(primera['assigned_to'], 'estudiante')
+
+        actividad = list(csv.DictReader(io.StringIO(self.descargar({'format': 'csv', 'resource': 'activity'}))))
+        self.assertEqual([fila['description'] for fila in actividad], ['Creada'])
+
+    def test_ndjson_con_tarjetas_y_actividad(self):
+        lineas = [json.loads(linea) for linea in self.descargar({'format': 'ndjson'}).splitlines()]
+        self.assertEqual([linea['type'] for linea in lineas], ['card'] * 5 + ['activity'])
+        self.assertEqual(lineas[0]['labels'], ['Examen'])
+
+    def test_consultas_constantes(self):
+        with CaptureQueriesContext(connection) as pocas:
+            self.descargar({'format': 'ndjson', 'resource': 'cards'})
+        self.crear_tarjetas(20)
+        with CaptureQueriesContext(connection) as muchas:
+            self.descargar({'format': 'ndjson', 'resource': 'cards'})
+        self.assertEqual(len(pocas), len(muchas))
+
+    async def test_asgi_entrega_bloques_asincronos(self):
+        token = AccessToken.for_user(self.teacher)
+        with mock.patch('api.exports.EXPORT_CHUNK_SIZE', 2):
+            response = await self.async_client.get(
+                self.url, {'format': 'ndjson'}, headers={'authorization': f'Bearer {token}'}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            partes = [parte async for parte in response.streaming_content]
+        self.assertGreater(len(partes), 3)
+        lineas = [json.loads(linea) for linea in b''.join(partes).splitlines()]
+        self.assertEqual([linea['type'] for linea in lineas], ['card'] * 5 + ['activity'])
+
+    def test_errores_en_json(self):
+        response = self.client.get(self.url, {'format': 'csv', 'resource': 'all'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('resource', response.json())
+        self.client.force_authenticate(self.student)
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+class BoardImportTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/boards/{self.board.id}/import/'
+        self.existente = crear_usuario('existente', 'student')
+
+    def datos(self):
+        return {
+            'students': [
+                {'username': 'nuevo1', 'email': 'nuevo1@example.com', 'first_name': 'Ana'},
+                {'username': 'nuevo2'},
+                {'username': 'existente'},
+            ],
+            'lists': [{'title': 'Revisión'}],
+            'cards': [
+                {'list': 'Pendiente', 'title': 'Leer', 'assigned_to': 'nuevo1', 'labels': ['Examen', 'Lectura']},
+                {'list': 'Revisión', 'title': 'Corregir', 'assigned_to': 'estudiante'},
+                {'list': 'Archivo', 'title': 'Guardar', 'due_date': '2025-03-01T10:00:00Z'},
+            ],
+            'default_password': 'inicio123',
+        }
+
+    def test_importa_en_bloque(self):
+        revision = self.board.revision
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, self.datos(), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['students_created'], 2)
+        self.assertEqual(response.data['students_added'], 3)
+        self.assertEqual(response.data['lists_created'], 2)
+        self.assertEqual(response.data['labels_created'], 1)
+        self.assertEqual(response.data['cards_created'], 3)
+
+        nuevo = User.objects.get(username='nuevo1')
+        self.assertEqual(nuevo.profile.role, 'student')
+        self.assertTrue(nuevo.check_password('inicio123'))
+        self.assertEqual(set(self.board.students.values_list('username', flat=True)),
+                         {'estudiante', 'nuevo1', 'nuevo2', 'existente'})
+        leer = Card.objects.get(title='Leer')
+        self.assertEqual(Card.objects.filter(list=leer.list).first(), leer)
+        self.assertEqual(sorted(leer.labels.values_list('name', flat=True)), ['Examen', 'Lectura'])
+        self.assertEqual(list(self.board.lists.values_list('title', flat=True)),
+                         ['Pendiente', 'En Progreso', 'Completada', 'Revisión', 'Archivo'])
+
+        # Sin señales: acceso, revisiones y actividad se actualizan igual
+        self.assertEqual(access_differences(), (set(), set()))
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.revision, revision + 7)
+        cambios = self.client.get(f'/api/boards/{self.board.id}/changes/', {'since': revision}).data
+        self.assertEqual(len(cambios['cards']), 3)
+        self.assertEqual(ActivityLog.objects.filter(activity_type='board_imported').count(), 1)
+
+    def test_errores_por_fila_sin_escribir(self):
+        datos = self.datos()
+        datos['students'].append({'username': 'docente'})
+        datos['cards'].append({'list': 'Pendiente'})
+        datos['cards'].append({'list': 'Pendiente', 'title': 'X', 'assigned_to': 'nadie'})
+        response = self.client.post(self.url, datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(e['section'], e['row']) for e in response.data['errors']], [('cards', 4)])
+
+        datos['cards'].pop(3)
+        response = self.client.post(self.url, datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(e['section'], e['row']) for e in response.data['errors']],
+                         [('students', 4), ('cards', 4)])
+        self.assertFalse(User.objects.filter(username='nuevo1').exists())
+        self.assertEqual(Card.objects.count(), 0)
+
+    def test_csv_exportado_se_puede_importar(self):
+        self.crear_tarjetas(3)
+        exportado = b''.join(self.client.get(f'/api/boards/{self.board.id}/export/', {'format': 'csv'}).streaming_content)
+        otro = Board.objects.create(name='Copia', teacher=self.teacher)
+        response = self.client.post(
+            f'/api/boards/{otro.id}/import/',
+            {'cards': SimpleUploadedFile('tareas.csv', exportado, content_type='text/csv')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['cards_created'], 3)
+        self.assertEqual(
+            sorted(Card.objects.filter(list__board=otro).values_list('title', 'list__title', 'assigned_to__username')),
+            sorted(Card.objects.filter(list__board=self.board).values_list('title', 'list__title', 'assigned_to__username')),
+        )
+
+    def test_solo_el_docente_importa(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.post(self.url, self.datos(), format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            alumnos = Path(tmp) / 'alumnos.csv'
+            alumnos.write_text('username,email\nana,ana@example.com\nluis,\n', encoding='utf-8')
+            tareas = Path(tmp) / 'tareas.csv'
+            tareas.write_text(
+                'list,title,assigned_to,labels\n' + ''.join(f'Semana 1,Tarea {i},ana,Examen; Tarea\n' for i in range(50)),
+                encoding='utf-8',
+            )
+            salida = io.StringIO()
+            call_command('import_board', teacher='docente', name='Nuevo curso', students=str(alumnos),
+                         cards=str(tareas), stdout=salida)
+            self.assertIn('50 tarjetas', salida.getvalue())
+            tablero = Board.objects.get(name='Nuevo curso')
+            self.assertEqual(Card.objects.filter(list__board=tablero).count(), 50)
+            self.assertFalse(User.objects.get(username='luis').has_usable_password())
+
+            tareas.write_text('list,title,assigned_to\nSemana 1,Tarea,nadie\n', encoding='utf-8')
+            with self.assertRaises(CommandError):
+                call_command('import_board', board=tablero.id, cards=str(tareas), stdout=io.StringIO(),
+                             stderr=io.StringIO())
+
+
+class CardBatchTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(6)
+        self.cards = list(Card.objects.order_by('id'))
+        self.otro = crear_usuario('otro', 'student')
+
+    def test_reordena_mueve_y_asigna_en_una_transaccion(self):
+        self.board.refresh_from_db()
+        revision = self.board.revision
+        operaciones = [
+            {'id': self.cards[0].id, 'list': self.lists[2].id, 'position': 0},
+            {'id': self.cards[1].id, 'position': 5},
+            {'id': self.cards[2].id, 'assigned_to_id': self.otro.id, 'label_ids': []},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/cards/batch/', {'operations': operaciones}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['cards']), 3)
+
+        self.cards[0].refresh_from_db()
+        self.assertEqual(self.cards[0].list_id, self.lists[2].id)
+        self.assertEqual(Card.objects.filter(list=self.lists[2]).first(), self.cards[0])
+        # Un índice mayor que la cantidad de tarjetas la deja al final
+        self.assertEqual(list(Card.objects.filter(list=self.lists[1])), [self.cards[4], self.cards[1]])
+        tercera = Card.objects.get(pk=self.cards[2].id)
+        self.assertEqual(tercera.assigned_to_id, self.otro.id)
+        self.assertFalse(tercera.labels.exists())
+
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.revision, revision + 3)
+        self.assertEqual(response.data['revisions'], {self.board.id: self.board.revision})
+        self.assertIn((self.otro.id, self.board.id, 'assigned'), set(BoardAccess.objects.values_list('user_id', 'board_id', 'reason')))
+        self.assertEqual(access_differences(), (set(), set()))
+        actividad = ActivityLog.objects.get(metadata__card_ids__isnull=False)
+        self.assertEqual(actividad.activity_type, 'card_updated')
+        self.assertEqual(len(actividad.metadata['moves']), 1)
+
+    def test_consultas_no_crecen_con_las_operaciones(self):
+        def mover(cards):
+            operaciones = [{'id': card.id, 'position': idx + 10} for idx, card in enumerate(cards)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/cards/batch/', {'operations': operaciones}, format='json')
+            self.assertEqual(response.status_code, 200)
+            return len(ctx)
+        self.assertEqual(mover(self.cards[:2]), mover(self.cards))
+
+    def test_rechaza_todo_si_una_operacion_falla(self):
+        otro_tablero = Board.objects.create(name='Otro', teacher=self.teacher)
+        lista_ajena = List.objects.create(board=otro_tablero, title='Ajena')
+        operaciones = [
+            {'id': self.cards[0].id, 'position': 99},
+            {'id': self.cards[1].id, 'list': lista_ajena.id},
+        ]
+        response = self.client.post('/api/cards/batch/', {'operations': operaciones}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(1, response.data['operations'])
+        self.assertEqual(Card.objects.get(pk=self.cards[0].id).rank, self.cards[0].rank)
+
+        response = self.client.post('/api/cards/batch/', {'operations': [{'id': self.cards[0].id}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/cards/batch/', {'operations': [{'id': 0, 'position': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_permisos_de_estudiante(self):
+        self.client.force_authenticate(self.student)
+        propia = {'id': self.cards[0].id, 'list': self.lists[1].id, 'position': 0}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/cards/batch/', {'operations': [propia]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ActivityLog.objects.filter(activity_type='card_moved').count(), 1)
+
+        response = self.client.post(
+            '/api/cards/batch/', {'operations': [{'id': self.cards[1].id, 'assigned_to_id': self.otro.id}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.client.force_authenticate(self.otro)
+        response = self.client.post('/api/cards/batch/', {'operations': [propia]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_muchas_al_principio_no_superan_el_largo_de_clave(self):
+        destino = list(Card.objects.filter(list=self.lists[1]))
+        nuevas = Card.objects.bulk_create([
+            Card(list=self.lists[0], title=f'Lote {idx}', rank=rank)
+            for idx, rank in enumerate(spread_keys(CardBatchSerializer.MAX_OPERATIONS, after='0f0000'))
+        ])
+        operaciones = [{'id': card.id, 'list': self.lists[1].id, 'position': 0} for card in nuevas]
+        # Sin ejecutar on_commit: el rebalanceo programado no llega a correr
+        response = self.client.post('/api/cards/batch/', {'operations': operaciones}, format='json')
+        self.assertEqual(response.status_code, 200)
+        claves = list(Card.objects.filter(list=self.lists[1]).values_list('rank', flat=True))
+        self.assertLessEqual(max(map(len, claves)), RANK_MAX_LENGTH)
+        self.assertEqual(len(set(claves)), len(claves))
+        # Cada una quedó delante de la anterior, y las que ya estaban, al final
+        self.assertEqual(list(Card.objects.filter(list=self.lists[1])), nuevas[::-1] + destino)
+
+    def test_esquema_de_cada_accion(self):
+        paths = SchemaGenerator().get_schema(request=None, public=True)['paths']
+        lote = paths['/api/cards/batch/']['post']
+        self.assertEqual(lote['summary'], 'Modificar tarjetas en lote')
+        self.assertEqual(lote['requestBody']['content']['application/json']['schema']['$ref'], '#/components/schemas/CardBatchRequest')
+        asignar = paths['/api/cards/{id}/assign/']['post']
+        self.assertEqual(asignar['summary'], 'Asignar tarjeta a usuario')
+        self.assertIn('user_id', asignar['requestBody']['content']['application/json']['schema']['properties'])
+
+
+class RankingTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(9)
+        self.lista = self.lists[0]
+
+    def titulos(self):
+        return list(Card.objects.filter(list=self.lista).values_list('title', flat=True))
+
+    def test_claves_intermedias_conservan_el_orden(self):
+        aleatorio = random.Random(7)
+        claves = [key_between(None, None)]
+        for _ in range(500):
+            indice = aleatorio.randint(0, len(claves))
+            antes = claves[indice - 1] if indice else None
+            despues = claves[indice] if indice < len(claves) else None
+            nueva = key_between(antes, despues)
+            self.assertTrue((antes is None or antes < nueva) and (despues is None or nueva < despues))
+            self.assertFalse(nueva.endswith('0') and len(nueva) > INTEGER_WIDTH)
+            claves.insert(indice, nueva)
+        self.assertEqual(claves, sorted(claves))
+
+    def test_mover_una_tarjeta_escribe_una_sola_fila(self):
+        ultima = Card.objects.filter(list=self.lista).last()
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(f'/api/cards/{ultima.id}/', {'position': 0}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titulos(), ['Tarea 6', 'Tarea 0', 'Tarea 3'])
+        escrituras = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_card"')]
+        self.assertEqual(len(escrituras), 1)
+
+        response = self.client.post('/api/cards/', {'list': self.lista.id, 'title': 'Nueva', 'position': 1}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titulos(), ['Tarea 6', 'Nueva', 'Tarea 0', 'Tarea 3'])
+        # Al cambiar de lista sin posición la tarjeta va al final
+        self.client.patch(f'/api/cards/{response.data["id"]}/', {'list': self.lists[1].id}, format='json')
+        self.assertEqual(Card.objects.filter(list=self.lists[1]).last().title, 'Nueva')
+
+    def test_rebalanceo_de_claves_largas(self):
+        primera = Card.objects.filter(list=self.lista).first()
+        with mock.patch('api.ranking.REBALANCE_LENGTH', 8):
+            for _ in range(20):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.patch(f'/api/cards/{self.lista.cards.last().id}/', {'position': 1}, format='json')
+        claves = list(Card.objects.filter(list=self.lista).values_list('rank', flat=True))
+        self.assertTrue(all(len(clave) <= 9 for clave in claves), claves)
+        self.assertEqual(Card.objects.filter(list=self.lista).first(), primera)
+
+        Card.objects.filter(list=self.lista).update(rank='00001' + 'i' * 30)
+        self.board.refresh_from_db()
+        revision = self.board.revision
+        call_command('rebalance_ranks', stdout=io.StringIO())
+        self.assertEqual(
+            list(Card.objects.filter(list=self.lista).values_list('rank', flat=True)),
+            spread_keys(3),
+        )
+        self.board.refresh_from_db()
+        self.assertEqual(self.board.revision, revision + 3)
+
+    @override_settings(RANK_REBALANCE={'MODE': 'background'})
+    def test_rebalanceo_fuera_de_la_peticion(self):
+        for sufijo, card in enumerate(Card.objects.filter(list=self.lista), start=1):
+            Card.objects.filter(pk=card.pk).update(rank=f"00001{'i' * 30}{sufijo}")
+        with mock.patch('api.ranking.get_rebalance_executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/cards/{self.lista.cards.last().id}/', {'position': 1}, format='json')
+            claves = list(Card.objects.filter(list=self.lista).values_list('rank', flat=True))
+            self.assertTrue(any(len(clave) > REBALANCE_LENGTH for clave in claves))
+        (funcion, *argumentos), _ = executor.return_value.submit.call_args
+        funcion(*argumentos)
+        claves = list(Card.objects.filter(list=self.lista).values_list('rank', flat=True))
+        self.assertEqual(claves, spread_keys(3))
+
+
+class ListStateTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(7)
+
+    def test_filtro_por_etapa_no_depende_del_titulo(self):
+        self.lists[2].title = 'Listo para revisar'
+        self.lists[2].save()
+        response = self.client.get('/api/cards/', {'status': 'done', 'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({card['id'] for card in response.data['results']},
+                         set(Card.objects.filter(list=self.lists[2]).values_list('id', flat=True)))
+        # Las claves de columna del frontend siguen funcionando
+        response = self.client.get('/api/cards/', {'status': 'progreso', 'page_size': 50})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get('/api/cards/', {'status': 'archivada'})
+        self.assertEqual(response.status_code, 400)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/cards/', {'status': 'done'})
+        self.assertFalse(any('LIKE' in query['sql'] for query in ctx.captured_queries))
+
+    def test_listas_por_defecto_tienen_etapa(self):
+        response = self.client.post('/api/boards/', {'name': 'Física'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(List.objects.filter(board_id=response.data['id']).values_list('state', flat=True)),
+            ['pending', 'in_progress', 'done'],
+        )
+
+    def test_progreso_del_tablero(self):
+        otro = crear_usuario('otro', 'student')
+        Card.objects.create(list=self.lists[2], title='Extra', assigned_to=otro)
+        url = f'/api/boards/{self.board.id}/progress/'
+        with self.assertNumQueries(2):
+            progreso = self.client.get(url).data
+        self.assertEqual(progreso['total'], 8)
+        self.assertEqual(progreso['states'], {'pending': 3, 'in_progress': 2, 'done': 3})
+        self.assertEqual(progreso['completion'], 37.5)
+        self.assertEqual([alumno['username'] for alumno in progreso['students']], ['estudiante', 'otro'])
+
+        self.client.force_authenticate(self.student)
+        progreso = self.client.get(url).data
+        self.assertEqual(progreso['total'], 7)
+        self.assertEqual([alumno['username'] for alumno in progreso['students']], ['estudiante'])
+
+
+class NotificationTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(2)
+        self.card = Card.objects.get(title='Tarea 0')
+
+    def comentar(self, autor, texto='Hola'):
+        self.client.force_authenticate(autor)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/comments/', {'card': self.card.id, 'content': texto}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_reparte_la_actividad_al_escribirla(self):
+        self.comentar(self.teacher)
+        self.comentar(self.student)
+        # Nadie recibe su propia actividad
+        self.assertEqual(list(Notification.objects.values_list('recipient__username', 'actor__username')),
+                         [('docente', 'estudiante'), ('estudiante', 'docente')])
+
+        self.client.force_authenticate(self.student)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(response.data, {'unread': 1})
+        notificacion = self.client.get('/api/notifications/').data['results'][0]
+        self.assertEqual((notificacion['activity_type'], notificacion['board_name']), ('comment_added', 'Matemáticas'))
+
+    def test_cursor_y_marcado_en_lote(self):
+        for texto in ('uno', 'dos', 'tres'):
+            self.comentar(self.student, texto)
+        self.client.force_authenticate(self.teacher)
+        ids = list(Notification.objects.filter(recipient=self.teacher).order_by('id').values_list('id', flat=True))
+
+        nuevas = self.client.get('/api/notifications/', {'after': ids[0]}).data['results']
+        self.assertEqual([n['id'] for n in nuevas], ids[1:])
+        self.assertEqual(self.client.get('/api/notifications/', {'after': 'x'}).status_code, 400)
+
+        response = self.client.post('/api/notifications/mark_read/', {'up_to': ids[1]}, format='json')
+        self.assertEqual(response.data, {'updated': 2, 'unread': 1})
+        self.assertEqual(NotificationInbox.objects.get(user=self.teacher).read_cursor, ids[1])
+        response = self.client.post('/api/notifications/mark_read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'updated': 1, 'unread': 0})
+        self.assertEqual(len(self.client.get('/api/notifications/', {'unread': 'true'}).data['results']), 0)
+
+    def test_eliminar_el_tablero_descuenta_las_no_leidas(self):
+        self.comentar(self.student)
+        self.assertEqual(NotificationInbox.objects.get(user=self.teacher).unread_count, 1)
+        self.board.delete()
+        self.assertEqual(NotificationInbox.objects.get(user=self.teacher).unread_count, 0)
+
+
+class BoardSummaryTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(7)
+        ayer = timezone.now() - datetime.timedelta(days=1)
+        Card.objects.create(list=self.lists[0], title='Vencida', due_date=ayer)
+        Card.objects.create(list=self.lists[2], title='Entregada', due_date=ayer)
+        Card.objects.create(list=self.lists[1], title='A tiempo', due_date=timezone.now() + datetime.timedelta(days=1))
+
+    def resumen(self):
+        response = self.client.get('/api/boards/')
+        self.assertEqual(response.status_code, 200)
+        return next(board for board in response.data['results'] if board['id'] == self.board.id)
+
+    def assertSinDesvios(self):
+        self.assertEqual(refresh_board_summaries(), 0)
+
+    def test_listado_resumido(self):
+        resumen = self.resumen()
+        self.assertNotIn('lists', resumen)
+        self.assertEqual(resumen['teacher']['username'], 'docente')
+        self.assertEqual(resumen['member_count'], 1)
+        self.assertEqual(resumen['cards'], {'pending': 4, 'in_progress': 3, 'done': 3})
+        self.assertEqual(resumen['overdue_count'], 1)
+        self.assertIsNotNone(resumen['last_activity_at'])
+
+        def consultas():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/api/boards/')
+            return len(ctx.captured_queries)
+        pocos = consultas()
+        for idx in range(5):
+            tablero = Board.objects.create(name=f'Curso {idx}', teacher=self.teacher)
+            tablero.students.add(self.student)
+        self.assertEqual(consultas(), pocos)
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/').data['lists'][0]['title'], 'Pendiente')
+
+    def test_contadores_siguen_las_escrituras(self):
+        tarjeta = Card.objects.filter(list=self.lists[0]).first()
+        self.client.patch(f'/api/cards/{tarjeta.id}/', {'list': self.lists[2].id}, format='json')
+        self.client.delete(f'/api/cards/{Card.objects.filter(list=self.lists[1]).first().id}/')
+        self.client.post('/api/cards/', {'list': self.lists[1].id, 'title': 'Nueva'}, format='json')
+        self.assertEqual(self.resumen()['cards'], {'pending': 3, 'in_progress': 3, 'done': 4})
+
+        self.client.patch(f'/api/lists/{self.lists[1].id}/', {'state': 'done'}, format='json')
+        self.assertEqual(self.resumen()['cards'], {'pending': 3, 'in_progress': 0, 'done': 7})
+        otra = Card.objects.filter(list=self.lists[0]).first()
+        self.client.post('/api/cards/batch/', {'operations': [{'id': otra.id, 'list': self.lists[1].id}]}, format='json')
+        self.assertEqual(self.resumen()['cards'], {'pending': 2, 'in_progress': 0, 'done': 8})
+        with CaptureQueriesContext(connection) as ctx:
+            self.lists[0].delete()
+        # Un solo UPDATE del resumen para todas las tarjetas de la lista
+        self.assertEqual(sum('UPDATE "api_boardsummary"' in query['sql'] for query in ctx.captured_queries), 1)
+        self.assertEqual(self.resumen()['cards'], {'pending': 0, 'in_progress': 0, 'done': 8})
+
+        nuevo = crear_usuario('nuevo', 'student')
+        self.client.post(f'/api/boards/{self.board.id}/add_student/', {'user_id': nuevo.id}, format='json')
+        self.assertEqual(self.resumen()['member_count'], 2)
+        nuevo.student_boards.clear()
+        self.assertEqual(self.resumen()['member_count'], 1)
+        response = self.client.post(f'/api/boards/{self.board.id}/import/', {
+            'students': [{'username': 'importado'}],
+            'cards': [{'list': 'Pendiente nueva', 'title': 'Leer'}, {'list': 'Completada', 'title': 'Hecha'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.resumen()['member_count'], 2)
+        self.assertEqual(self.resumen()['cards'], {'pending': 1, 'in_progress': 0, 'done': 9})
+        self.assertSinDesvios()
+
+    def test_vencidas_cambian_el_etag_sin_escrituras(self):
+        response = self.client.get('/api/boards/')
+        self.assertEqual(self.client.get('/api/boards/', headers={'if_none_match': response['ETag']}).status_code, 304)
+        pasado_manana = timezone.now() + datetime.timedelta(days=2)
+        with mock.patch('api.summaries.timezone.now', return_value=pasado_manana):
+            response = self.client.get('/api/boards/', headers={'if_none_match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.resumen()['overdue_count'], 1)
+
+    def test_recalcula_desvios(self):
+        # QuerySet.update no emite señales
+        Card.objects.filter(list=self.lists[0]).update(list=self.lists[1])
+        self.assertEqual(expected_summaries([self.board.id])[self.board.id]['pending_count'], 0)
+        salida = io.StringIO()
+        call_command('refresh_board_summaries', board=[self.board.id], stdout=salida)
+        self.assertIn('1 resúmenes corregidos', salida.getvalue())
+        self.assertEqual(self.resumen()['cards'], {'pending': 0, 'in_progress': 7, 'done': 3})
+
+
+class SearchTests(KanbanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.crear_tarjetas(3)
+        self.derivadas = Card.objects.create(
+            list=self.lists[0], title='Derivadas e integrales', description='Ejercicios de cálculo',
+            assigned_to=self.student,
+        )
+        self.repaso = Card.objects.create(list=self.lists[1], title='Repaso general')
+        Comment.objects.create(card=self.repaso, author=self.teacher, content='Incluye derivadas parciales')
+
+    def buscar(self, q, **params):
+        response = self.client.get('/api/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [card['title'] for card in response.data['results']]
+
+    def test_busca_por_relevancia_sin_tildes_y_por_prefijo(self):
+        # El título pesa más que un comentario
+        self.assertEqual(self.buscar('derivadas'), ['Derivadas e integrales', 'Repaso general'])
+        self.assertEqual(self.buscar('CALCULO'), ['Derivadas e integrales'])
+        self.assertEqual(self.buscar('derivadas parc'), ['Repaso general'])
+        # '1' también está en el título de la Tarea 1; los empates van por id
+        self.assertEqual(self.buscar('paso 1'), ['Tarea 1', 'Tarea 0', 'Tarea 2'])
+        self.assertEqual(fold('Añadir Índice'), 'anadir indice')
+        response = self.client.get('/api/search/', {'q': '¿?'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_respeta_la_visibilidad(self):
+        otro_docente = crear_usuario('otro', 'teacher')
+        self.client.force_authenticate(otro_docente)
+        self.assertEqual(self.buscar('derivadas'), [])
+        # El estudiante solo encuentra sus tareas asignadas
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.buscar('derivadas'), ['Derivadas e integrales'])
+        self.assertEqual(search_cards(['derivadas'], board_ids=[]), [])
+
+    def test_el_indice_sigue_las_escrituras(self):
+        comentario = self.repaso.comments.get()
+        comentario.content = 'Sin novedades'
+        comentario.save()
+        self.assertEqual(self.buscar('derivadas'), ['Derivadas e integrales'])
+        self.client.patch(f'/api/cards/{self.repaso.id}/', {'description': 'Límites y derivadas'}, format='json')
+        self.assertEqual(self.buscar('limites'), ['Repaso general'])
+        self.client.delete(f'/api/cards/{self.derivadas.id}/')
+        self.assertEqual(self.buscar('derivadas'), ['Repaso general'])
+        self.lists[1].delete()
+        self.assertEqual(self.buscar('derivadas'), [])
+
+        response = self.client.post(f'/api/boards/{self.board.id}/import/', {
+            'cards': [{'list': 'Pendiente', 'title': 'Trigonometría básica'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.buscar('trigonometria'), ['Trigonometría básica'])
+
+        # QuerySet.update no emite señales: el comando reconstruye el índice
+        Card.objects.filter(title='Tarea 0').update(title='Geometría')
+        self.assertEqual(self.buscar('geometria'), [])
+        salida = io.StringIO()
+        call_command('rebuild_search_index', stdout=salida)
+        self.assertIn(f'{Card.objects.count()} tarjetas indexadas', salida.getvalue())
+        self.assertEqual(self.buscar('geometria'), ['Geometría'])
+
+    def test_actualizaciones_parciales(self):
+        self.client.post('/api/cards/', {'list': self.lists[0].id, 'title': 'Fracciones'}, format='json')
+        self.assertEqual(self.buscar('fracciones'), ['Fracciones'])
+        tarjeta = Card.objects.get(title='Fracciones')
+        primero = Comment.objects.create(card=tarjeta, author=self.teacher, content='Mínimo común múltiplo')
+        Comment.objects.create(card=tarjeta, author=self.teacher, content='Máximo común divisor')
+        item = ChecklistItem.objects.create(card=tarjeta, text='Simplificar')
+        self.assertEqual(self.buscar('comun'), ['Fracciones'])
+        self.assertEqual(self.buscar('simplificar'), ['Fracciones'])
+
+        primero.delete()
+        self.assertEqual(self.buscar('minimo'), [])
+        self.assertEqual(self.buscar('maximo'), ['Fracciones'])
+        item.text = 'Amplificar'
+        item.save()
+        self.assertEqual(self.buscar('simplificar'), [])
+        self.client.patch(f'/api/cards/{tarjeta.id}/', {'title': 'Decimales'}, format='json')
+        self.assertEqual(self.buscar('fracciones'), [])
+        # El resto del documento se conserva
+        self.assertEqual(self.buscar('decimales amplificar divisor'), ['Decimales'])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], Card.objects.count())
+            self.board.delete()
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_consultas_constantes(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/api/search/', {'q': 'paso'})
+            self.assertFalse(any('LIKE' in query['sql'] for query in ctx.captured_queries))
+            return len(ctx.captured_queries)
+        pocas = consultas()
+        self.crear_tarjetas(12)
+        self.assertEqual(consultas(), pocas)
+
+
+class UserAutocompleteTests(KanbanTestCase):
+    url = '/api/users/autocomplete/'
+
+    def setUp(self):
+        super().setUp()
+        self.jose = User.objects.create_user(
+            username='jnunez', email='jose.nunez@colegio.edu', first_name='José', last_name='Núñez Pérez'
+        )
+        Profile.objects.create(user=self.jose, role='student')
+        self.josefina = crear_usuario('josefina', 'teacher')
+
+    def buscar(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [user['username'] for user in response.data]
+
+    def test_prefijos_sin_tildes(self):
+        self.assertEqual(self.buscar('JOSÉ'), ['jnunez', 'josefina'])
+        self.assertEqual(self.buscar('nuñ'), ['jnunez'])
+        self.assertEqual(self.buscar('jose nu'), ['jnunez'])
+        self.assertEqual(self.buscar('perez jose'), ['jnunez'])
+        self.assertEqual(self.buscar('colegio'), [])
+        self.assertEqual(self.buscar('jose', role='teacher'), ['josefina'])
+        self.assertEqual(self.buscar('jose', limit=1), ['jnunez'])
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_claves_siguen_los_cambios(self):
+        self.jose.last_name = 'Gómez'
+        self.jose.save()
+        self.assertEqual(self.buscar('nunez'), ['jnunez'])  # Sigue en el usuario y el correo
+        self.assertEqual(self.buscar('perez'), [])
+        self.assertEqual(self.buscar('gomez'), ['jnunez'])
+        claves = UserSearchKey.objects.count()
+        self.jose.set_password('otra-clave-123')
+        self.jose.save(update_fields=['password'])
+        self.assertEqual(UserSearchKey.objects.count(), claves)
+
+        response = self.client.post(f'/api/boards/{self.board.id}/import/', {
+            'students': [{'username': 'importada', 'first_name': 'Ángela'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.buscar('angela'), ['importada'])
+
+    def test_consultas_constantes(self):
+        # bulk_create no emite señales: se indexa explícitamente
+        index_users(User.objects.bulk_create([User(username=f'jose{idx:03d}') for idx in range(50)]))
+
+        def consultas(q):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(self.url, {'q': q, 'limit': 5})
+            self.assertFalse(any('LIKE' in query['sql'] for query in ctx.captured_queries))
+            return len(ctx.captured_queries), [user['username'] for user in response.data]
+        muchos, primeros = consultas('jose')
+        self.assertEqual(primeros, ['jnunez', 'jose000', 'jose001', 'jose002', 'jose003'])
+        self.assertEqual(consultas('jose nu'), (muchos, ['jnunez']))
+
+
+@override_settings(REQUEST_METRICS={'TOKEN': 'secreto'})
+class MetricsTests(KanbanTestCase):
+    url = '/api/metrics/'
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.crear_tarjetas(6)
+
+    def metricas(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode().splitlines()
+
+    def test_metricas_por_vista(self):
+        self.client.get('/api/boards/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/cards/')
+        consultas = len(ctx.captured_queries)
+        self.client.get('/api/cards/999999/')
+        lineas = self.metricas()
+
+        self.assertIn('# TYPE kanban_http_request_duration_seconds histogram', lineas)
+        self.assertIn('kanban_http_requests_total{view="BoardViewSet.list",method="GET",status="200"} 1', lineas)
+        self.assertIn('kanban_http_requests_total{view="CardViewSet.retrieve",method="GET",status="404"} 1', lineas)
+        self.assertIn('kanban_http_request_duration_seconds_count{view="CardViewSet.list",method="GET"} 1', lineas)
+        self.assertIn(f'kanban_db_queries_per_request_sum{{view="CardViewSet.list"}} {consultas}', lineas)
+        self.assertIn(
+            f'kanban_http_response_size_bytes_bucket{{view="CardViewSet.list",le="+Inf"}} 1', lineas
+        )
+        self.assertIn('kanban_serializer_duration_seconds_count{view="CardViewSet.list"} 1', lineas)
+        tamanos = [linea for linea in lineas if linea.startswith('kanban_http_response_size_bytes_sum{view="CardViewSet.list"}')]
+        self.assertEqual(tamanos, [f'kanban_http_response_size_bytes_sum{{view="CardViewSet.list"}} {len(response.content)}'])
+        self.assertNotIn('kanban_query_budget_exceeded_total{view="CardViewSet.list"} 1', lineas)
+
+    def test_acceso_protegido(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        staff = crear_usuario('operador', 'teacher')
+        staff.is_staff = True
+        staff.save()
+        for user, esperado in [(self.teacher, 403), (staff, 200)]:
+            token = AccessToken.for_user(user)
+            response = APIClient().get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(response.status_code, esperado)
+        with override_settings(REQUEST_METRICS={}):
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def test_presupuesto_de_consultas(self):
+        with override_settings(REQUEST_METRICS={'TOKEN': 'secreto', 'QUERY_BUDGETS': {'CardViewSet.list': 2}}):
+            with self.assertLogs('api.metrics', 'WARNING') as logs:
+                self.client.get('/api/cards/')
+        self.assertIn('GET /api/cards/ (CardViewSet.list)', logs.output[0])
+        self.assertIn('kanban_query_budget_exceeded_total{view="CardViewSet.list"} 1', self.metricas())
+
+        registry.reset()
+        with override_settings(REQUEST_METRICS={'ENABLED': False}):
+            self.client.get('/api/cards/')
+        self.assertFalse(any(linea.startswith('kanban_http_requests_total{view="CardViewSet') for linea in self.metricas()))
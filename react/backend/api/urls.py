@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from .events import board_events
+from .metrics import metrics_view
 from .views import (
     UserViewSet, ProfileViewSet, RegisterViewSet,
     BoardViewSet, ListViewSet, CardViewSet, LabelViewSet,
-    CommentViewSet, ChecklistItemViewSet, ActivityLogViewSet
+    CommentViewSet, ChecklistItemViewSet, ActivityLogViewSet, NotificationViewSet, SearchViewSet
 )
 
 router = DefaultRouter()
@@ -19,8 +21,12 @@ router.register(r'labels', LabelViewSet, basename='label')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'checklist-items', ChecklistItemViewSet, basename='checklistitem')
 router.register(r'activity-logs', ActivityLogViewSet, basename='activitylog')
+router.register(r'notifications', NotificationViewSet, basename='notification')
+router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
+    path('boards/<int:pk>/events/', board_events, name='board-events'),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include(router.urls)),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
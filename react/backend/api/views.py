@@ -1,20 +1,47 @@
-from rest_framework import viewsets, status, filters
+import csv
+
+from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
-from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog
+from .models import Profile, Board, List, Card, Label, Comment, ChecklistItem, ActivityLog, Notification
 from .serializers import (
     UserSerializer, ProfileSerializer, RegisterSerializer,
-    BoardSerializer, ListSerializer, CardSerializer, LabelSerializer,
-    CommentSerializer, ChecklistItemSerializer, ActivityLogSerializer
+    BoardSerializer, BoardSummarySerializer, ListSerializer, CardSerializer, CardSummarySerializer, LabelSerializer,
+    CommentSerializer, ChecklistItemSerializer, ActivityLogSerializer, BoardImportSerializer, CardBatchSerializer,
+    NotificationSerializer, NotificationMarkReadSerializer, SearchQuerySerializer, UserAutocompleteSerializer,
+    requested_fieldset
 )
 from .permissions import IsTeacherOrReadOnly, IsBoardTeacher, IsAssignedStudentOrTeacher
+from .authz import get_authz
+from .mixins import ConditionalGetMixin, StreamingListMixin, streaming_response
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer, CSVRenderer, NDJSONRenderer
+from .batch import apply_card_batch
+from .imports import SECTIONS as IMPORT_SECTIONS, BoardImportError, import_board, read_csv
+from .exports import (
+    CARD_COLUMNS, ACTIVITY_COLUMNS, card_record, activity_record, iter_records, stream_csv, stream_ndjson,
+)
+from .snapshots import get_board_snapshot_json
+from .revisions import board_id_for, record_change, get_board_changes
+from .signals import remember_card_lists
+from .realtime import publish_board_event
+from .activity import log_activity
+from .ranking import spread_keys
+from .progress import STATES, STATUS_ALIASES, board_progress
+from .notifications import get_unread_count, mark_notifications_read
+from .summaries import overdue_count
+from .search import query_terms, search_cards
+from .directory import autocomplete_users
 
 
 @extend_schema_view(
@@ -46,6 +73,26 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(students, many=True)
         return Response(serializer.data)
 
+    @extend_schema(
+        summary="Autocompletar usuarios",
+        description=(
+            "Devuelve hasta `limit` usuarios cuyo nombre de usuario, nombre, apellidos o correo "
+            "tienen palabras que empiezan por cada palabra de `q`, sin distinguir mayúsculas ni "
+            "tildes ('jose nu' encuentra a 'José Núñez'). Usa un índice de prefijos en lugar de "
+            "recorrer la tabla de usuarios."
+        ),
+        parameters=[UserAutocompleteSerializer],
+        responses={200: UserSerializer(many=True)},
+    )
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        params = UserAutocompleteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        users = autocomplete_users(data['q'], role=data.get('role'), limit=data['limit'])
+        serializer = self.get_serializer(users, many=True)
+        return Response(serializer.data)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -57,7 +104,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         description="Obtiene los detalles de un perfil específico por su ID.",
     ),
 )
-class ProfileViewSet(viewsets.ReadOnlyModelViewSet):
+class ProfileViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -127,43 +174,144 @@ class RegisterViewSet(viewsets.ModelViewSet):
     http_method_names = ['post']
 
 
-class BoardViewSet(viewsets.ModelViewSet):
+class BoardRevisionMixin:
+    """
+    Registra cada escritura del viewset como un cambio en la revisión del tablero y
+    publica el evento correspondiente a los suscriptores en vivo.
+    """
+    revision_entity = None
+
+    def record_change(self, instance, action, board_id=None, event_type=None, **data):
+        if board_id is None:
+            board_id = board_id_for(instance)
+        revision = record_change(board_id, self.revision_entity, instance.pk, action)
+        publish_board_event(
+            board_id,
+            event_type or f'{self.revision_entity}.{action}',
+            {'id': instance.pk, 'revision': revision, **data},
+        )
+        return revision
+
+
+def record_board_update(board):
+    revision = record_change(board.id, 'board', board.id, 'updated')
+    publish_board_event(board.id, 'board.updated', {'id': board.id, 'revision': revision})
+
+
+def card_tree_queryset():
+    """Queryset de tarjetas con todas las relaciones que usa CardSerializer precargadas"""
+    return Card.objects.select_related('assigned_to').prefetch_related(
+        'labels',
+        Prefetch('comments', queryset=Comment.objects.select_related('author')),
+        'checklist_items',
+    )
+
+
+def count_subquery(queryset):
+    """Conteo por tarjeta como subconsulta escalar (evita el producto cruzado de dos joins)"""
+    counts = queryset.filter(card=OuterRef('pk')).order_by().values('card').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def card_summary_queryset(fields=None, expand=()):
+    """Queryset para CardSummarySerializer: solo carga y anota lo que se va a serializar"""
+    def wanted(name):
+        return fields is None or name in fields
+
+    queryset = Card.objects.all()
+    if wanted('assigned_to'):
+        queryset = queryset.select_related('assigned_to')
+    if wanted('list'):
+        queryset = queryset.select_related('list__board')
+    if wanted('labels'):
+        queryset = queryset.prefetch_related('labels')
+    if wanted('comment_count'):
+        queryset = queryset.annotate(comment_count=count_subquery(Comment.objects.all()))
+    if wanted('checklist_total'):
+        queryset = queryset.annotate(checklist_total=count_subquery(ChecklistItem.objects.all()))
+    if wanted('checklist_completed'):
+        queryset = queryset.annotate(
+            checklist_completed=count_subquery(ChecklistItem.objects.filter(is_completed=True))
+        )
+    if 'comments' in expand and wanted('comments'):
+        queryset = queryset.prefetch_related(Prefetch('comments', queryset=Comment.objects.select_related('author')))
+    if 'checklist_items' in expand and wanted('checklist_items'):
+        queryset = queryset.prefetch_related('checklist_items')
+    return queryset
+
+
+STREAM_PARAMETER = OpenApiParameter(
+    'stream', OpenApiTypes.BOOL, OpenApiParameter.QUERY,
+    description='Devuelve el listado completo sin paginar, generado por partes',
+)
+
+
+def board_tree_prefetches():
+    """Prefetch del árbol board → lists → cards con un número fijo de consultas"""
+    return [
+        'students',
+        'labels',
+        Prefetch('lists', queryset=List.objects.prefetch_related(
+            Prefetch('cards', queryset=card_tree_queryset())
+        )),
+    ]
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="Listar tableros",
+        description=(
+            "Resumen de los tableros visibles: miembros, tarjetas por etapa, tarjetas vencidas "
+            "y última actividad. El detalle devuelve el árbol completo del tablero."
+        ),
+    ),
+)
+class BoardViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = BoardSerializer
+    conditional_revision_field = 'revision'
     permission_classes = [IsAuthenticated, IsTeacherOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+    # Acciones que serializan el árbol completo del tablero
+    tree_actions = ('retrieve', 'add_student', 'remove_student')
+
+    @property
+    def conditional_sum_fields(self):
+        # Las tarjetas vencidas cambian con la hora, sin nueva revisión
+        return ('overdue_count',) if self.action == 'list' else ()
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return BoardSummarySerializer
+        return BoardSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Board.objects.all()
-        if hasattr(user, 'profile'):
-            if user.profile.role == 'teacher':
-                # Docentes ven sus propios tableros
-                return queryset.filter(teacher=user)
-            if user.profile.role == 'student':
-                # Estudiantes ven tableros donde son miembros o tienen tareas asignadas
-                return queryset.filter(
-                    Q(students=user) | Q(lists__cards__assigned_to=user)
-                ).distinct()
+        queryset = get_authz(self.request).boards()
+        if self.action == 'list':
+            # Resumen por tablero: contadores mantenidos al escribir, sin cargar el árbol
+            queryset = queryset.select_related('teacher', 'summary').annotate(overdue_count=overdue_count())
+        elif self.action in self.tree_actions:
+            queryset = queryset.select_related('teacher').prefetch_related(*board_tree_prefetches())
         return queryset
 
     def perform_create(self, serializer):
         board = serializer.save(teacher=self.request.user)
         default_lists = [
-            ('pendiente', 'Pendiente'),
-            ('progreso', 'En Progreso'),
-            ('completada', 'Completada'),
+            ('pending', 'Pendiente'),
+            ('in_progress', 'En Progreso'),
+            ('done', 'Completada'),
         ]
-        for idx, (status, title) in enumerate(default_lists):
+        for (state, title), rank in zip(default_lists, spread_keys(len(default_lists))):
             List.objects.create(
                 board=board,
                 title=title,
-                position=idx
+                state=state,
+                rank=rank
             )
-        ActivityLog.objects.create(
-            board=board,
+        log_activity(
+            board_id=board.id,
             user=self.request.user,
             activity_type='board_created',
             description=f"Tablero '{board.name}' creado"
@@ -171,8 +319,9 @@ class BoardViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         serializer.save()
-        ActivityLog.objects.create(
-            board=serializer.instance,
+        record_board_update(serializer.instance)
+        log_activity(
+            board_id=serializer.instance.id,
             user=self.request.user,
             activity_type='board_updated',
             description=f"Tablero '{serializer.instance.name}' actualizado"
@@ -203,9 +352,10 @@ class BoardViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
             return Response({'error': 'Estudiante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         board.students.add(student)
+        record_board_update(board)
         serializer = self.get_serializer(board)
-        ActivityLog.objects.create(
-            board=board,
+        log_activity(
+            board_id=board.id,
             user=request.user,
             activity_type='estudiante_agregado',
             description=f"Estudiante '{student.username}' agregado al tablero"
@@ -214,7 +364,14 @@ class BoardViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="Obtener historial de actividad",
-        description="Obtiene el historial de actividad de un tablero. Los últimos 50 eventos se devuelven ordenados por fecha descendente.",
+        description=(
+            "Obtiene el historial de actividad de un tablero ordenado por fecha descendente, "
+            "paginado por cursor: cada respuesta trae next/previous para recorrer el historial."
+        ),
+        parameters=[
+            OpenApiParameter('cursor', OpenApiTypes.STR, OpenApiParameter.QUERY, description='Cursor de la página'),
+            OpenApiParameter('page_size', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Tamaño de página'),
+        ],
         responses={200: ActivityLogSerializer(many=True), 403: OpenApiTypes.OBJECT},
     )
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
@@ -222,18 +379,180 @@ class BoardViewSet(viewsets.ModelViewSet):
         """Obtener historial de actividad del board"""
         board = self.get_object()
         # Verificar que el usuario tiene acceso al board
-        user = request.user
-        if hasattr(user, 'profile'):
-            if user.profile.role == 'teacher':
-                if board.teacher != user:
-                    return Response({'error': 'No tienes acceso a este tablero'}, status=status.HTTP_403_FORBIDDEN)
-            elif user.profile.role == 'student':
-                if user not in board.students.all() and not board.lists.filter(cards__assigned_to=user).exists():
-                    return Response({'error': 'No tienes acceso a este tablero'}, status=status.HTTP_403_FORBIDDEN)
+        if not get_authz(request).can_view_board(board.id):
+            return Response({'error': 'No tienes acceso a este tablero'}, status=status.HTTP_403_FORBIDDEN)
         
-        activities = ActivityLog.objects.filter(board=board).order_by('-created_at')[:50]
+        paginator = KeysetPagination()
+        activities = paginator.paginate_queryset(
+            ActivityLog.objects.recent().filter(board=board).select_related('board', 'user'), request
+        )
         serializer = ActivityLogSerializer(activities, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        summary="Obtener snapshot del tablero",
+        description=(
+            "Devuelve en una sola respuesta el tablero, sus listas, tarjetas, etiquetas, "
+            "comentarios, items de checklist y miembros como colecciones planas que se "
+            "referencian por id. La respuesta se cachea por tablero y se invalida con "
+            "cualquier escritura sobre él."
+        ),
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['get'])
+    def snapshot(self, request, pk=None):
+        board = self.get_object()
+        # El snapshot es el mismo para todos los miembros: basta la revisión como validador
+        etag = f'"snapshot-{board.id}-{board.revision}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        payload, hit = get_board_snapshot_json(board)
+        response = HttpResponse(payload, content_type='application/json')
+        response['ETag'] = etag
+        response['X-Snapshot-Cache'] = 'hit' if hit else 'miss'
+        return response
+
+    @extend_schema(
+        summary="Progreso del tablero",
+        description=(
+            "Cantidad de tarjetas por etapa (pending, in_progress, done) y porcentaje completado, "
+            "para el tablero y para cada estudiante asignado. Un estudiante solo ve sus tarjetas."
+        ),
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        board = self.get_object()
+        authz = get_authz(request)
+        return Response(board_progress(board.id, assigned_to=None if authz.is_teacher else request.user.pk))
+
+    @extend_schema(
+        summary="Obtener cambios desde una revisión",
+        description=(
+            "Devuelve solo las entidades creadas o actualizadas después de la revisión `since` "
+            "(con el mismo formato plano que el snapshot) y las eliminadas como tombstones. "
+            "Si el tablero no cambió responde 204 sin cuerpo."
+        ),
+        parameters=[
+            OpenApiParameter('since', OpenApiTypes.INT, OpenApiParameter.QUERY, required=True,
+                             description='Última revisión conocida por el cliente'),
+        ],
+        responses={200: OpenApiTypes.OBJECT, 204: None, 400: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        try:
+            since = int(request.query_params.get('since', ''))
+        except ValueError:
+            return Response({'error': 'since debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+        board = self.get_object()
+        if since == board.revision:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if since < 0 or since > board.revision:
+            # Revisión desconocida: el cliente debe recargar el snapshot completo
+            return Response({'revision': board.revision, 'reset': True})
+        return Response(get_board_changes(board, since))
+
+    @extend_schema(
+        summary="Exportar tablero",
+        description=(
+            "Descarga las tarjetas del tablero (con etiquetas, progreso del checklist y número "
+            "de comentarios) y su historial de actividad. La respuesta se genera por partes, "
+            "sin cargar el tablero completo en memoria. En CSV se exporta una sola tabla "
+            "(`resource=cards` o `resource=activity`); en NDJSON cada línea lleva `type`."
+        ),
+        parameters=[
+            OpenApiParameter('format', OpenApiTypes.STR, OpenApiParameter.QUERY, enum=['csv', 'ndjson'],
+                             description='Formato de salida (por defecto csv)'),
+            OpenApiParameter('resource', OpenApiTypes.STR, OpenApiParameter.QUERY,
+                             enum=['cards', 'activity', 'all'],
+                             description='Datos a exportar; por defecto cards en CSV y all en NDJSON'),
+        ],
+        responses={(200, 'text/csv'): OpenApiTypes.STR, (200, 'application/x-ndjson'): OpenApiTypes.STR},
+    )
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsBoardTeacher],
+            renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request, pk=None):
+        board = self.get_object()
+        export_format = request.accepted_renderer.format
+        # CSV admite una sola tabla por archivo
+        valid = ('cards', 'activity') if export_format == 'csv' else ('cards', 'activity', 'all')
+        resource = request.query_params.get('resource', valid[-1] if export_format == 'ndjson' else 'cards')
+        if resource not in valid:
+            # Como excepción, para que handle_exception la responda en JSON
+            raise ValidationError({'resource': f"Debe ser uno de: {', '.join(valid)}"})
+
+        cards = iter_records(
+            card_summary_queryset().filter(list__board=board).order_by('list__rank', 'list_id', 'rank', 'id'),
+            card_record,
+        )
+        activity = iter_records(
+            ActivityLog.objects.recent().filter(board=board).select_related('user').order_by('created_at', 'id'),
+            activity_record,
+        )
+        if export_format == 'csv':
+            if resource == 'cards':
+                content = stream_csv(CARD_COLUMNS, cards)
+            else:
+                content = stream_csv(ACTIVITY_COLUMNS, activity)
+        else:
+            sections = {'cards': [('card', cards)], 'activity': [('activity', activity)]}
+            content = stream_ndjson(sections.get(resource, sections['cards'] + sections['activity']))
+
+        response = streaming_response(request, content, content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="tablero-{board.id}-{resource}.{export_format}"'
+        return response
+
+    @extend_schema(
+        summary="Importar datos al tablero",
+        description=(
+            "Crea en bloque estudiantes (o agrega existentes como miembros), listas y tarjetas. "
+            "Acepta JSON con las secciones `students`, `lists` y `cards`, o multipart con un "
+            "archivo CSV por sección. Todas las filas se validan antes de escribir: si alguna "
+            "falla responde 400 con los errores por fila y no se guarda nada."
+        ),
+        request={
+            'application/json': BoardImportSerializer,
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'students': {'type': 'string', 'format': 'binary'},
+                    'lists': {'type': 'string', 'format': 'binary'},
+                    'cards': {'type': 'string', 'format': 'binary'},
+                    'default_password': {'type': 'string'},
+                },
+            },
+        },
+        responses={201: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    )
+    @action(detail=True, methods=['post'], url_path='import', url_name='import',
+            permission_classes=[IsAuthenticated, IsBoardTeacher])
+    def import_data(self, request, pk=None):
+        board = self.get_object()
+        data = {}
+        if request.FILES:
+            try:
+                for section in IMPORT_SECTIONS:
+                    if section in request.FILES:
+                        data[section] = read_csv(request.FILES[section].read())
+            except (UnicodeDecodeError, csv.Error):
+                return Response({'error': 'Los archivos deben ser CSV en UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            data = {section: request.data.get(section) for section in IMPORT_SECTIONS}
+        try:
+            summary = import_board(board, data, request.user, default_password=request.data.get('default_password'))
+        except BoardImportError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+    def handle_exception(self, exc):
+        if self.action == 'export':
+            # Los errores de la exportación se responden en JSON, no con el renderer CSV/NDJSON
+            self.request.accepted_renderer = FastJSONRenderer()
+            self.request.accepted_media_type = FastJSONRenderer.media_type
+        return super().handle_exception(exc)
 
     @extend_schema(
         summary="Remover estudiante del tablero",
@@ -260,9 +579,10 @@ class BoardViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
             return Response({'error': 'Estudiante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         board.students.remove(student)
+        record_board_update(board)
         serializer = self.get_serializer(board)
-        ActivityLog.objects.create(
-            board=board,
+        log_activity(
+            board_id=board.id,
             user=request.user,
             activity_type='estudiante_eliminado',
             description=f"Estudiante '{student.username}' removido del tablero"
@@ -270,19 +590,26 @@ class BoardViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ListViewSet(viewsets.ModelViewSet):
+class ListViewSet(ConditionalGetMixin, BoardRevisionMixin, viewsets.ModelViewSet):
     serializer_class = ListSerializer
+    conditional_revision_field = 'board__revision'
+    revision_entity = 'list'
     permission_classes = [IsAuthenticated, IsBoardTeacher]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['board']
 
     def get_queryset(self):
-        return List.objects.all()
+        queryset = List.objects.select_related('board')
+        # Al eliminar no se serializa la lista: las tarjetas se tratan en bloque en las señales
+        if self.action == 'destroy':
+            return queryset
+        return queryset.prefetch_related(Prefetch('cards', queryset=card_tree_queryset()))
 
     def perform_create(self, serializer):
         list_obj = serializer.save()
-        ActivityLog.objects.create(
-            board=list_obj.board,
+        self.record_change(list_obj, 'created')
+        log_activity(
+            board_id=list_obj.board_id,
             user=self.request.user,
             activity_type='list_created',
             description=f"Lista '{list_obj.title}' creada"
@@ -290,30 +617,69 @@ class ListViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         list_obj = serializer.save()
-        ActivityLog.objects.create(
-            board=list_obj.board,
+        self.record_change(list_obj, 'updated')
+        log_activity(
+            board_id=list_obj.board_id,
             user=self.request.user,
             activity_type='list_updated',
             description=f"Lista '{list_obj.title}' actualizada"
         )
 
+    def perform_destroy(self, instance):
+        self.record_change(instance, 'deleted')
+        instance.delete()
+
 
-class CardViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        summary="Listar tarjetas",
+        description=(
+            "Devuelve la representación compacta de las tarjetas: en lugar de comentarios "
+            "e items de checklist incluye comment_count, checklist_total y checklist_completed."
+        ),
+        parameters=[
+            OpenApiParameter('fields', OpenApiTypes.STR, OpenApiParameter.QUERY,
+                             description='Campos a incluir, separados por coma (p. ej. id,title,due_date)'),
+            OpenApiParameter('expand', OpenApiTypes.STR, OpenApiParameter.QUERY,
+                             description='Arreglos anidados a incluir: comments, checklist_items'),
+            OpenApiParameter('status', OpenApiTypes.STR, OpenApiParameter.QUERY, enum=list(STATUS_ALIASES),
+                             description='Etapa de la lista de la tarjeta'),
+            STREAM_PARAMETER,
+        ],
+    ),
+)
+class CardViewSet(ConditionalGetMixin, StreamingListMixin, BoardRevisionMixin, viewsets.ModelViewSet):
     serializer_class = CardSerializer
+    conditional_revision_field = 'list__board__revision'
+    revision_entity = 'card'
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['list', 'assigned_to']
     search_fields = ['title', 'description']
-    ordering_fields = ['position', 'created_at', 'due_date']
-    ordering = ['position', 'created_at']
+    # El listado se pagina por cursor sobre (campo, id); las tareas sin fecha van al final
+    ordering_fields = ['rank', 'created_at', 'due_date']
+    ordering = ['rank', 'id']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('rank', 'id')
+
+    def get_serializer_class(self):
+        # Los listados usan la representación compacta; el detalle y las escrituras, la completa
+        if self.action == 'list':
+            return CardSummarySerializer
+        return CardSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Card.objects.all()
+        if self.action == 'list':
+            fields, expand = requested_fieldset(self.request)
+            queryset = card_summary_queryset(fields, expand or ())
+        elif self.action == 'destroy':
+            queryset = Card.objects.select_related('list__board')
+        else:
+            queryset = card_tree_queryset().select_related('list__board')
         
         # Si es estudiante, solo mostrar las tareas asignadas a él
-        if hasattr(user, 'profile') and user.profile.role == 'student':
-            queryset = queryset.filter(assigned_to=user)
+        if get_authz(self.request).is_student:
+            queryset = queryset.filter(assigned_to=self.request.user)
         # Si es docente, puede ver todas las tareas (sin filtro adicional)
         
         board_id = self.request.query_params.get('board')
@@ -322,8 +688,11 @@ class CardViewSet(viewsets.ModelViewSet):
 
         status_filter = self.request.query_params.get('status')
         if status_filter:
-            # Usar el título de la lista para identificar el estado
-            queryset = queryset.filter(list__title__icontains=status_filter)
+            # Etapa de la lista, no su título: sobrevive a que el docente la renombre
+            state = STATUS_ALIASES.get(status_filter.lower())
+            if state is None:
+                raise ValidationError({'status': f"Debe ser uno de: {', '.join(STATES)}"})
+            queryset = queryset.filter(list__state=state)
         
         # Filtrar por próximas a vencer
         upcoming = self.request.query_params.get('upcoming', None)
@@ -350,8 +719,9 @@ class CardViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         card = serializer.save()
-        ActivityLog.objects.create(
-            board=card.list.board,
+        self.record_change(card, 'created', board_id=card.list.board_id)
+        log_activity(
+            board_id=card.list.board_id,
             user=self.request.user,
             activity_type='card_created',
             description=f"Tarjeta '{card.title}' creada",
@@ -359,37 +729,38 @@ class CardViewSet(viewsets.ModelViewSet):
         )
 
     def perform_update(self, serializer):
-        # Guardar la lista antigua antes de actualizar
+        # Guardar la lista antigua antes de actualizar: las señales la usan en lugar de consultarla
         old_list = serializer.instance.list
         old_list_id = old_list.id if old_list else None
+        remember_card_lists(serializer.instance, old_list)
         
         # Guardar los cambios en la base de datos (el serializer ya maneja el campo list)
         card = serializer.save()
         
-        # Recargar el objeto desde la BD para asegurar que tenemos los datos actualizados
-        card.refresh_from_db()
-        
-        # Obtener la nueva lista (recargada desde la BD)
+        # La nueva lista es la que validó el serializer, ya cargada en la tarjeta
         new_list = card.list
         new_list_id = new_list.id if new_list else None
         
         # Verificar si la lista cambió
         if old_list_id != new_list_id:
-            # Cargar el board de la nueva lista con select_related para evitar consultas adicionales
-            new_list = List.objects.select_related('board').get(id=new_list_id)
-            board = new_list.board
-            ActivityLog.objects.create(
-                board=board,
+            board_id = new_list.board_id
+            self.record_change(
+                card, 'updated', board_id=board_id, event_type='card.moved',
+                old_list=old_list_id, new_list=new_list_id,
+            )
+            log_activity(
+                board_id=board_id,
                 user=self.request.user,
                 activity_type='card_moved',
                 description=f"Tarjeta '{card.title}' movida de '{old_list.title}' a '{new_list.title}'",
                 metadata={'card_id': card.id, 'old_list_id': old_list_id, 'new_list_id': new_list_id}
             )
         else:
-            # Si no cambió la lista, usar el board de la lista actual
-            board = old_list.board
-            ActivityLog.objects.create(
-                board=board,
+            # Si no cambió la lista, usar el tablero de la lista actual
+            board_id = old_list.board_id
+            self.record_change(card, 'updated', board_id=board_id)
+            log_activity(
+                board_id=board_id,
                 user=self.request.user,
                 activity_type='card_updated',
                 description=f"Tarjeta '{card.title}' actualizada",
@@ -397,8 +768,9 @@ class CardViewSet(viewsets.ModelViewSet):
             )
 
     def perform_destroy(self, instance):
-        ActivityLog.objects.create(
-            board=instance.list.board,
+        self.record_change(instance, 'deleted', board_id=instance.list.board_id)
+        log_activity(
+            board_id=instance.list.board_id,
             user=self.request.user,
             activity_type='card_deleted',
             description=f"Tarjeta '{instance.title}' eliminada",
@@ -406,6 +778,30 @@ class CardViewSet(viewsets.ModelViewSet):
         )
         instance.delete()
 
+    @extend_schema(
+        summary="Modificar tarjetas en lote",
+        description=(
+            "Aplica varias operaciones `{id, list, position, assigned_to_id, label_ids}` de forma "
+            "atómica y en orden: si alguna no es válida o no está permitida no se guarda ninguna. "
+            "`position` es el índice de destino dentro de la lista (0 = primera); al cambiar de "
+            "lista sin `position` la tarjeta va al final. Los "
+            "estudiantes solo pueden cambiar `list` y `position` de sus propias tarjetas. "
+            "Devuelve las tarjetas actualizadas y la nueva revisión de cada tablero."
+        ),
+        request=CardBatchSerializer,
+        responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        serializer = CardBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        card_ids, revisions = apply_card_batch(get_authz(request), serializer.validated_data['operations'])
+        cards = card_summary_queryset().filter(pk__in=card_ids).order_by('list__rank', 'list_id', 'rank', 'id')
+        return Response({
+            'cards': CardSummarySerializer(cards, many=True, context=self.get_serializer_context()).data,
+            'revisions': revisions,
+        })
+
     @extend_schema(
         summary="Asignar tarjeta a usuario",
         description="Asigna una tarjeta (tarea) a un usuario específico. Se registra la asignación en el historial de actividad.",
@@ -428,8 +824,9 @@ class CardViewSet(viewsets.ModelViewSet):
             user = User.objects.get(id=user_id)
             card.assigned_to = user
             card.save()
-            ActivityLog.objects.create(
-                board=card.list.board,
+            self.record_change(card, 'updated', board_id=card.list.board_id)
+            log_activity(
+                board_id=card.list.board_id,
                 user=request.user,
                 activity_type='card_assigned',
                 description=f"Tarjeta '{card.title}' asignada a {user.username}",
@@ -439,8 +836,12 @@ class CardViewSet(viewsets.ModelViewSet):
         return Response({'error': 'user_id requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class LabelViewSet(viewsets.ModelViewSet):
+class LabelViewSet(ConditionalGetMixin, BoardRevisionMixin, viewsets.ModelViewSet):
     serializer_class = LabelSerializer
+    # Label no tiene updated_at: sus ediciones se detectan por la revisión del tablero
+    conditional_timestamp_field = 'created_at'
+    conditional_revision_field = 'board__revision'
+    revision_entity = 'label'
     permission_classes = [IsAuthenticated, IsTeacherOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['board']
@@ -459,14 +860,27 @@ class LabelViewSet(viewsets.ModelViewSet):
             raise ValidationError({'board': 'El tablero especificado no existe.'})
         
         # Verificar que el usuario sea el profesor del board
-        if board.teacher != self.request.user:
+        if not get_authz(self.request).owns(board):
             raise PermissionDenied('Solo el profesor del tablero puede crear etiquetas.')
         
-        serializer.save(board=board)
+        label = serializer.save(board=board)
+        self.record_change(label, 'created')
+
+    def perform_update(self, serializer):
+        label = serializer.save()
+        self.record_change(label, 'updated')
 
+    def perform_destroy(self, instance):
+        self.record_change(instance, 'deleted')
+        instance.delete()
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+@extend_schema_view(list=extend_schema(parameters=[STREAM_PARAMETER]))
+class CommentViewSet(ConditionalGetMixin, StreamingListMixin, BoardRevisionMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    revision_entity = 'comment'
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['card']
@@ -476,40 +890,44 @@ class CommentViewSet(viewsets.ModelViewSet):
         return Comment.objects.select_related('author', 'card', 'card__list', 'card__list__board').all()
 
     def perform_create(self, serializer):
-        try:
-            comment = serializer.save(author=self.request.user)
-            # Cargar el card con sus relaciones para evitar consultas adicionales
-            card = Card.objects.select_related('list', 'list__board').get(id=comment.card.id)
-            board = card.list.board
-            
-            ActivityLog.objects.create(
-                board=board,
-                user=self.request.user,
-                activity_type='comment_added',
-                description=f"Comentario agregado a '{card.title}'",
-                metadata={'card_id': card.id, 'comment_id': comment.id}
-            )
-        except Exception as e:
-            # Si hay error al crear el ActivityLog, no fallar la creación del comentario
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error al crear ActivityLog para comentario: {str(e)}")
-            # El comentario ya se guardó, así que no re-lanzamos el error
+        comment = serializer.save(author=self.request.user)
+        # La tarjeta ya viene cargada por la validación del serializer: solo falta su tablero
+        card = comment.card
+        board_id = board_id_for(card)
+        self.record_change(comment, 'created', board_id=board_id, card=card.id)
+        log_activity(
+            board_id=board_id,
+            user=self.request.user,
+            activity_type='comment_added',
+            description=f"Comentario agregado a '{card.title}'",
+            metadata={'card_id': card.id, 'comment_id': comment.id}
+        )
+
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        self.record_change(comment, 'updated')
 
+    def perform_destroy(self, instance):
+        self.record_change(instance, 'deleted')
+        instance.delete()
 
-class ChecklistItemViewSet(viewsets.ModelViewSet):
+
+class ChecklistItemViewSet(ConditionalGetMixin, BoardRevisionMixin, viewsets.ModelViewSet):
     serializer_class = ChecklistItemSerializer
+    revision_entity = 'checklist_item'
     permission_classes = [IsAuthenticated, IsAssignedStudentOrTeacher]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['card']
 
     def get_queryset(self):
-        return ChecklistItem.objects.all()
+        # El permiso y el registro de cambios usan card.assigned_to_id y card.list.board_id
+        return ChecklistItem.objects.select_related('card__list')
 
     def perform_create(self, serializer):
         item = serializer.save()
-        ActivityLog.objects.create(
-            board=item.card.list.board,
+        self.record_change(item, 'created', board_id=item.card.list.board_id)
+        log_activity(
+            board_id=item.card.list.board_id,
             user=self.request.user,
             activity_type='checklist_item_added',
             description=f"Item '{item.text}' agregado a '{item.card.title}'",
@@ -518,18 +936,31 @@ class ChecklistItemViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         item = serializer.save()
+        self.record_change(
+            item, 'updated', board_id=item.card.list.board_id,
+            event_type='checklist_item.completed' if item.is_completed else None,
+            card=item.card_id,
+        )
         if item.is_completed:
-            ActivityLog.objects.create(
-                board=item.card.list.board,
+            log_activity(
+                board_id=item.card.list.board_id,
                 user=self.request.user,
                 activity_type='checklist_item_completed',
                 description=f"Item '{item.text}' completado en '{item.card.title}'",
                 metadata={'card_id': item.card.id, 'item_id': item.id}
             )
 
+    def perform_destroy(self, instance):
+        self.record_change(instance, 'deleted')
+        instance.delete()
 
-class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+
+@extend_schema_view(list=extend_schema(parameters=[STREAM_PARAMETER]))
+class ActivityLogViewSet(ConditionalGetMixin, StreamingListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
+    conditional_timestamp_field = 'created_at'
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['board', 'user', 'activity_type']
@@ -537,23 +968,113 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        user = self.request.user
-        if hasattr(user, 'profile'):
-            if user.profile.role == 'teacher':
-                # Docentes ven todas las actividades de sus tableros
-                return ActivityLog.objects.filter(board__teacher=user).select_related('board', 'user')
-            elif user.profile.role == 'student':
-                # Estudiantes ven actividades de:
-                # 1. Tableros donde son miembros
-                # 2. Actividades relacionadas con sus tareas asignadas (cards)
-                queryset = ActivityLog.objects.filter(
-                    Q(board__students=user) | 
-                    Q(board__lists__cards__assigned_to=user)
-                ).distinct().select_related('board', 'user')
-                
-                return queryset
+        authz = get_authz(self.request)
+        if authz.is_teacher or authz.is_student:
+            # Docentes ven todas las actividades de sus tableros; estudiantes, las de
+            # tableros donde son miembros o tienen tareas asignadas
+            return ActivityLog.objects.recent().filter(
+                board_id__in=authz.visible_board_filter()
+            ).select_related('board', 'user')
         return ActivityLog.objects.none()
 
 
+@extend_schema_view(
+    list=extend_schema(
+        summary="Buzón de notificaciones",
+        description=(
+            "Notificaciones del usuario, las más recientes primero. Con `after=<id>` devuelve solo "
+            "las posteriores a ese id, de la más antigua a la más nueva, para consultar "
+            "periódicamente sin volver a descargar las ya vistas."
+        ),
+        parameters=[
+            OpenApiParameter('after', OpenApiTypes.INT, OpenApiParameter.QUERY,
+                             description='Id de la última notificación conocida'),
+            OpenApiParameter('unread', OpenApiTypes.BOOL, OpenApiParameter.QUERY,
+                             description='Solo las no leídas'),
+        ],
+    ),
+)
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = NotificationSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthenticated]
 
+    @property
+    def keyset_ordering(self):
+        return ('id',) if self.request.query_params.get('after') else ('-id',)
 
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            # Generación del esquema: no hay usuario autenticado
+            return Notification.objects.none()
+        queryset = Notification.objects.filter(recipient=self.request.user).select_related('board', 'actor')
+        after = self.request.query_params.get('after')
+        if after:
+            try:
+                queryset = queryset.filter(pk__gt=int(after))
+            except ValueError:
+                raise ValidationError({'after': 'Debe ser un entero'})
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    @extend_schema(
+        summary="Cantidad de notificaciones sin leer",
+        description="Lee el contador del usuario, que se mantiene al crear y marcar notificaciones.",
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread': get_unread_count(request.user)})
+
+    @extend_schema(
+        summary="Marcar notificaciones como leídas",
+        description=(
+            "Marca las notificaciones `ids`, las de id menor o igual a `up_to` o, si no se envía "
+            "ninguno, todas. Devuelve cuántas cambiaron y el nuevo contador."
+        ),
+        request=NotificationMarkReadSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        serializer = NotificationMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = mark_notifications_read(request.user, **serializer.validated_data)
+        return Response({'updated': updated, 'unread': get_unread_count(request.user)})
+
+
+class SearchViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Buscar tarjetas",
+        description=(
+            "Busca en el título, la descripción, los comentarios y el checklist de las tarjetas "
+            "visibles con el índice de texto completo del motor (FTS5 en SQLite, tsvector en "
+            "PostgreSQL). Todas las palabras son obligatorias, la última como prefijo, y no se "
+            "distinguen tildes. Los resultados vienen ordenados por relevancia (`score`). Los "
+            "estudiantes solo encuentran sus tareas asignadas."
+        ),
+        parameters=[SearchQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    )
+    def list(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        terms = query_terms(params.validated_data['q'])
+        if not terms:
+            raise ValidationError({'q': 'Indica al menos una palabra'})
+        authz = get_authz(request)
+        matches = search_cards(
+            terms,
+            board_ids=authz.visible_board_ids,
+            assigned_to=request.user.pk if authz.is_student else None,
+            limit=params.validated_data['limit'],
+        )
+        fields, expand = requested_fieldset(request)
+        cards = card_summary_queryset(fields, expand or ()).in_bulk([card_id for card_id, _ in matches])
+        found = [(cards[card_id], score) for card_id, score in matches if card_id in cards]
+        serializer = CardSummarySerializer([card for card, _ in found], many=True, context={'request': request})
+        results = [{**data, 'score': round(score, 6)} for data, (_, score) in zip(serializer.data, found)]
+        return Response({'query': params.validated_data['q'], 'count': len(results), 'results': results})
@@ -40,7 +40,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -140,11 +142,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -165,6 +176,54 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.KanbanTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.KanbanTokenRefreshSerializer',
+}
+
+# Caché en el proceso de los usuarios autenticados por JWT (segundos de vida y tamaño máximo)
+JWT_USER_CACHE = {
+    'MAX_SIZE': config('JWT_USER_CACHE_MAX_SIZE', default=1024, cast=int),
+    'TTL': config('JWT_USER_CACHE_TTL', default=60, cast=int),
+}
+
+# Historial de actividad
+# 'background' guarda en lote desde un hilo trabajador; 'inline' guarda al confirmar
+# la transacción en el mismo hilo.
+ACTIVITY_LOG_WRITER = {
+    'MODE': config('ACTIVITY_LOG_MODE', default='background'),
+    'BATCH_SIZE': config('ACTIVITY_LOG_BATCH_SIZE', default=100, cast=int),
+    'FLUSH_INTERVAL': config('ACTIVITY_LOG_FLUSH_INTERVAL', default=1.0, cast=float),
+    'MAX_QUEUE_SIZE': config('ACTIVITY_LOG_MAX_QUEUE_SIZE', default=10000, cast=int),
+}
+
+# Rebalanceo de claves de orden (api.ranking): 'background' lo hace en un hilo
+# trabajador tras el commit; 'inline', en el mismo hilo al confirmar la transacción.
+RANK_REBALANCE = {
+    'MODE': config('RANK_REBALANCE_MODE', default='background'),
+}
+
+# Meses de historial que se consultan y conservan; los anteriores se archivan con
+# `python manage.py archive_activity_logs`
+ACTIVITY_LOG_RETENTION_MONTHS = config('ACTIVITY_LOG_RETENTION_MONTHS', default=12, cast=int)
+ACTIVITY_LOG_ARCHIVE_DIR = config('ACTIVITY_LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'activity'))
+
+# Eventos en vivo (SSE)
+# Backend de pub/sub para /api/boards/{id}/events/. LocalBroker reparte eventos dentro
+# del proceso; con varios procesos ASGI se necesita un backend compartido.
+REALTIME_BROKER = config('REALTIME_BROKER', default='api.realtime.LocalBroker')
+SSE_KEEPALIVE_SECONDS = config('SSE_KEEPALIVE_SECONDS', default=15, cast=int)
+
+# Compresión de respuestas (gzip; Brotli si el paquete ``brotli`` está instalado)
+RESPONSE_COMPRESSION = {
+    'MIN_LENGTH': config('RESPONSE_COMPRESSION_MIN_LENGTH', default=1024, cast=int),
+    'BROTLI': config('RESPONSE_COMPRESSION_BROTLI', default=True, cast=bool),
+}
+
+# Métricas por vista en /api/metrics/ (formato Prometheus)
+REQUEST_METRICS = {
+    'ENABLED': config('REQUEST_METRICS_ENABLED', default=True, cast=bool),
+    'TOKEN': config('METRICS_TOKEN', default=''),
+    'QUERY_BUDGET': config('QUERY_BUDGET', default=50, cast=int),
 }
 
 # CORS
@@ -185,6 +244,7 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
     'SCHEMA_PATH_PREFIX': '/api/',
     'SORT_OPERATIONS': False,
+    'GET_LIB_DOC_EXCLUDES': 'api.schema.get_lib_doc_excludes',
     'SWAGGER_UI_SETTINGS': {
         'deepLinking': True,
         'displayRequestDuration': True,
@@ -194,7 +254,7 @@ SPECTACULAR_SETTINGS = {
     },
     'SWAGGER_UI_FAVICON_HREF': None,
     'AUTHENTICATION_WHITELIST': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'APPEND_COMPONENTS': {
         'securitySchemes': {
@@ -24,10 +24,12 @@ def reset_password(username, new_password=None):
         print(f"  Email: {user.email}")
         print(f"  Nombre: {user.first_name} {user.last_name}")
         
-        # Resetear contraseña
+        # Resetear contraseña (al guardar se incrementa Profile.token_version y
+        # los tokens JWT emitidos antes dejan de ser válidos)
         user.set_password(new_password)
         user.save()
         print(f"\nOK: Contrasena reseteada exitosamente")
+        print(f"OK: Sesiones abiertas cerradas (tokens anteriores revocados)")
         
         # Verificar que funciona
         authenticated_user = authenticate(username=username, password=new_password)
@@ -24,8 +24,11 @@ function Calificaciones({ usuario, cursoActual }) {
   const cargarCalificaciones = async () => {
     try {
       setCargando(true);
-      // Obtener todas las cards del curso
-      const cards = await cardsAPI.getAll({ board: cursoActual.id });
+      // Obtener todas las cards del curso (solo los campos que usa esta vista)
+      const cards = await cardsAPI.getAll({
+        board: cursoActual.id,
+        fields: 'id,title,description,assigned_to,due_date',
+      });
       
       // Filtrar solo las que tienen calificación
       const cardsCalificadas = cards.filter(card => card.grade);
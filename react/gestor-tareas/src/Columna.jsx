@@ -2,7 +2,7 @@ import { useDroppable } from '@dnd-kit/core';
 import { SortableContext, verticalListSortingStrategy } from '@dnd-kit/sortable';
 import TareaIndividual from './TareaIndividual.jsx';
 import { useTheme } from './ThemeContext.jsx';
-import { cardsAPI } from './api';
+import { cardsAPI, columnaDeLista } from './api';
 
 function Columna({ titulo, tareas, setTareas, estado, usuario, onActividad, listsMap, cursoId, onTareaMovida, etiquetas }) {
   const { isDark } = useTheme();
@@ -213,16 +213,7 @@ function Columna({ titulo, tareas, setTareas, estado, usuario, onActividad, list
           });
 
           // Verificar si la tarea cambió de columna según el backend
-          const listTitle = cardActualizada.list?.title?.toLowerCase() || '';
-          let nuevaColumna = null;
-          
-          if (listTitle.includes('pendiente')) {
-            nuevaColumna = 'pendiente';
-          } else if (listTitle.includes('progreso') || listTitle.includes('en progreso')) {
-            nuevaColumna = 'progreso';
-          } else if (listTitle.includes('completada') || listTitle.includes('completado')) {
-            nuevaColumna = 'completada';
-          }
+          const nuevaColumna = columnaDeLista(cardActualizada.list);
           
           // Si la columna cambió según el backend, mover la tarea
           if (nuevaColumna && nuevaColumna !== estado) {
@@ -1,15 +1,19 @@
 import { useState, useEffect, useRef } from 'react';
-import { activityAPI } from './api';
+import { notificationsAPI } from './api';
 import { useTheme } from './ThemeContext.jsx';
 
+const MAX_NOTIFICACIONES = 50;
+
 function Notificaciones({ usuario }) {
   const { isDark } = useTheme();
   const [notificaciones, setNotificaciones] = useState([]);
-  const [notificacionesNoLeidas, setNotificacionesNoLeidas] = useState(new Set());
+  const [cantidadNoLeidas, setCantidadNoLeidas] = useState(0);
   const [mostrarDropdown, setMostrarDropdown] = useState(false);
   const [cargando, setCargando] = useState(false);
   const dropdownRef = useRef(null);
   const pollingIntervalRef = useRef(null);
+  const ultimoIdRef = useRef(0);
+  const noLeidasRef = useRef(null);
 
   // Cerrar dropdown al hacer clic fuera
   useEffect(() => {
@@ -25,42 +29,30 @@ function Notificaciones({ usuario }) {
     };
   }, []);
 
-  // Cargar notificaciones
+  // Cargar notificaciones nuevas: solo las posteriores a la última conocida
   const cargarNotificaciones = async () => {
     try {
       setCargando(true);
-      const actividades = await activityAPI.getAll();
-      
-      // Convertir actividades a notificaciones
-      const notificacionesData = (Array.isArray(actividades) ? actividades : []).map(actividad => ({
-        id: actividad.id,
-        tipo: actividad.activity_type,
-        descripcion: actividad.description,
-        usuario: actividad.user?.username || 'Usuario',
-        tablero: actividad.board_name || `Tablero #${actividad.board}`,
-        fecha: actividad.created_at,
-        metadata: actividad.metadata || {},
-        board: actividad.board
+      const params = ultimoIdRef.current ? { after: ultimoIdRef.current } : {};
+      const nuevas = (await notificationsAPI.getAll(params)).map(notificacion => ({
+        id: notificacion.id,
+        tipo: notificacion.activity_type,
+        descripcion: notificacion.description,
+        usuario: notificacion.actor || 'Usuario',
+        tablero: notificacion.board_name || `Tablero #${notificacion.board}`,
+        fecha: notificacion.created_at,
+        metadata: notificacion.metadata || {},
+        board: notificacion.board,
+        leida: notificacion.is_read
       }));
+      if (nuevas.length === 0) return;
 
-      // Ordenar por fecha más reciente primero
-      notificacionesData.sort((a, b) => new Date(b.fecha) - new Date(a.fecha));
-
-      // Detectar notificaciones nuevas comparando con el estado actual
-      setNotificaciones(prevNotificaciones => {
-        if (prevNotificaciones.length === 0) {
-          // Primera carga: marcar todas como no leídas
-          setNotificacionesNoLeidas(new Set(notificacionesData.map(n => n.id)));
-        } else {
-          // Detectar nuevas notificaciones
-          const nuevasNotificaciones = notificacionesData.filter(
-            n => !prevNotificaciones.find(old => old.id === n.id)
-          );
-          nuevasNotificaciones.forEach(n => {
-            setNotificacionesNoLeidas(prev => new Set([...prev, n.id]));
-          });
-        }
-        return notificacionesData;
+      ultimoIdRef.current = Math.max(ultimoIdRef.current, ...nuevas.map(n => n.id));
+      setNotificaciones(prev => {
+        const conocidas = new Set(prev.map(n => n.id));
+        return [...nuevas.filter(n => !conocidas.has(n.id)), ...prev]
+          .sort((a, b) => b.id - a.id)
+          .slice(0, MAX_NOTIFICACIONES);
       });
     } catch (error) {
       console.error('Error al cargar notificaciones:', error);
@@ -69,14 +61,32 @@ function Notificaciones({ usuario }) {
     }
   };
 
+  // Consultar el contador (una lectura indexada) y traer la lista solo si cambió
+  const consultarNoLeidas = async () => {
+    try {
+      const cantidad = await notificationsAPI.unreadCount();
+      if (cantidad !== noLeidasRef.current) {
+        noLeidasRef.current = cantidad;
+        setCantidadNoLeidas(cantidad);
+        await cargarNotificaciones();
+      }
+    } catch (error) {
+      console.error('Error al consultar notificaciones sin leer:', error);
+    }
+  };
+
   // Cargar notificaciones al montar y cuando cambia el usuario
   useEffect(() => {
     if (usuario) {
+      ultimoIdRef.current = 0;
+      noLeidasRef.current = null;
+      setNotificaciones([]);
       cargarNotificaciones();
+      consultarNoLeidas();
 
       // Configurar polling cada 30 segundos
       pollingIntervalRef.current = setInterval(() => {
-        cargarNotificaciones();
+        consultarNoLeidas();
       }, 30000);
 
       return () => {
@@ -87,18 +97,32 @@ function Notificaciones({ usuario }) {
     }
   }, [usuario]);
 
-  // Marcar todas como leídas
-  const marcarTodasComoLeidas = () => {
-    setNotificacionesNoLeidas(new Set());
+  const actualizarContador = (cantidad) => {
+    noLeidasRef.current = cantidad;
+    setCantidadNoLeidas(cantidad);
+  };
+
+  // Marcar todas como leídas (hasta la última recibida)
+  const marcarTodasComoLeidas = async () => {
+    if (!ultimoIdRef.current || cantidadNoLeidas === 0) return;
+    setNotificaciones(prev => prev.map(n => ({ ...n, leida: true })));
+    try {
+      const { unread } = await notificationsAPI.markRead({ up_to: ultimoIdRef.current });
+      actualizarContador(unread);
+    } catch (error) {
+      console.error('Error al marcar notificaciones como leídas:', error);
+    }
   };
 
   // Marcar una notificación como leída
-  const marcarComoLeida = (id) => {
-    setNotificacionesNoLeidas(prev => {
-      const nuevo = new Set(prev);
-      nuevo.delete(id);
-      return nuevo;
-    });
+  const marcarComoLeida = async (id) => {
+    setNotificaciones(prev => prev.map(n => (n.id === id ? { ...n, leida: true } : n)));
+    try {
+      const { unread } = await notificationsAPI.markRead({ ids: [id] });
+      actualizarContador(unread);
+    } catch (error) {
+      console.error('Error al marcar la notificación como leída:', error);
+    }
   };
 
   // Obtener ícono según el tipo de actividad
@@ -143,19 +167,9 @@ function Notificaciones({ usuario }) {
     });
   };
 
-  // Filtrar notificaciones relevantes según el rol
-  const notificacionesRelevantes = notificaciones.filter(notif => {
-    // Para estudiantes, mostrar solo actividades relacionadas con sus tareas
-    if (usuario.rol === 'estudiante') {
-      return ['card_created', 'card_updated', 'card_assigned', 'comment_added'].includes(notif.tipo);
-    }
-    // Para docentes, mostrar todas
-    return true;
-  }).slice(0, 10); // Mostrar solo las 10 más recientes
-
-  const cantidadNoLeidas = Array.from(notificacionesNoLeidas).filter(id =>
-    notificacionesRelevantes.find(n => n.id === id)
-  ).length;
+  // El servidor ya filtra por rol: docentes, toda la actividad de sus tableros;
+  // estudiantes, la de sus tareas asignadas
+  const notificacionesRelevantes = notificaciones.slice(0, 10); // Mostrar solo las 10 más recientes
 
   return (
     <div style={{ position: 'relative' }} ref={dropdownRef}>
@@ -288,7 +302,7 @@ function Notificaciones({ usuario }) {
               </div>
             ) : (
               notificacionesRelevantes.map(notif => {
-                const esNoLeida = notificacionesNoLeidas.has(notif.id);
+                const esNoLeida = !notif.leida;
                 return (
                   <div
                     key={notif.id}
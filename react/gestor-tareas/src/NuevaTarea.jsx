@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { boardsAPI, listsAPI, cardsAPI, labelsAPI } from './api';
+import { boardsAPI, listsAPI, cardsAPI, labelsAPI, columnaDeLista } from './api';
 import { useTheme } from './ThemeContext.jsx';
 
 // Etiquetas predefinidas
@@ -58,10 +58,7 @@ function NuevaTarea({ setTareas, cursoId, estudiantes, usuario, onActividad, lis
           
           // Obtener la lista "Pendiente" del board
           let lists = await listsAPI.getAll(board.id);
-          let listaPendiente = lists.find(l => {
-            const titleLower = l.title.toLowerCase();
-            return titleLower.includes('pendiente');
-          });
+          let listaPendiente = lists.find(l => columnaDeLista(l) === 'pendiente');
           
           // Si no existe la lista "Pendiente", crearla
           if (!listaPendiente) {
@@ -90,7 +87,6 @@ function NuevaTarea({ setTareas, cursoId, estudiantes, usuario, onActividad, lis
             description: descripcion.trim(),
             assigned_to_id: estudianteId ? parseInt(estudianteId) : null,
             due_date: fechaVencimiento || null,
-            position: 0,
             label_ids: etiquetasSeleccionadas
           };
           
@@ -7,7 +7,7 @@ import FiltrosEstudiante from './FiltrosEstudiante.jsx';
 import HistorialActividad from './HistorialActividad.jsx';
 import Calificaciones from './Calificaciones.jsx';
 import { useTheme } from './ThemeContext.jsx';
-import { cardsAPI, listsAPI, boardsAPI, labelsAPI } from './api';
+import { cardsAPI, listsAPI, boardsAPI, labelsAPI, columnaDeLista } from './api';
 
 function Tablero({ usuario }) {
   const { isDark } = useTheme();
@@ -113,20 +113,8 @@ function Tablero({ usuario }) {
               grade: card.grade || null
             };
             
-        // Organizar según el título de la lista
-            const listTitle = card.list?.title?.toLowerCase() || '';
-        console.log('Procesando card:', card.title, 'Lista:', listTitle);
-        
-            if (listTitle.includes('pendiente')) {
-              tareasMapeadas.pendiente.push(tarea);
-            } else if (listTitle.includes('progreso') || listTitle.includes('en progreso')) {
-              tareasMapeadas.progreso.push(tarea);
-            } else if (listTitle.includes('completada') || listTitle.includes('completado')) {
-              tareasMapeadas.completada.push(tarea);
-            } else {
-              // Por defecto, agregar a pendiente
-              tareasMapeadas.pendiente.push(tarea);
-            }
+            // Organizar según la etapa de la lista; por defecto, pendiente
+            tareasMapeadas[columnaDeLista(card.list) || 'pendiente'].push(tarea);
           });
           
       console.log('Tareas mapeadas:', tareasMapeadas);
@@ -222,21 +210,34 @@ function Tablero({ usuario }) {
       return;
     }
 
-    console.log('Iniciando recarga automática de tareas para docente...');
-    
-    // Recargar cada 10 segundos para mantener sincronizado sin sobrecargar
-    const intervalo = setInterval(() => {
-      console.log('Recargando tareas automáticamente (docente)...', new Date().toLocaleTimeString());
+    let intervalo = null;
+    const recargar = () => {
       // Usar la ref para evitar problemas con dependencias
       if (cargarTareasRef.current) {
         cargarTareasRef.current();
       }
-    }, 10000); // 10 segundos
+    };
+
+    // Recargar cada 10 segundos; solo se usa si no hay conexión en vivo
+    const iniciarRecargaPeriodica = () => {
+      if (intervalo) return;
+      console.log('Iniciando recarga automática de tareas para docente...');
+      intervalo = setInterval(recargar, 10000); // 10 segundos
+    };
 
-    // Limpiar intervalo al desmontar o cambiar de curso
+    // Eventos en vivo del tablero: se recarga solo cuando algo cambia
+    let cerrarEventos = null;
+    if (typeof EventSource !== 'undefined') {
+      cerrarEventos = boardsAPI.subscribe(cursoActual.id, recargar, iniciarRecargaPeriodica);
+    } else {
+      iniciarRecargaPeriodica();
+    }
+
+    // Limpiar conexión e intervalo al desmontar o cambiar de curso
     return () => {
-      console.log('Limpiando intervalo de recarga automática');
-      clearInterval(intervalo);
+      console.log('Limpiando recarga automática');
+      if (cerrarEventos) cerrarEventos();
+      if (intervalo) clearInterval(intervalo);
     };
   }, [cursoActual?.id, usuario.rol]);
 
@@ -339,18 +340,10 @@ function Tablero({ usuario }) {
           
           const newListsMap = {};
           lists.forEach(list => {
-            const titleLower = list.title.toLowerCase();
-            console.log('Procesando lista:', list.title, 'ID:', list.id);
-            
-            if (titleLower.includes('pendiente')) {
-              newListsMap.pendiente = list.id;
-              console.log('Mapeado pendiente:', list.id);
-            } else if (titleLower.includes('progreso') || titleLower.includes('en progreso')) {
-              newListsMap.progreso = list.id;
-              console.log('Mapeado progreso:', list.id);
-            } else if (titleLower.includes('completada') || titleLower.includes('completado')) {
-              newListsMap.completada = list.id;
-              console.log('Mapeado completada:', list.id);
+            // La primera lista de cada etapa recibe las tareas de su columna
+            const columna = columnaDeLista(list);
+            if (columna && !newListsMap[columna]) {
+              newListsMap[columna] = list.id;
             }
           });
           
@@ -890,9 +883,8 @@ function Tablero({ usuario }) {
       try {
         console.log('Moviendo tarea:', tarea.id, 'de', estadoOrigen, 'a', estadoDestino);
         console.log('Lista destino ID:', listaDestinoId);
-        const cardActualizada = await cardsAPI.update(tarea.id, {
-          list: listaDestinoId
-        });
+        const { cards } = await cardsAPI.batch([{ id: tarea.id, list: listaDestinoId }]);
+        const cardActualizada = cards[0];
         
         console.log('Tarea actualizada en backend:', cardActualizada);
         
@@ -920,16 +912,7 @@ function Tablero({ usuario }) {
                 progreso: [],
                 completada: []
               };
-              const listTitle = cardActualizada.list?.title?.toLowerCase() || '';
-              if (listTitle.includes('pendiente')) {
-                estadoValido.pendiente = [tareaActualizada];
-              } else if (listTitle.includes('progreso') || listTitle.includes('en progreso')) {
-                estadoValido.progreso = [tareaActualizada];
-              } else if (listTitle.includes('completada') || listTitle.includes('completado')) {
-                estadoValido.completada = [tareaActualizada];
-              } else {
-                estadoValido[estadoDestino] = [tareaActualizada];
-              }
+              estadoValido[columnaDeLista(cardActualizada.list) || estadoDestino] = [tareaActualizada];
               return estadoValido;
             }
             
@@ -944,18 +927,8 @@ function Tablero({ usuario }) {
             nuevas.progreso = nuevas.progreso.filter((t) => t.id !== tareaActualizada.id);
             nuevas.completada = nuevas.completada.filter((t) => t.id !== tareaActualizada.id);
             
-            // Agregar en el destino correcto según el título de la lista
-            const listTitle = cardActualizada.list?.title?.toLowerCase() || '';
-            if (listTitle.includes('pendiente')) {
-              nuevas.pendiente.push(tareaActualizada);
-            } else if (listTitle.includes('progreso') || listTitle.includes('en progreso')) {
-              nuevas.progreso.push(tareaActualizada);
-            } else if (listTitle.includes('completada') || listTitle.includes('completado')) {
-              nuevas.completada.push(tareaActualizada);
-            } else {
-              // Por defecto, agregar al destino que el usuario seleccionó
-              nuevas[estadoDestino].push(tareaActualizada);
-            }
+            // Agregar en el destino según la etapa de la lista o, si no se conoce, el que eligió el usuario
+            nuevas[columnaDeLista(cardActualizada.list) || estadoDestino].push(tareaActualizada);
             
             return nuevas;
           });
@@ -201,9 +201,10 @@ export const usersAPI = {
     }
   },
 
-  search: async (query) => {
+  // Autocompletado por prefijo: sin distinguir tildes, hasta `limit` usuarios
+  search: async (query, { role, limit } = {}) => {
     try {
-      const response = await api.get('/users/', { params: { search: query } });
+      const response = await api.get('/users/autocomplete/', { params: { q: query, role, limit } });
       return response.data;
     } catch (error) {
       console.error('Error al buscar usuarios:', error);
@@ -277,10 +278,35 @@ export const boardsAPI = {
     return response.data;
   },
 
-  getActivity: async (id) => {
-    const response = await api.get(`/boards/${id}/activity/`);
+  // El historial se pagina por cursor: devuelve la primera página (más reciente)
+  getActivity: async (id, params = {}) => {
+    const response = await api.get(`/boards/${id}/activity/`, { params });
+    return response.data.results || response.data;
+  },
+
+  // Tarjetas por etapa (pending, in_progress, done) y porcentaje completado
+  getProgress: async (id) => {
+    const response = await api.get(`/boards/${id}/progress/`);
     return response.data;
   },
+
+  // Suscribe a los eventos en vivo del tablero (SSE). Devuelve una función para cerrar la conexión.
+  subscribe: (id, onEvent, onError) => {
+    const token = localStorage.getItem('access_token');
+    const source = new EventSource(`${API_BASE_URL}/boards/${id}/events/?token=${encodeURIComponent(token || '')}`);
+    const tipos = ['card.created', 'card.updated', 'card.moved', 'card.deleted', 'comment.created',
+      'checklist_item.created', 'checklist_item.updated', 'checklist_item.completed', 'checklist_item.deleted',
+      'list.created', 'list.updated', 'list.deleted', 'label.created', 'label.updated', 'label.deleted',
+      'comment.updated', 'comment.deleted', 'board.updated', 'board.imported', 'card.batch_updated'];
+    tipos.forEach((tipo) => {
+      source.addEventListener(tipo, (event) => onEvent(JSON.parse(event.data)));
+    });
+    source.onerror = (error) => {
+      source.close();
+      if (onError) onError(error);
+    };
+    return () => source.close();
+  },
 };
 
 // Funciones de listas
@@ -344,6 +370,12 @@ export const cardsAPI = {
     return response.data;
   },
 
+  // Aplica varias operaciones {id, list, position, assigned_to_id, label_ids} en una sola petición
+  batch: async (operations) => {
+    const response = await api.post('/cards/batch/', { operations });
+    return response.data;
+  },
+
   assign: async (id, userId) => {
     const response = await api.post(`/cards/${id}/assign/`, {
       user_id: userId,
@@ -431,6 +463,26 @@ export const labelsAPI = {
   },
 };
 
+// Buzón de notificaciones
+export const notificationsAPI = {
+  // Con { after: id } devuelve solo las posteriores a esa notificación
+  getAll: async (params = {}) => {
+    const response = await api.get('/notifications/', { params });
+    return response.data.results || response.data;
+  },
+
+  unreadCount: async () => {
+    const response = await api.get('/notifications/unread_count/');
+    return response.data.unread;
+  },
+
+  // { ids: [...] }, { up_to: id } o {} para marcar todas
+  markRead: async (data = {}) => {
+    const response = await api.post('/notifications/mark_read/', data);
+    return response.data;
+  },
+};
+
 // Funciones de actividad
 export const activityAPI = {
   getAll: async (params = {}) => {
@@ -439,12 +491,32 @@ export const activityAPI = {
     return response.data.results || response.data;
   },
 
-  getByBoard: async (boardId) => {
-    const response = await api.get(`/boards/${boardId}/activity/`);
+  getByBoard: async (boardId, params = {}) => {
+    const response = await api.get(`/boards/${boardId}/activity/`, { params });
+    return response.data.results || response.data;
+  },
+
+  // Página siguiente del historial a partir de la URL `next` de la respuesta anterior
+  getPage: async (url) => {
+    const response = await api.get(url);
     return response.data;
   },
 };
 
+// Columna del tablero según la etapa de la lista (state). El título solo se usa
+// como respaldo para respuestas que aún no traen state.
+const COLUMNAS_POR_ESTADO = { pending: 'pendiente', in_progress: 'progreso', done: 'completada' };
+
+export const columnaDeLista = (list) => {
+  if (!list) return null;
+  if (list.state) return COLUMNAS_POR_ESTADO[list.state] || null;
+  const titulo = list.title?.toLowerCase() || '';
+  if (titulo.includes('pendiente')) return 'pendiente';
+  if (titulo.includes('progreso')) return 'progreso';
+  if (titulo.includes('completad')) return 'completada';
+  return null;
+};
+
 export default api;
 
 